@@ -0,0 +1,141 @@
+"""
+Backfill Checkpoints - Records which historical windows have been fetched.
+
+Every (symbol, window) the backfill touches gets one row in
+backfill_checkpoints with the date range it has covered so far and the
+outcome of the last attempt ('done', 'empty' or 'failed'). Windows are
+aligned to a fixed grid so the same window keeps the same key across runs,
+even though START_DATE/END_DATE move forward every day.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import shared
+from shared import HISTORY_WINDOW_DAYS
+
+# Fixed origin for the window grid
+GRID_ORIGIN = date(2000, 1, 1)
+
+# Inclusive window length: start..start+HISTORY_WINDOW_DAYS
+GRID_SPAN = HISTORY_WINDOW_DAYS + 1
+
+STATUS_DONE = "done"
+STATUS_EMPTY = "empty"
+STATUS_FAILED = "failed"
+
+
+# -----------------------------------------------------------
+# WINDOW GRID
+# -----------------------------------------------------------
+def grid_start(day: date) -> date:
+    """Start of the grid window containing `day`."""
+    return GRID_ORIGIN + timedelta(days=((day - GRID_ORIGIN).days // GRID_SPAN) * GRID_SPAN)
+
+
+def grid_windows(start_date: date, end_date: date) -> List[Tuple[date, date, date]]:
+    """
+    Split start_date..end_date along the grid.
+
+    Returns:
+        (window_key, clipped_start, clipped_end) for every grid window
+        overlapping the range
+    """
+    windows = []
+    key = grid_start(start_date)
+    while key <= end_date:
+        window_end = key + timedelta(days=GRID_SPAN - 1)
+        windows.append((key, max(key, start_date), min(window_end, end_date)))
+        key = window_end + timedelta(days=1)
+    return windows
+
+
+# -----------------------------------------------------------
+# TABLE ACCESS
+# -----------------------------------------------------------
+async def ensure_checkpoint_table():
+    sql = """
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            symbol       VARCHAR(32) NOT NULL,
+            window_start DATE NOT NULL,
+            fetched_from DATE,
+            fetched_to   DATE,
+            status       VARCHAR(10) NOT NULL,
+            rows         INTEGER NOT NULL DEFAULT 0,
+            attempts     INTEGER NOT NULL DEFAULT 0,
+            updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (symbol, window_start)
+        );
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        await conn.execute(sql)
+
+
+async def load_checkpoints(symbols: List[str]) -> Dict[str, Dict[date, dict]]:
+    """
+    Load every checkpoint for the given symbols in one query.
+
+    Returns:
+        {symbol: {window_start: checkpoint row as dict}}
+    """
+    sql = """
+        SELECT symbol, window_start, fetched_from, fetched_to, status, rows
+        FROM backfill_checkpoints
+        WHERE symbol = ANY($1::varchar[]);
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        rows = await conn.fetch(sql, symbols)
+
+    checkpoints: Dict[str, Dict[date, dict]] = {}
+    for r in rows:
+        checkpoints.setdefault(r["symbol"], {})[r["window_start"]] = dict(r)
+    return checkpoints
+
+
+async def record_checkpoint(
+    symbol: str,
+    window_start: date,
+    status: str,
+    fetched_from: Optional[date] = None,
+    fetched_to: Optional[date] = None,
+    rows: int = 0,
+):
+    """
+    Record the outcome of fetching part of a window. Successful fetches
+    widen the covered range; failures only update the status.
+    """
+    sql = """
+        INSERT INTO backfill_checkpoints
+            (symbol, window_start, fetched_from, fetched_to, status, rows, attempts, updated_at)
+        VALUES ($1, $2, $3, $4, $5, $6, 1, NOW())
+        ON CONFLICT (symbol, window_start)
+        DO UPDATE SET
+            fetched_from = LEAST(backfill_checkpoints.fetched_from, EXCLUDED.fetched_from),
+            fetched_to = GREATEST(backfill_checkpoints.fetched_to, EXCLUDED.fetched_to),
+            status = CASE
+                WHEN EXCLUDED.status = 'empty' AND backfill_checkpoints.rows > 0 THEN 'done'
+                ELSE EXCLUDED.status
+            END,
+            rows = backfill_checkpoints.rows + EXCLUDED.rows,
+            attempts = backfill_checkpoints.attempts + 1,
+            updated_at = NOW();
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        await conn.execute(sql, symbol, window_start, fetched_from, fetched_to, status, rows)
+
+
+# -----------------------------------------------------------
+# PLANNING
+# -----------------------------------------------------------
+def missing_range(checkpoint: Optional[dict], start_date: date, end_date: date) -> Optional[Tuple[date, date]]:
+    """
+    Part of start_date..end_date (inside one window) not yet covered.
+
+    Returns:
+        (from, to) still to fetch, or None when the window is fully covered
+    """
+    if checkpoint is None or checkpoint["fetched_from"] is None or checkpoint["fetched_from"] > start_date:
+        return start_date, end_date
+    if checkpoint["fetched_to"] >= end_date:
+        return None
+    return checkpoint["fetched_to"] + timedelta(days=1), end_date
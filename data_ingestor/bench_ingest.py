@@ -0,0 +1,298 @@
+"""
+Ingest Benchmark - Runs the ingestors against the local NSE stub and reports throughput.
+
+For each symbol count, BENCHnnnnn user requests are seeded and the three
+ingestors are run end to end against nse_stub.py:
+    company_initializer   lookup + quote per company, one batched write
+    tick_historical       --days of history per symbol (default 60), fetched in
+                          grid-aligned windows (one NSE call each), so usually two per symbol
+    tick_poller           polls every symbol each cycle for --duration seconds
+                          (market calendar forced open, all symbols liquid)
+
+Reported per stage: NSE requests/s and DB rows/s, counting rows actually
+written: company_symbols rows upserted by the initializer, new tick_data
+rows for the historical loader and the poller (duplicates not counted). The
+poller also reports ticks/s and cycle latency percentiles. All BENCH% rows
+are deleted afterwards.
+
+Needs the local Postgres and Redis from .env; no network access.
+
+Usage:
+    python bench_ingest.py                                  # 100, 1000 and 5000 symbols
+    python bench_ingest.py --symbols 1000 --duration 120
+    python bench_ingest.py --latency 80 --jitter 40 --error-rate 0.01
+    python bench_ingest.py --stub-url http://127.0.0.1:8765 # Reuse a running stub
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+
+parser = argparse.ArgumentParser(description="Benchmark the ingestors against the NSE stub")
+parser.add_argument("--symbols", type=int, nargs="+", default=[100, 1000, 5000], help="Symbol counts to run")
+parser.add_argument("--duration", type=float, default=60, help="Seconds to run the tick poller per symbol count")
+parser.add_argument("--interval", type=float, default=10, help="Poll cycle length in seconds")
+parser.add_argument("--days", type=int, default=60, help="Days of history to backfill")
+parser.add_argument("--rate", type=float, default=1000, help="Client requests/second to the stub")
+parser.add_argument("--stub-url", help="Use an already running stub instead of starting one")
+parser.add_argument("--port", type=int, default=8765, help="Port for the stub this script starts")
+parser.add_argument("--latency", type=float, default=0.0, help="Stub latency in ms")
+parser.add_argument("--jitter", type=float, default=0.0, help="Stub latency jitter in ms")
+parser.add_argument("--error-rate", type=float, default=0.0, help="Stub HTTP 500 fraction")
+parser.add_argument("--throttle-rate", type=float, default=0.0, help="Stub requests/second before HTTP 429")
+args = parser.parse_args()
+
+# The NSE client reads these at import time
+STUB_URL = args.stub_url or f"http://127.0.0.1:{args.port}"
+os.environ['NSE_BASE_URL'] = STUB_URL
+os.environ['NSE_REQUESTS_PER_SECOND'] = str(args.rate)
+os.environ['NSE_BURST'] = str(max(1, int(args.rate)))
+os.environ['LIQUID_SYMBOLS'] = str(10 ** 9) # Every symbol due every cycle
+# A ring of its own, so running pollers neither share symbols with the benchmark nor lose theirs to it
+os.environ['SHARD_MEMBERS_KEY'] = "bench:poller:members"
+os.environ['SHARD_OWNER_PREFIX'] = "bench:poller:owner:"
+
+import shared
+from shared import COMPANIES_LIST, init_connections, close_connections
+import company_initializer
+import tick_historical
+import tick_poller
+from fetch_scheduler import FetchScheduler
+from market_calendar import MarketCalendar, SESSION_OPEN
+from nse_client import NSE_REQUEST_SECONDS
+from symbol_registry import SymbolRegistry
+from tick_writer import TICK_ROWS
+
+BENCH_PREFIX = "BENCH"
+
+
+# -----------------------------------------------------------
+# STUB PROCESS
+# -----------------------------------------------------------
+def start_stub_process() -> subprocess.Popen:
+    """Run nse_stub.py in its own process so it does not share our event loop."""
+    command = [
+        sys.executable, str(Path(__file__).with_name("nse_stub.py")),
+        "--port", str(args.port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--throttle-rate", str(args.throttle_rate),
+    ]
+    proc = subprocess.Popen(command)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", args.port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError(f"NSE stub did not come up on port {args.port}")
+
+
+# -----------------------------------------------------------
+# SEED + CLEANUP
+# -----------------------------------------------------------
+def bench_symbol(i: int) -> str:
+    return f"{BENCH_PREFIX}{i:05d}"
+
+
+async def seed_requests(count: int):
+    rows = [
+        (bench_symbol(i), f"Bench Company {i}", 0, datetime.now(timezone.utc), 0)
+        for i in range(1, count + 1)
+    ]
+    async with shared.DB_POOL.acquire() as conn:
+        await conn.executemany(
+            """
+            INSERT INTO user_requests
+                (symbol, company, stock_held, dated_on, investment_value,
+                 user_id, added_on, is_added, is_checked, mystocks)
+            VALUES ($1, $2, $3, $4, $5, 0, now(), false, false, false);
+            """,
+            rows,
+        )
+
+
+async def cleanup():
+    pattern = BENCH_PREFIX + "%"
+    async with shared.DB_POOL.acquire() as conn:
+        for table in ("tick_data", "backfill_checkpoints", "company_symbols", "user_requests"):
+            try:
+                await conn.execute(f"DELETE FROM {table} WHERE UPPER(symbol) LIKE $1;", pattern)
+            except Exception as e:
+                print(f"[WARN] Cleanup of {table} failed: {e}")
+
+
+async def with_connections(coro_fn):
+    await init_connections()
+    try:
+        return await coro_fn()
+    finally:
+        await close_connections()
+
+
+# -----------------------------------------------------------
+# MEASUREMENT
+# -----------------------------------------------------------
+def counter_total(counter, **labels) -> float:
+    """Sum of a counter's values, optionally only those matching `labels`."""
+    wanted = counter._key(labels) if labels else None
+    return sum(v for k, v in counter.values.items() if wanted is None or k == wanted)
+
+
+def nse_requests() -> float:
+    # Histogram values are [bucket counts..., +Inf count, sum]
+    return sum(sum(counts[:-1]) for counts in NSE_REQUEST_SECONDS.values.values())
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+# Real symbols in the database must never be initialized or polled from synthetic data
+async def load_bench_companies():
+    await shared.load_companies()
+    bench = [c for c in COMPANIES_LIST if c.upper().startswith((BENCH_PREFIX, "BENCH COMPANY "))]
+    COMPANIES_LIST[:] = bench
+
+
+class BenchRegistry(SymbolRegistry):
+    def tickers(self) -> list[str]:
+        return [t for t in super().tickers() if t.startswith(BENCH_PREFIX)]
+
+
+class AlwaysOpenCalendar(MarketCalendar):
+    def reload(self):
+        pass
+
+    def session_at(self, now):
+        return SESSION_OPEN
+
+
+class TimedScheduler(FetchScheduler):
+    """FetchScheduler that keeps every cycle duration."""
+    cycles: list[float] = []
+
+    async def run_cycle(self, tickers):
+        elapsed = await super().run_cycle(tickers)
+        if tickers:
+            TimedScheduler.cycles.append(elapsed)
+        return elapsed
+
+
+async def timed(stage: str, count: int, coro, rows_fn) -> dict:
+    requests_before, rows_before = nse_requests(), rows_fn()
+    started = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - started
+    requests = nse_requests() - requests_before
+    rows = rows_fn() - rows_before
+    result = {
+        "stage": stage,
+        "symbols": count,
+        "seconds": elapsed,
+        "requests_per_s": requests / elapsed,
+        "rows_per_s": rows / elapsed,
+    }
+    print(f"[INFO] {stage} ({count} symbols): {elapsed:.1f}s, {result['requests_per_s']:.0f} req/s, {result['rows_per_s']:.0f} rows/s")
+    return result
+
+
+async def bench_poller(count: int) -> dict:
+    """Run the real poller loop for --duration seconds with every symbol due every cycle."""
+    tick_poller.POLL_INTERVAL = args.interval
+    tick_poller.MarketCalendar = AlwaysOpenCalendar
+    tick_poller.FetchScheduler = TimedScheduler
+    tick_poller.SymbolRegistry = BenchRegistry
+    tick_poller.LAST_QUOTES.clear()
+    TimedScheduler.cycles = []
+
+    stored_before = counter_total(tick_poller.POLL_TICKS, result="stored")
+    polled_before = counter_total(tick_poller.POLL_TICKS)
+
+    async def run():
+        try:
+            await asyncio.wait_for(tick_poller.run_tick_poller(), timeout=args.duration)
+        except asyncio.TimeoutError:
+            pass
+
+    result = await timed("poller", count, run(), lambda: counter_total(TICK_ROWS, result="inserted"))
+    cycles = TimedScheduler.cycles
+    result.update({
+        "ticks_per_s": (counter_total(tick_poller.POLL_TICKS, result="stored") - stored_before) / result["seconds"],
+        "polls_per_s": (counter_total(tick_poller.POLL_TICKS) - polled_before) / result["seconds"],
+        "cycles": len(cycles),
+        "cycle_p50": percentile(cycles, 50),
+        "cycle_p95": percentile(cycles, 95),
+        "cycle_p99": percentile(cycles, 99),
+    })
+    return result
+
+
+async def bench(count: int) -> list[dict]:
+    print(f"\n=== {count} symbols ===")
+    await with_connections(cleanup)
+    await with_connections(partial(seed_requests, count))
+    symbols = [bench_symbol(i) for i in range(1, count + 1)]
+
+    try:
+        return [
+            await timed(
+                "initializer", count,
+                company_initializer.run_company_initializer(),
+                lambda: counter_total(company_initializer.INIT_ROWS),
+            ),
+            await timed(
+                "historical", count,
+                tick_historical.run_historical_loader(symbols=symbols, days=args.days),
+                lambda: counter_total(tick_historical.BACKFILL_ROWS, result="inserted"),
+            ),
+            await bench_poller(count),
+        ]
+    finally:
+        await with_connections(cleanup)
+
+
+def report(results: list[dict]):
+    print("\n" + "=" * 100)
+    print(f"{'stage':<12} {'symbols':>8} {'seconds':>8} {'req/s':>8} {'rows/s':>8} "
+          f"{'ticks/s':>8} {'cycles':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}")
+    for r in results:
+        line = (f"{r['stage']:<12} {r['symbols']:>8} {r['seconds']:>8.1f} "
+                f"{r['requests_per_s']:>8.0f} {r['rows_per_s']:>8.0f}")
+        if "ticks_per_s" in r:
+            line += (f" {r['ticks_per_s']:>8.0f} {r['cycles']:>7} "
+                     f"{r['cycle_p50']:>7.2f} {r['cycle_p95']:>7.2f} {r['cycle_p99']:>7.2f}")
+        print(line)
+
+
+async def main():
+    company_initializer.load_companies = load_bench_companies
+    results = []
+    for count in args.symbols:
+        results.extend(await bench(count))
+    report(results)
+
+
+if __name__ == "__main__":
+    stub = None if args.stub_url else start_stub_process()
+    try:
+        asyncio.run(main())
+    finally:
+        if stub is not None:
+            stub.terminate()
+            stub.wait()
@@ -10,16 +10,29 @@ Schedule with cron:
 
 import asyncio
 import json
+import time
 from datetime import datetime, timezone
+from typing import Optional
 
 import shared
 from shared import (
     COMPANIES_LIST,
-    nse,
+    INIT_WORKERS,
+    INITIALIZER_METRICS_PORT,
     init_connections,
     close_connections,
     load_companies
 )
+from nse_client import AsyncNSEClient, NSEClientError
+from metrics import Counter, Histogram, start_metrics_server, close_metrics_server
+
+# Async NSE client, created in run_company_initializer()
+NSE_CLIENT: Optional[AsyncNSEClient] = None
+
+INIT_STAGE_SECONDS = Histogram("initializer_stage_seconds", "Time per company in each initializer stage", ["stage"])
+INIT_COMPANIES = Counter("initializer_companies_total", "Companies processed by outcome", ["result"])
+INIT_QUOTES = Counter("initializer_quotes_total", "Symbol quotes by outcome", ["result"])
+INIT_ROWS = Counter("initializer_rows_total", "Company rows upserted into company_symbols")
 
 
 # -----------------------------------------------------------
@@ -83,11 +96,77 @@ def normalize_company_metadata(raw: dict):
     return comp_data
 
 
+# -----------------------------------------------------------
+# FETCH COMPANY METADATA (NO DB CONNECTION HELD)
+# -----------------------------------------------------------
+async def fetch_company_record(query: str, comp_row: dict) -> Optional[tuple]:
+    """
+    Quote one lookup result and build its company_symbols row.
+
+    Returns:
+        Parameters for UPSERT_COMPANY_SQL, or None when the symbol is skipped
+    """
+    try:
+        with INIT_STAGE_SECONDS.time(stage="quote"):
+            raw = await NSE_CLIENT.quote(comp_row["symbol"])
+    except NSEClientError as e:
+        INIT_QUOTES.inc(result="error")
+        print(f"[ERROR] Quote for {comp_row['symbol']} failed: {e}")
+        return None
+
+    with INIT_STAGE_SECONDS.time(stage="parse"):
+        comp_data = normalize_company_metadata(raw)
+    if comp_data.get('listing_date') is None:
+        INIT_QUOTES.inc(result="skipped")
+        return None
+
+    INIT_QUOTES.inc(result="ok")
+
+    return (
+        query,
+        comp_row["symbol_info"],
+        comp_row["symbol"],
+        comp_row["result_sub_type"],
+        datetime.strptime(comp_row["listing_date"], '%Y-%m-%d'),
+        comp_data.get("isin"),
+        comp_data.get("original_search"),
+        comp_data.get("is_suspended"),
+        comp_data.get("is_delisted"),
+        comp_data.get("active_series"),
+        comp_data.get("temp_suspended_series"),
+        comp_data.get("trading_status"),
+        comp_data.get("board_status"),
+        comp_data.get("segment"),
+        comp_data.get("is_fno_sec"),
+        comp_data.get("is_ca_sec"),
+        comp_data.get("is_slb_sec"),
+        comp_data.get("is_debt_sec"),
+        comp_data.get("is_etf_sec"),
+        comp_data.get("is_hybrid_symbol"),
+        comp_data.get("is_top10"),
+        comp_data.get("class_of_share"),
+        comp_data.get("face_value"),
+        comp_data.get("derivatives"),
+        comp_data.get("industry_macro"),
+        comp_data.get("industry_sector"),
+        comp_data.get("industry_group"),
+        comp_data.get("industry_basic"),
+        json.dumps(comp_data.get("misc_data", {})),
+    )
+
+
+async def fetch_company_records(query: str, results: dict) -> list[tuple]:
+    """Quote every lookup result concurrently; the client's rate limiter paces the requests."""
+    records = await asyncio.gather(*(
+        fetch_company_record(query, comp_row) for comp_row in results.get('symbols', [])
+    ))
+    return [record for record in records if record is not None]
+
+
 # -----------------------------------------------------------
 # STORE AND LOAD COMPANY SYMBOLS
 # -----------------------------------------------------------
-async def store_company_symbols(query: str, results: list[dict]):
-    sql = """INSERT INTO company_symbols (
+UPSERT_COMPANY_SQL = """INSERT INTO company_symbols (
         query, company_name, symbol, listing_type, listing_date, last_checked_date,
         isin, original_search, is_suspended, is_delisted,
         active_series, temp_suspended_series, trading_status, board_status, segment,
@@ -136,51 +215,41 @@ async def store_company_symbols(query: str, results: list[dict]):
         industry_basic = EXCLUDED.industry_basic,
         misc_data = company_symbols.misc_data || EXCLUDED.misc_data;"""
 
+# Mark every request matching a stored company name or symbol as checked in one statement
+MARK_CHECKED_SQL = """
+    UPDATE user_requests SET is_checked = true
+    WHERE NOT is_checked
+      AND (LOWER(company) = ANY($1::text[]) OR LOWER(symbol) = ANY($2::text[]));
+"""
+
+
+async def store_company_symbols(records: list[tuple]) -> int:
+    """
+    Upsert already fetched company rows and mark their user requests checked,
+    in one short transaction.
+
+    Returns:
+        Number of company rows written
+    """
+    # Last record wins when two queries returned the same symbol
+    records = list({record[2]: record for record in records}.values())
+    if not records:
+        return 0
+
+    started = time.perf_counter()
     async with shared.DB_POOL.acquire() as conn:
         async with conn.transaction():
-            for key, values in results.items():
-                if key == 'symbols':
-                    for comp_row in values:
-                        comp_data = normalize_company_metadata(nse.quote(comp_row["symbol"]))
-                        if comp_data.get('listing_date') is not None:
-                            await conn.execute(
-                                sql,
-                                query,
-                                comp_row["symbol_info"],
-                                comp_row["symbol"],
-                                comp_row["result_sub_type"],
-                                datetime.strptime(comp_row["listing_date"], '%Y-%m-%d'),
-                                comp_data.get("isin"),
-                                comp_data.get("original_search"),
-                                comp_data.get("is_suspended"),
-                                comp_data.get("is_delisted"),
-                                comp_data.get("active_series"),
-                                comp_data.get("temp_suspended_series"),
-                                comp_data.get("trading_status"),
-                                comp_data.get("board_status"),
-                                comp_data.get("segment"),
-                                comp_data.get("is_fno_sec"),
-                                comp_data.get("is_ca_sec"),
-                                comp_data.get("is_slb_sec"),
-                                comp_data.get("is_debt_sec"),
-                                comp_data.get("is_etf_sec"),
-                                comp_data.get("is_hybrid_symbol"),
-                                comp_data.get("is_top10"),
-                                comp_data.get("class_of_share"),
-                                comp_data.get("face_value"),
-                                comp_data.get("derivatives"),
-                                comp_data.get("industry_macro"),
-                                comp_data.get("industry_sector"),
-                                comp_data.get("industry_group"),
-                                comp_data.get("industry_basic"),
-                                json.dumps(comp_data.get("misc_data", {})),
-                            )
-                            print(f"{comp_row['symbol_info']} Company info Inserted")
-                            await conn.execute(
-                                f"""UPDATE user_requests SET is_checked=True where not is_checked and 
-                                LOWER(company) = LOWER('{comp_row["symbol_info"]}') OR 
-                                LOWER(symbol) = LOWER('{comp_row["symbol"]}') """
-                            )
+            await conn.executemany(UPSERT_COMPANY_SQL, records)
+            await conn.execute(
+                MARK_CHECKED_SQL,
+                [record[1].lower() for record in records],
+                [record[2].lower() for record in records],
+            )
+    elapsed = time.perf_counter() - started
+    INIT_STAGE_SECONDS.observe(elapsed, stage="db_write")
+    INIT_ROWS.inc(len(records))
+    print(f"[INFO] Stored {len(records)} companies in {elapsed:.2f}s")
+    return len(records)
 
 async def load_cached_symbols(query: str) -> list[dict]:
     sql = "SELECT symbol, last_checked_date FROM company_symbols WHERE query=$1;"
@@ -192,38 +261,48 @@ async def load_cached_symbols(query: str) -> list[dict]:
 # -----------------------------------------------------------
 # INITIALIZE COMPANIES
 # -----------------------------------------------------------
-async def initialize_symbols(company: str, force: bool = False):
+async def collect_company(company: str, force: bool = False) -> tuple[list[str], list[tuple]]:
     """
-    Initialize or update company symbols.
+    Decide whether a company needs refreshing and fetch its metadata if so.
 
     Args:
         company: Company name to search for
         force: If True, always refresh data regardless of last check date
+
+    Returns:
+        (symbols, records) - records is empty when the cached data is recent
     """
     # Load from database first
     cached = await load_cached_symbols(company)
 
     if cached and not force:
-        print("Loaded symbols from DB:", cached)
         min_date = min(cached, key=lambda r: r["last_checked_date"])["last_checked_date"]
         if (datetime.now(timezone.utc) - min_date).days <= 30:
-            print("Company data is recent (< 30 days). Skipping refresh.")
-            return [row.get('symbol') for row in cached]
-        print("Company Last Check more than 30 days ago. Refreshing...")
-
-    # Fetch using python-nse
-    loop = asyncio.get_running_loop()
-    lookup_results = await loop.run_in_executor(None, nse.lookup, company)
+            print(f"{company}: company data is recent (< 30 days). Skipping refresh.")
+            INIT_COMPANIES.inc(result="cached")
+            return [row.get('symbol') for row in cached], []
+        print(f"{company}: last check more than 30 days ago. Refreshing...")
 
+    with INIT_STAGE_SECONDS.time(stage="lookup"):
+        lookup_results = await NSE_CLIENT.lookup(company)
     if not lookup_results:
         raise Exception(f"No symbols found for query: {company}")
 
-    # Store results
-    await store_company_symbols(company, lookup_results)
+    records = await fetch_company_records(company, lookup_results)
+    INIT_COMPANIES.inc(result="refreshed")
+    return [record[2] for record in records], records
+
 
-    # Return updated symbols
-    updated = await load_cached_symbols(company)
-    symbols = [row.get('symbol') for row in updated]
+async def initialize_symbols(company: str, force: bool = False):
+    """
+    Initialize or update the symbols of one company (NSE_CLIENT must be started).
+
+    Args:
+        company: Company name to search for
+        force: If True, always refresh data regardless of last check date
+    """
+    symbols, records = await collect_company(company, force=force)
+    await store_company_symbols(records)
     print("Fetched & stored symbols:", symbols)
     return symbols
 
@@ -235,23 +314,45 @@ async def run_company_initializer(force: bool = False):
     """
     Run the company initializer for all companies in COMPANIES_LIST.
 
+    Companies are looked up INIT_WORKERS at a time and their quotes fetched
+    concurrently; nothing touches the database until every fetch is done,
+    then all rows are written in one batch.
+
     Args:
         force: If True, refresh all companies regardless of last check date
     """
+    global NSE_CLIENT
     await init_connections()
     await load_companies()
+    NSE_CLIENT = AsyncNSEClient()
 
+    metrics_server = None
     try:
-        all_symbols = []
-        for company in COMPANIES_LIST:
-            print(f"\nInitializing company: {company}")
-            symbols = await initialize_symbols(company, force=force)
-            all_symbols.extend(symbols)
+        metrics_server = await start_metrics_server(INITIALIZER_METRICS_PORT)
+        await NSE_CLIENT.start()
+        companies = list(dict.fromkeys(company for company in COMPANIES_LIST if company))
+        semaphore = asyncio.Semaphore(INIT_WORKERS)
+
+        async def collect(company: str):
+            async with semaphore:
+                try:
+                    return await collect_company(company, force=force)
+                except Exception as e:
+                    INIT_COMPANIES.inc(result="error")
+                    print(f"[ERROR] Initializing {company} failed: {e}")
+                    return [], []
+
+        results = await asyncio.gather(*(collect(company) for company in companies))
+
+        all_symbols = list(dict.fromkeys(symbol for symbols, _ in results for symbol in symbols))
+        await store_company_symbols([record for _, records in results for record in records])
 
         print(f"\nTotal symbols initialized: {len(all_symbols)}")
         print("Symbols:", all_symbols)
         return all_symbols
     finally:
+        await NSE_CLIENT.close()
+        await close_metrics_server(metrics_server)
         await close_connections()
 
 
@@ -0,0 +1,167 @@
+"""
+Fetch Scheduler - Spreads one polling cycle evenly across its time slot.
+
+Instead of firing every symbol at the top of the minute, each symbol gets its
+own start offset inside the cycle. A fixed pool of workers picks symbols up
+when they are due and runs the handler. Cycles that run past their slot are
+reported.
+
+Rate limiting normally happens per request inside AsyncNSEClient; pass a
+`bucket` only when the handler does not limit itself.
+
+PollPlanner decides which symbols are due in a cycle: watched and liquid
+symbols every cycle during the session, the rest less often, and nothing
+while the market is closed.
+
+Usage:
+    scheduler = FetchScheduler(fetch_and_process_data)
+    elapsed = await scheduler.run_cycle(planner.due(ticker_list, session))
+"""
+
+import asyncio
+import math
+from typing import Awaitable, Callable, Optional
+
+from shared import (
+    POLL_WORKERS,
+    LIQUID_SYMBOLS,
+    ILLIQUID_POLL_INTERVAL,
+    OFF_SESSION_POLL_INTERVAL,
+)
+from rate_limit import TokenBucket
+from metrics import Counter, Gauge, Histogram, log_sampled
+from market_calendar import SESSION_OPEN, SESSION_CLOSED
+
+POLL_CYCLE_SECONDS = Histogram("poll_cycle_seconds", "Duration of one poll cycle",
+                               buckets=(1, 5, 10, 20, 30, 45, 60, 90, 120, 300))
+POLL_CYCLE_OVERRUNS = Counter("poll_cycle_overruns_total", "Cycles that ran past their slot")
+POLL_INTERVAL_SECONDS = Gauge("poll_interval_seconds", "Length of the poll slot")
+POLL_SYMBOLS_DUE = Gauge("poll_symbols_due", "Symbols fetched in the latest cycle")
+POLL_QUEUE_DEPTH = Gauge("poll_queue_depth", "Symbols of the current cycle not yet started")
+
+
+class FetchScheduler:
+    def __init__(
+        self,
+        handler: Callable[[str], Awaitable[None]],
+        interval: float = 60,
+        workers: int = POLL_WORKERS,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        """
+        Args:
+            handler: Coroutine function called once per symbol
+            interval: Length of one cycle in seconds
+            workers: Maximum number of symbols fetched at the same time
+            bucket: Optional rate limiter taken once per symbol
+        """
+        self.handler = handler
+        self.interval = interval
+        self.workers = workers
+        self.bucket = bucket
+        self.overruns = 0
+
+    async def _worker(self, queue: asyncio.Queue, cycle_start: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                offset, ticker = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            POLL_QUEUE_DEPTH.set(queue.qsize())
+
+            delay = cycle_start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            try:
+                await self.handler(ticker)
+            except Exception as e:
+                log_sampled("poll_error", f"[ERROR] {ticker}: {e}")
+
+    async def run_cycle(self, tickers: list[str]) -> float:
+        """
+        Run the handler once for every ticker, spread across the interval.
+
+        Returns:
+            Seconds the cycle took
+        """
+        loop = asyncio.get_running_loop()
+        cycle_start = loop.time()
+        POLL_INTERVAL_SECONDS.set(self.interval)
+        POLL_SYMBOLS_DUE.set(len(tickers))
+
+        if not tickers:
+            return 0.0
+
+        # Even spacing: symbol i starts at i * (interval / n)
+        spacing = self.interval / len(tickers)
+        queue: asyncio.Queue = asyncio.Queue()
+        for i, ticker in enumerate(tickers):
+            queue.put_nowait((i * spacing, ticker))
+
+        workers = [
+            asyncio.create_task(self._worker(queue, cycle_start))
+            for _ in range(min(self.workers, len(tickers)))
+        ]
+        await asyncio.gather(*workers)
+
+        elapsed = loop.time() - cycle_start
+        POLL_CYCLE_SECONDS.observe(elapsed)
+        if elapsed > self.interval:
+            self.overruns += 1
+            POLL_CYCLE_OVERRUNS.inc()
+            print(
+                f"[WARN] Poll cycle overran its slot: {elapsed:.1f}s > {self.interval}s "
+                f"({len(tickers)} symbols, {self.overruns} overruns so far)"
+            )
+        return elapsed
+
+
+class PollPlanner:
+    def __init__(self, interval: float = 60, liquid_symbols: int = LIQUID_SYMBOLS):
+        """
+        Args:
+            interval: Length of one cycle in seconds
+            liquid_symbols: How many of the most traded symbols count as liquid
+        """
+        self.interval = interval
+        self.liquid_symbols = liquid_symbols
+        self.watched: set[str] = set()
+        self.traded_value: dict[str, float] = {}
+        self.last_cycle: dict[str, int] = {}
+        self.cycle = 0
+        self._liquid: set[str] = set()
+
+    def record(self, symbol: str, close: float, volume: int):
+        """Remember the symbol's traded value from its latest quote."""
+        self.traded_value[symbol] = close * volume
+
+    def _cycles_between_polls(self, symbol: str, session: str) -> int:
+        if symbol in self.watched:
+            return 1
+        if session == SESSION_OPEN:
+            seconds = self.interval if symbol in self._liquid else ILLIQUID_POLL_INTERVAL
+        else:
+            seconds = OFF_SESSION_POLL_INTERVAL
+        return max(1, math.ceil(seconds / self.interval))
+
+    def due(self, tickers: list[str], session: str) -> list[str]:
+        """Symbols to poll in the next cycle; counts the cycle."""
+        if session == SESSION_CLOSED:
+            return []
+
+        self.cycle += 1
+        ranked = sorted(self.traded_value, key=self.traded_value.get, reverse=True)
+        self._liquid = set(ranked[:self.liquid_symbols])
+
+        due = [
+            ticker for ticker in tickers
+            if ticker not in self.last_cycle
+            or self.cycle - self.last_cycle[ticker] >= self._cycles_between_polls(ticker, session)
+        ]
+        for ticker in due:
+            self.last_cycle[ticker] = self.cycle
+        return due
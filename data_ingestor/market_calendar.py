@@ -0,0 +1,97 @@
+"""
+Market Calendar - NSE equity session times and trading holidays.
+
+Sessions (IST, Monday to Friday):
+    pre-open     09:00 - 09:15
+    regular      09:15 - 15:30
+    post-close   15:30 - 16:00   (closing price settles, closing session)
+
+Holidays are read from a local JSON file (NSE_HOLIDAYS_FILE, default
+nse_holidays.json next to this module):
+    {"holidays": ["2025-02-26", "2025-03-14", ...]}
+Update it when NSE publishes the next year's list; a warning is printed when
+the current year has no entries. A file that cannot be parsed is reported
+and the previously loaded holidays are kept.
+"""
+
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from shared import DIR
+
+# IST timezone offset
+IST = timezone(timedelta(hours=5, minutes=30))
+
+HOLIDAYS_FILE = Path(os.getenv('NSE_HOLIDAYS_FILE', DIR / "nse_holidays.json"))
+
+SESSION_PREOPEN = "preopen"
+SESSION_OPEN = "open"
+SESSION_POSTCLOSE = "postclose"
+SESSION_CLOSED = "closed"
+
+# (session, start, end) in IST, in order
+SESSIONS = [
+    (SESSION_PREOPEN, time(9, 0), time(9, 15)),
+    (SESSION_OPEN, time(9, 15), time(15, 30)),
+    (SESSION_POSTCLOSE, time(15, 30), time(16, 0)),
+]
+
+
+class MarketCalendar:
+    def __init__(self, holidays_file: Path = HOLIDAYS_FILE):
+        self.holidays_file = holidays_file
+        self.holidays: set[date] = set()
+        self._loaded_mtime: Optional[float] = None
+
+    def reload(self):
+        """Re-read the holiday file if it changed since the last read."""
+        try:
+            mtime = self.holidays_file.stat().st_mtime
+        except OSError:
+            if self._loaded_mtime is None:
+                print(f"[WARN] No holiday file at {self.holidays_file}; only weekends are closed")
+                self._loaded_mtime = 0.0
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        # Remember the mtime even on failure, so a bad edit is reported once, not every cycle
+        self._loaded_mtime = mtime
+        try:
+            data = json.loads(self.holidays_file.read_text())
+            holidays = {date.fromisoformat(d) for d in data.get("holidays", [])}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"[ERROR] Could not read {self.holidays_file} ({e}); keeping the previous {len(self.holidays)} holidays")
+            return
+        self.holidays = holidays
+
+        year = datetime.now(IST).year
+        if not any(d.year == year for d in self.holidays):
+            print(f"[WARN] {self.holidays_file} lists no holidays for {year}")
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def session_at(self, now: datetime) -> str:
+        """Session in progress at `now` (timezone-aware)."""
+        local = now.astimezone(IST)
+        if not self.is_trading_day(local.date()):
+            return SESSION_CLOSED
+        for session, start, end in SESSIONS:
+            if start <= local.time() < end:
+                return session
+        return SESSION_CLOSED
+
+    def next_open(self, now: datetime) -> datetime:
+        """Start of the next pre-open session after `now` (UTC)."""
+        local = now.astimezone(IST)
+        day = local.date()
+        first_start = SESSIONS[0][1]
+        if local.time() >= first_start:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, first_start, tzinfo=IST).astimezone(timezone.utc)
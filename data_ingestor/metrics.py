@@ -0,0 +1,215 @@
+"""
+Metrics - In-process counters, gauges and histograms with a scrape endpoint.
+
+Each ingestor process serves its metrics in the Prometheus text format on
+http://127.0.0.1:<port>/metrics (the port is passed by the entry point).
+Recording a sample is a dict update, so it is cheap enough for the per-tick
+hot path.
+
+Logging of per-tick events goes through `log_sampled()` instead of print:
+at most one line per key per interval, plus a count of what was suppressed,
+written by a background thread so the event loop never waits on stdout.
+
+Usage:
+    FETCH_SECONDS = Histogram("nse_fetch_seconds", "NSE request latency", ["endpoint"])
+    with FETCH_SECONDS.time(endpoint="quote"):
+        ...
+    server = await start_metrics_server(9101)
+    ...
+    await close_metrics_server(server)
+"""
+
+import asyncio
+import bisect
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Latency buckets in seconds, from fast DB writes to slow NSE retries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REGISTRY: list = []
+
+
+def _label_value(value) -> str:
+    """Label value escaped as the text format requires (backslash, double quote, newline)."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_label_value(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        return super().render() + [
+            f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in self.values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time from `callback`."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        if self.callback is not None:
+            try:
+                self.values[()] = self.callback()
+            except Exception:
+                self.values.pop((), None)
+        return super().render() + [
+            f"{self.name}{_labels(self.label_names, key)} {value}" for key, value in self.values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self.values.get(key)
+        if counts is None:
+            counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le_labels = _labels(self.label_names + ("le",), key + (str(bound),))
+                lines.append(f"{self.name}_bucket{le_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# -----------------------------------------------------------
+# SCRAPE ENDPOINT
+# -----------------------------------------------------------
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        # Drain the headers; the body of a GET is empty
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        if request_line.split(b" ")[1:2] == [b"/metrics"]:
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1") -> Optional[asyncio.AbstractServer]:
+    """Serve /metrics in the background; a busy port only disables the endpoint."""
+    try:
+        server = await asyncio.start_server(_handle, host, port)
+    except OSError as e:
+        print(f"[WARN] Metrics endpoint disabled, cannot bind {host}:{port}: {e}")
+        return None
+    print(f"Metrics at http://{host}:{port}/metrics")
+    return server
+
+
+async def close_metrics_server(server: Optional[asyncio.AbstractServer]):
+    """Stop a server from start_metrics_server() and free its port."""
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+
+# -----------------------------------------------------------
+# SAMPLED, NON-BLOCKING LOGGING
+# -----------------------------------------------------------
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_logger = logging.getLogger("data_ingestor")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+_listener.start()
+
+# key -> (last emitted at, suppressed since then)
+_sampled: dict[str, tuple[float, int]] = {}
+
+
+def log_sampled(key: str, message: str, interval: float = 10.0):
+    """Log `message` unless another one with the same key was logged in the last `interval` seconds."""
+    now = time.monotonic()
+    last, suppressed = _sampled.get(key, (0.0, 0))
+    if now - last < interval:
+        _sampled[key] = (last, suppressed + 1)
+        return
+    if suppressed:
+        message = f"{message} (+{suppressed} similar suppressed)"
+    _sampled[key] = (now, 0)
+    _logger.info(message)
@@ -0,0 +1,197 @@
+"""
+NSE Client - asyncio-native HTTP client for the NSE endpoints used by the ingestors.
+
+One keep-alive connection pool is shared by every request. The cookie
+bootstrap is redone automatically when NSE answers 401/403 or a non-JSON
+page, and throttling or transient failures are retried with jittered
+exponential backoff. Every request takes a token from the shared per-host
+rate limiter.
+
+Usage:
+    async with AsyncNSEClient() as client:
+        quote = await client.equity_quote("RELIANCE")
+
+Point `base_url` at a local stub server to run without network access.
+"""
+
+import asyncio
+import os
+import random
+from datetime import date
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from shared import (
+    BASE_URL,
+    DEFAULT_HEADERS,
+    NSE_MAX_CONNECTIONS,
+    NSE_MAX_RETRIES,
+    NSE_BACKOFF_BASE,
+    NSE_BACKOFF_CAP,
+)
+from rate_limit import TokenBucket, bucket_for
+from metrics import Counter, Histogram
+
+# Responses that mean the session cookies are missing or expired
+AUTH_STATUSES = {401, 403}
+
+# Responses worth retrying after a pause
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+NSE_REQUEST_SECONDS = Histogram("nse_request_seconds", "Latency of one NSE HTTP attempt", ["endpoint"])
+NSE_RATE_LIMIT_WAIT_SECONDS = Histogram("nse_rate_limit_wait_seconds", "Time spent waiting for a rate-limit token")
+NSE_REQUEST_ERRORS = Counter("nse_request_errors_total", "Failed NSE attempts", ["endpoint", "reason"])
+
+
+class NSEClientError(Exception):
+    """Raised when a request still fails after all retries."""
+
+
+class AsyncNSEClient:
+    def __init__(
+        self,
+        base_url: str = BASE_URL,
+        max_connections: int = NSE_MAX_CONNECTIONS,
+        max_retries: int = NSE_MAX_RETRIES,
+        proxy: Optional[str] = os.getenv('PROXY'),
+        bucket: TokenBucket = None,
+        timeout: float = 15,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.bucket = bucket or bucket_for(urlparse(self.base_url).netloc)
+        self.client = httpx.AsyncClient(
+            headers={**DEFAULT_HEADERS, "Referer": self.base_url, "Origin": self.base_url},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+            proxy=proxy or None,
+            follow_redirects=True,
+        )
+        self._cookie_lock = asyncio.Lock()
+        self._cookie_generation = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        """Run the initial cookie bootstrap."""
+        try:
+            await self._init_cookies(self._cookie_generation)
+        except httpx.TransportError as e:
+            raise NSEClientError(f"Cookie bootstrap failed: {e}") from e
+
+    async def close(self):
+        await self.client.aclose()
+
+    # -----------------------------------------------------------
+    # SESSION HANDLING
+    # -----------------------------------------------------------
+    async def _init_cookies(self, seen_generation: int):
+        """
+        Mandatory cookie bootstrap. Concurrent callers that hit an auth error
+        with the same cookie generation only trigger one refresh.
+        """
+        async with self._cookie_lock:
+            if seen_generation != self._cookie_generation:
+                return
+            await self.bucket.acquire()
+            await self.client.get(self.base_url + "/", timeout=10)
+            self._cookie_generation += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying workers from hitting NSE in lockstep
+        return random.uniform(0, min(NSE_BACKOFF_CAP, NSE_BACKOFF_BASE * 2 ** attempt))
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        """GET `path` relative to base_url and decode the JSON body."""
+        url = self.base_url + path
+        last_error = None
+        stale_generation = None # Cookie generation that got an auth error
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Refreshing cookies is a request too, so it fails and retries like one
+                if stale_generation is not None:
+                    await self._init_cookies(stale_generation)
+                    stale_generation = None
+                generation = self._cookie_generation
+                with NSE_RATE_LIMIT_WAIT_SECONDS.time():
+                    await self.bucket.acquire()
+                with NSE_REQUEST_SECONDS.time(endpoint=path):
+                    resp = await self.client.get(url, params=params)
+            except httpx.TransportError as e:
+                NSE_REQUEST_ERRORS.inc(endpoint=path, reason=type(e).__name__)
+                last_error = e
+            else:
+                if resp.status_code == 200:
+                    try:
+                        return resp.json()
+                    except ValueError as e:
+                        # NSE serves HTML block pages with a 200 when it dislikes a session
+                        NSE_REQUEST_ERRORS.inc(endpoint=path, reason="invalid_json")
+                        last_error = NSEClientError(f"Invalid JSON for {path}: {e}")
+                        stale_generation = generation
+                else:
+                    NSE_REQUEST_ERRORS.inc(endpoint=path, reason=resp.status_code)
+                    last_error = NSEClientError(f"HTTP {resp.status_code} for {path}")
+                    if resp.status_code in AUTH_STATUSES:
+                        stale_generation = generation
+                        continue
+                    if resp.status_code not in RETRY_STATUSES:
+                        raise last_error
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        raise NSEClientError(f"Giving up on {path} after {self.max_retries + 1} attempts: {last_error}")
+
+    # -----------------------------------------------------------
+    # ENDPOINTS
+    # -----------------------------------------------------------
+    async def quote(self, symbol: str, section: Optional[str] = None) -> dict:
+        """Raw equity quote, as returned by nse.quote()."""
+        params = {"symbol": symbol}
+        if section:
+            params["section"] = section
+        return await self.get_json("/api/quote-equity", params)
+
+    async def equity_quote(self, symbol: str) -> dict:
+        """Condensed OHLCV quote, in the same shape as nse.equityQuote()."""
+        q, trade = await asyncio.gather(
+            self.quote(symbol),
+            self.quote(symbol, section="trade_info"),
+        )
+        price = q["priceInfo"]
+        return {
+            "date": q["metadata"]["lastUpdateTime"],
+            "open": price["open"],
+            "high": price["intraDayHighLow"]["max"],
+            "low": price["intraDayHighLow"]["min"],
+            "close": price["close"] or price["lastPrice"],
+            "volume": trade["securityWiseDP"]["quantityTraded"],
+        }
+
+    async def lookup(self, query: str) -> dict:
+        """Symbol search, as returned by nse.lookup()."""
+        return await self.get_json("/api/search/autocomplete", {"q": query})
+
+    async def historical(self, symbol: str, start_date: date, end_date: date, series: str = "EQ"):
+        """Daily trade history for one symbol (NSE accepts at most 60 days per call)."""
+        payload = {
+            "functionName": "getHistoricalTradeData",
+            "symbol": symbol,
+            "series": series,
+            "fromDate": start_date.strftime('%d-%m-%Y'),
+            "toDate": end_date.strftime('%d-%m-%Y'),
+        }
+        return await self.get_json("/api/NextApi/apiClient/GetQuoteApi", payload)
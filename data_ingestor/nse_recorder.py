@@ -0,0 +1,120 @@
+"""
+NSE Recorder - Captures real NSE responses as fixtures for nse_stub.py.
+
+Every quote, lookup and historical response fetched through the recording
+client is saved as JSON under FIXTURE_DIR:
+    fixtures/nse/quote/RELIANCE.json
+    fixtures/nse/quote_trade_info/RELIANCE.json
+    fixtures/nse/lookup/reliance.json
+    fixtures/nse/historical/RELIANCE.json
+
+Usage:
+    python nse_recorder.py RELIANCE TCS INFY           # Record quote, lookup and 60 days of history
+    python nse_recorder.py RELIANCE --days 30 --out /tmp/nse
+"""
+
+import asyncio
+import json
+import os
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+from shared import DIR, HISTORY_WINDOW_DAYS
+from nse_client import AsyncNSEClient
+
+FIXTURE_DIR = Path(os.getenv('NSE_FIXTURE_DIR', DIR / "fixtures" / "nse"))
+
+# Request path -> fixture kind
+ENDPOINT_KINDS = {
+    "/api/quote-equity": "quote",
+    "/api/search/autocomplete": "lookup",
+    "/api/NextApi/apiClient/GetQuoteApi": "historical",
+}
+
+
+# -----------------------------------------------------------
+# FIXTURE LAYOUT (shared with nse_stub.py)
+# -----------------------------------------------------------
+def fixture_key(path: str, params: dict) -> Optional[tuple[str, str]]:
+    """(kind, key) a request is stored under, or None for paths that are not recorded."""
+    kind = ENDPOINT_KINDS.get(path)
+    if kind == "quote":
+        section = params.get("section")
+        return (f"quote_{section}" if section else "quote"), params["symbol"]
+    if kind == "lookup":
+        return kind, params["q"].lower()
+    if kind == "historical":
+        return kind, params["symbol"]
+    return None
+
+
+def fixture_name(key: str) -> str:
+    """File stem for a fixture key."""
+    return re.sub(r"[^A-Za-z0-9_.&-]+", "_", key)
+
+
+def fixture_file(root: Path, kind: str, key: str) -> Path:
+    return root / kind / (fixture_name(key) + ".json")
+
+
+def load_fixtures(root: Path = FIXTURE_DIR) -> dict[str, dict[str, object]]:
+    """Every recorded response, as {kind: {fixture_name(key): body}}."""
+    fixtures: dict[str, dict[str, object]] = {}
+    if not root.is_dir():
+        return fixtures
+    for path in root.glob("*/*.json"):
+        fixtures.setdefault(path.parent.name, {})[path.stem] = json.loads(path.read_text())
+    return fixtures
+
+
+# -----------------------------------------------------------
+# RECORDING CLIENT
+# -----------------------------------------------------------
+class RecordingNSEClient(AsyncNSEClient):
+    """AsyncNSEClient that writes every successful JSON response to disk."""
+
+    def __init__(self, out_dir: Path = FIXTURE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.out_dir = out_dir
+        self.recorded = 0
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        data = await super().get_json(path, params)
+        key = fixture_key(path, params or {})
+        if key is not None:
+            target = fixture_file(self.out_dir, *key)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(json.dumps(data, indent=1))
+            self.recorded += 1
+        return data
+
+
+async def record(symbols: list[str], days: int = HISTORY_WINDOW_DAYS, out_dir: Path = FIXTURE_DIR):
+    end_date = date.today() - timedelta(days=1)
+    start_date = end_date - timedelta(days=min(days, HISTORY_WINDOW_DAYS))
+
+    async with RecordingNSEClient(out_dir=out_dir) as client:
+        for symbol in symbols:
+            try:
+                await client.equity_quote(symbol)
+                await client.lookup(symbol)
+                await client.historical(symbol, start_date, end_date)
+                print(f"[INFO] Recorded {symbol}")
+            except Exception as e:
+                print(f"[ERROR] Recording {symbol} failed: {e}")
+
+    print(f"\n[SUCCESS] Wrote {client.recorded} fixtures to {out_dir}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record NSE responses for the offline stub")
+    parser.add_argument("symbols", nargs="+", help="Symbols to record")
+    parser.add_argument("--days", type=int, default=HISTORY_WINDOW_DAYS, help="Days of history to record")
+    parser.add_argument("--out", type=Path, default=FIXTURE_DIR, help="Fixture directory")
+    args = parser.parse_args()
+
+    asyncio.run(record([s.upper() for s in args.symbols], days=args.days, out_dir=args.out))
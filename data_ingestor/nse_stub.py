@@ -0,0 +1,281 @@
+"""
+NSE Stub - Local HTTP server that stands in for nseindia.com.
+
+Serves the endpoints AsyncNSEClient uses (cookie bootstrap, quote-equity,
+search/autocomplete, GetQuoteApi historical) from fixtures recorded by
+nse_recorder.py. Symbols without a recording are answered from another
+symbol's recording with the symbol swapped, or from a built-in synthetic
+response when nothing is recorded, so any number of symbols can be served.
+
+Quote prices move a little and lastUpdateTime is set to now on every
+request (disable with --frozen), so the poller sees fresh ticks.
+
+Latency, failures and throttling are configurable:
+    --latency 80 --jitter 40       # 80ms +/- 40ms per response
+    --error-rate 0.01              # 1% HTTP 500
+    --auth-error-rate 0.001        # 0.1% HTTP 401 (forces a cookie refresh)
+    --throttle-rate 50             # HTTP 429 above 50 requests/second
+
+Usage:
+    python nse_stub.py --port 8765
+    NSE_BASE_URL=http://127.0.0.1:8765 python tick_poller.py
+"""
+
+import asyncio
+import json
+import random
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from nse_recorder import FIXTURE_DIR, fixture_key, fixture_name, load_fixtures
+from market_calendar import IST
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.0 # seconds
+    jitter: float = 0.0 # seconds
+    error_rate: float = 0.0
+    auth_error_rate: float = 0.0
+    throttle_rate: float = 0.0 # requests/second, 0 = unlimited
+    frozen: bool = False
+
+
+# -----------------------------------------------------------
+# SYNTHETIC RESPONSES
+# -----------------------------------------------------------
+def base_price(symbol: str) -> float:
+    """Stable per-symbol starting price between 50 and 5000."""
+    return 50 + zlib.crc32(symbol.encode()) % 495000 / 100
+
+
+def synthetic_quote(symbol: str, price: float, section: Optional[str]) -> dict:
+    if section == "trade_info":
+        return {"securityWiseDP": {"quantityTraded": zlib.crc32(symbol.encode()) % 1000000 + 1000}}
+    return {
+        "info": {
+            "symbol": symbol,
+            "companyName": f"{symbol} Ltd",
+            "isin": f"INE{zlib.crc32(symbol.encode()):09d}"[:12],
+            "listingDate": "2000-01-03",
+            "isSuspended": False,
+            "isDelisted": False,
+            "activeSeries": ["EQ"],
+            "tempSuspendedSeries": [],
+            "segment": "EQUITY",
+        },
+        "metadata": {"series": "EQ", "symbol": symbol, "lastUpdateTime": ""},
+        "securityInfo": {"tradingStatus": "Active", "boardStatus": "Main", "classOfShare": "Equity", "faceValue": 10},
+        "industryInfo": {"macro": "Synthetic", "sector": "Synthetic", "industry": "Synthetic", "basicIndustry": "Synthetic"},
+        "priceInfo": {
+            "lastPrice": price,
+            "open": round(price * 0.99, 2),
+            "close": 0,
+            "intraDayHighLow": {"min": round(price * 0.98, 2), "max": round(price * 1.02, 2)},
+        },
+    }
+
+
+def synthetic_lookup(query: str) -> dict:
+    symbol = "".join(ch for ch in query.upper() if ch.isalnum())[:20] or "UNKNOWN"
+    # Bench companies are named "Bench Company <n>" and map to BENCH<n>
+    if query.lower().startswith("bench company "):
+        symbol = f"BENCH{int(query.split()[-1]):05d}"
+    return {"symbols": [{
+        "symbol": symbol,
+        "symbol_info": query,
+        "result_sub_type": "equity",
+        "listing_date": "2000-01-03",
+    }]}
+
+
+def synthetic_history(symbol: str, start: date, end: date) -> list[dict]:
+    rows = []
+    rng = random.Random(symbol)
+    price = base_price(symbol)
+    day = start
+    while day <= end:
+        if day.weekday() < 5:
+            price = max(1.0, price * (1 + rng.uniform(-0.02, 0.02)))
+            rows.append({
+                "mtimestamp": day.strftime("%d-%b-%Y"),
+                "chOpeningPrice": round(price * 0.995, 2),
+                "chTradeHighPrice": round(price * 1.01, 2),
+                "chTradeLowPrice": round(price * 0.99, 2),
+                "chClosingPrice": round(price, 2),
+                "chTotTradedQty": rng.randint(1000, 1000000),
+            })
+        day += timedelta(days=1)
+    return rows
+
+
+# -----------------------------------------------------------
+# REPLAY
+# -----------------------------------------------------------
+class NSEStub:
+    def __init__(self, config: StubConfig, fixture_dir: Path = FIXTURE_DIR):
+        self.config = config
+        self.fixtures = load_fixtures(fixture_dir)
+        self.prices: dict[str, float] = {}
+        self.requests = 0
+        self.started = datetime.now(IST)
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def _recorded(self, kind: str, key: str):
+        """Exact recording, else another symbol's recording with the symbol swapped, else None."""
+        recorded = self.fixtures.get(kind)
+        if not recorded:
+            return None
+        name = fixture_name(key)
+        if name in recorded:
+            return recorded[name]
+        if kind == "lookup":
+            return None
+        template_key = sorted(recorded)[zlib.crc32(key.encode()) % len(recorded)]
+        return json.loads(json.dumps(recorded[template_key]).replace(f'"{template_key}"', f'"{key}"'))
+
+    def _next_price(self, symbol: str) -> float:
+        price = self.prices.get(symbol) or base_price(symbol)
+        if not self.config.frozen:
+            price = max(1.0, price * (1 + random.uniform(-0.002, 0.002)))
+        self.prices[symbol] = round(price, 2)
+        return self.prices[symbol]
+
+    def _quote(self, params: dict, kind: str) -> dict:
+        symbol = params["symbol"]
+        section = params.get("section")
+        body = self._recorded(kind, symbol)
+        if body is None:
+            body = synthetic_quote(symbol, self._next_price(symbol), section)
+        elif section is None and not self.config.frozen:
+            price = self._next_price(symbol)
+            body["priceInfo"]["lastPrice"] = price
+            body["priceInfo"]["close"] = 0
+        if section is None and not (self.config.frozen and body["metadata"]["lastUpdateTime"]):
+            updated = self.started if self.config.frozen else datetime.now(IST)
+            body["metadata"]["lastUpdateTime"] = updated.strftime("%d-%b-%Y %H:%M:%S")
+        return body
+
+    def respond(self, path: str, params: dict) -> tuple[int, object]:
+        """(status, JSON body) for one request."""
+        if path == "/":
+            return 200, {}
+
+        key = fixture_key(path, params)
+        if key is None:
+            return 404, {"error": f"No stub for {path}"}
+        kind, name = key
+
+        if kind.startswith("quote"):
+            return 200, self._quote(params, kind)
+        if kind == "lookup":
+            return 200, self._recorded(kind, name) or synthetic_lookup(params["q"])
+
+        body = self._recorded(kind, name)
+        if body is None:
+            start = datetime.strptime(params["fromDate"], "%d-%m-%Y").date()
+            end = datetime.strptime(params["toDate"], "%d-%m-%Y").date()
+            body = synthetic_history(name, start, end)
+        return 200, body
+
+    def _throttled(self) -> bool:
+        if not self.config.throttle_rate:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1.0:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.config.throttle_rate
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one keep-alive connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+
+                target = urlsplit(request_line.split(b" ")[1].decode())
+                params = dict(parse_qsl(target.query))
+                self.requests += 1
+
+                delay = self.config.latency + random.uniform(-self.config.jitter, self.config.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if self._throttled():
+                    status, body = 429, {"error": "Too Many Requests"}
+                elif random.random() < self.config.auth_error_rate:
+                    status, body = 401, {"error": "Unauthorized"}
+                elif random.random() < self.config.error_rate:
+                    status, body = 500, {"error": "Internal Server Error"}
+                else:
+                    try:
+                        status, body = self.respond(target.path or "/", params)
+                    except (KeyError, ValueError) as e:
+                        status, body = 400, {"error": str(e)}
+
+                payload = json.dumps(body).encode()
+                headers = [
+                    f"HTTP/1.1 {status} STUB",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(payload)}",
+                    "Connection: keep-alive",
+                ]
+                if target.path == "/":
+                    headers.append("Set-Cookie: nsit=stub; Path=/")
+                writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + payload)
+                await writer.drain()
+        except (ConnectionError, IndexError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start_stub(config: StubConfig, host: str = "127.0.0.1", port: int = 8765,
+                     fixture_dir: Path = FIXTURE_DIR) -> tuple[NSEStub, asyncio.AbstractServer]:
+    stub = NSEStub(config, fixture_dir)
+    server = await asyncio.start_server(stub.handle, host, port)
+    return stub, server
+
+
+async def run_stub(config: StubConfig, host: str, port: int, fixture_dir: Path):
+    stub, server = await start_stub(config, host, port, fixture_dir)
+    recorded = sum(len(v) for v in stub.fixtures.values())
+    print(f"NSE stub at http://{host}:{port} ({recorded} recorded responses from {fixture_dir})")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded NSE responses locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", type=Path, default=FIXTURE_DIR, help="Fixture directory")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument("--auth-error-rate", type=float, default=0.0, help="Fraction of HTTP 401 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Requests/second before HTTP 429 (0 = off)")
+    parser.add_argument("--frozen", action="store_true", help="Serve unchanging quotes")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        auth_error_rate=args.auth_error_rate,
+        throttle_rate=args.throttle_rate,
+        frozen=args.frozen,
+    )
+    asyncio.run(run_stub(config, args.host, args.port, args.fixtures))
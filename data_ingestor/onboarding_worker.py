@@ -0,0 +1,241 @@
+"""
+Onboarding Worker - Makes newly requested stocks chartable within minutes.
+
+save_user_request queues one row in onboarding_jobs per requested symbol
+(repeat requests for the same symbol share the open job) and fires
+NOTIFY onboarding_jobs. Each job:
+    1. resolves the company/symbol and upserts it into company_symbols,
+       which makes the running tick poller start polling it (LISTEN/NOTIFY)
+    2. backfills its daily history, skipping windows already checkpointed
+
+Jobs are claimed with FOR UPDATE SKIP LOCKED, so any number of workers can
+run side by side. Failed jobs (including ones with failed backfill windows)
+are retried up to ONBOARDING_MAX_ATTEMPTS, each retry waiting a little
+longer. A running job's updated_on is refreshed every
+ONBOARDING_HEARTBEAT_INTERVAL; idle workers re-queue jobs that stopped
+being refreshed, i.e. whose worker died.
+
+Usage:
+    python onboarding_worker.py
+"""
+
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+import asyncpg
+
+import shared
+from shared import (
+    POSTGRES_DSN,
+    ONBOARDING_NOTIFY_CHANNEL,
+    ONBOARDING_WORKERS,
+    ONBOARDING_MAX_ATTEMPTS,
+    ONBOARDING_POLL_INTERVAL,
+    ONBOARDING_HEARTBEAT_INTERVAL,
+    ONBOARDING_STALE_AFTER,
+    ONBOARDING_RETRY_DELAY,
+    START_DATE,
+    END_DATE,
+    init_connections,
+    close_connections,
+)
+from nse_client import AsyncNSEClient
+import company_initializer
+import tick_historical
+
+# Shared NSE client, created in run_onboarding_worker()
+NSE_CLIENT: Optional[AsyncNSEClient] = None
+
+
+# -----------------------------------------------------------
+# QUEUE ACCESS
+# -----------------------------------------------------------
+async def claim_job() -> Optional[asyncpg.Record]:
+    """Take the oldest queued job whose retry delay has passed, or None when there is none."""
+    sql = """
+        UPDATE onboarding_jobs
+        SET status = 'running', attempts = attempts + 1, updated_on = NOW()
+        WHERE job_id = (
+            SELECT job_id FROM onboarding_jobs
+            WHERE status = 'queued'
+              AND updated_on <= NOW() - $1::interval * attempts
+            ORDER BY created_on
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING job_id, symbol, company, attempts;
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        return await conn.fetchrow(sql, ONBOARDING_RETRY_DELAY)
+
+
+async def heartbeat(job: asyncpg.Record):
+    """Refresh a running job's updated_on until cancelled, so it is not taken for orphaned."""
+    sql = "UPDATE onboarding_jobs SET updated_on = NOW() WHERE job_id = $1 AND status = 'running' AND attempts = $2;"
+    while True:
+        await asyncio.sleep(ONBOARDING_HEARTBEAT_INTERVAL)
+        try:
+            async with shared.DB_POOL.acquire() as conn:
+                await conn.execute(sql, job["job_id"], job["attempts"])
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"[WARN] Heartbeat for onboarding job {job['job_id']} failed: {e}")
+
+
+async def finish_job(job: asyncpg.Record, error: Optional[str] = None):
+    """Mark a job done, or re-queue / fail it after an error."""
+    if error is None:
+        status = 'done'
+    elif job["attempts"] < ONBOARDING_MAX_ATTEMPTS:
+        status = 'queued'
+    else:
+        status = 'failed'
+
+    # Matching attempts leaves the job alone if it was re-queued and claimed again meanwhile
+    sql = """
+        UPDATE onboarding_jobs SET status = $2, error = $3, updated_on = NOW()
+        WHERE job_id = $1 AND status = 'running' AND attempts = $4;
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        await conn.execute(sql, job["job_id"], status, error or "", job["attempts"])
+
+
+async def requeue_stale_jobs() -> int:
+    """
+    Put back jobs left 'running' by a worker that died mid-job.
+
+    Returns:
+        Number of jobs re-queued
+    """
+    sql = """
+        UPDATE onboarding_jobs SET status = 'queued', updated_on = NOW()
+        WHERE status = 'running' AND updated_on < NOW() - $1::interval;
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        status = await conn.execute(sql, ONBOARDING_STALE_AFTER)
+    # Status looks like "UPDATE <rows>"
+    requeued = int(status.split()[-1])
+    if requeued:
+        print(f"[INFO] Re-queued {requeued} stale onboarding jobs")
+    return requeued
+
+
+# -----------------------------------------------------------
+# ONE JOB
+# -----------------------------------------------------------
+async def onboard(symbol: str, company: str) -> list[str]:
+    """
+    Resolve and backfill one requested stock.
+
+    Returns:
+        Symbols now tracked for the request
+    """
+    symbols = []
+    errors = []
+    # Same queries load_companies() would hand to the monthly initializer
+    for query in dict.fromkeys(q for q in (company, symbol) if q):
+        try:
+            symbols.extend(await company_initializer.initialize_symbols(query))
+        except Exception as e:
+            errors.append(f"{query}: {e}")
+
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        raise Exception("; ".join(errors) or f"No symbols found for {symbol}")
+
+    # Same span as the historical loader, ending yesterday as of now rather than at import
+    end_date = date.today() - timedelta(days=1)
+    start_date = end_date - (END_DATE - START_DATE)
+    failed = await tick_historical.run_backfill(symbols, start_date, end_date)
+    if failed:
+        # Windows fetched so far are checkpointed, so a retry only fetches the failed ones
+        raise Exception(f"{failed} backfill windows failed for {', '.join(symbols)}")
+    return symbols
+
+
+# -----------------------------------------------------------
+# WORKER LOOP
+# -----------------------------------------------------------
+async def worker(wakeup: asyncio.Event):
+    last_requeue = 0.0
+    while True:
+        try:
+            last_requeue = await work_once(wakeup, last_requeue)
+        except Exception as e:
+            # e.g. the database restarting; a job left 'running' is re-queued once it goes stale
+            print(f"[ERROR] Onboarding worker error: {e}")
+            await asyncio.sleep(ONBOARDING_POLL_INTERVAL)
+
+
+async def work_once(wakeup: asyncio.Event, last_requeue: float) -> float:
+    """
+    Run one queued job, or wait for one when the queue is empty.
+
+    Returns:
+        When stale jobs were last re-queued (time.monotonic())
+    """
+    # Checked between jobs, so an orphaned job waits at most for a worker to go idle
+    if time.monotonic() - last_requeue >= ONBOARDING_HEARTBEAT_INTERVAL:
+        await requeue_stale_jobs()
+        last_requeue = time.monotonic()
+
+    job = await claim_job()
+    if job is None:
+        wakeup.clear()
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=ONBOARDING_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        return last_requeue
+
+    print(f"[INFO] Onboarding {job['symbol']} ({job['company']}), attempt {job['attempts']}")
+    beat = asyncio.create_task(heartbeat(job))
+    try:
+        symbols = await onboard(job["symbol"], job["company"])
+    except Exception as e:
+        print(f"[ERROR] Onboarding {job['symbol']} failed: {e}")
+        await finish_job(job, str(e))
+    else:
+        print(f"[SUCCESS] Onboarded {job['symbol']}: {symbols}")
+        await finish_job(job)
+    finally:
+        beat.cancel()
+    return last_requeue
+
+
+async def run_onboarding_worker(workers: int = ONBOARDING_WORKERS):
+    global NSE_CLIENT
+    await init_connections()
+    NSE_CLIENT = AsyncNSEClient()
+    # The initializer and backfill code read their module-level client
+    company_initializer.NSE_CLIENT = tick_historical.NSE_CLIENT = NSE_CLIENT
+
+    wakeup = asyncio.Event()
+    listen_conn = await asyncpg.connect(dsn=POSTGRES_DSN)
+    await listen_conn.add_listener(ONBOARDING_NOTIFY_CHANNEL, lambda *args: wakeup.set())
+
+    print(f"Onboarding Worker Started ({workers} workers)")
+
+    try:
+        await NSE_CLIENT.start()
+        await asyncio.gather(*(worker(wakeup) for _ in range(workers)))
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        await listen_conn.close()
+        await NSE_CLIENT.close()
+        await close_connections()
+
+
+# -----------------------------------------------------------
+# MAIN ENTRY
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Onboard newly requested stocks")
+    parser.add_argument("--workers", type=int, default=ONBOARDING_WORKERS, help="Concurrent jobs")
+    args = parser.parse_args()
+
+    asyncio.run(run_onboarding_worker(workers=args.workers))
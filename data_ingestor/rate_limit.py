@@ -0,0 +1,60 @@
+"""
+Rate Limiting - Async token buckets shared per upstream host.
+
+Every ingestor that talks to NSE should take a token from the same bucket so
+the combined request rate stays under the configured budget.
+
+Usage:
+    bucket = bucket_for("www.nseindia.com")
+    await bucket.acquire()
+"""
+
+import asyncio
+import time
+
+from shared import NSE_REQUESTS_PER_SECOND, NSE_BURST
+
+
+# -----------------------------------------------------------
+# TOKEN BUCKET
+# -----------------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (burst size, default: rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until `tokens` are available and take them."""
+        # The lock keeps waiters in FIFO order so nobody starves
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+# -----------------------------------------------------------
+# PER-HOST REGISTRY
+# -----------------------------------------------------------
+HOST_BUCKETS: dict[str, TokenBucket] = {}
+
+
+def bucket_for(host: str, rate: float = NSE_REQUESTS_PER_SECOND, capacity: float = NSE_BURST) -> TokenBucket:
+    """Return the shared bucket for a host, creating it on first use."""
+    if host not in HOST_BUCKETS:
+        HOST_BUCKETS[host] = TokenBucket(rate, capacity)
+    return HOST_BUCKETS[host]
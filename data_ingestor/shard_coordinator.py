@@ -0,0 +1,232 @@
+"""
+Shard Coordinator - Splits the poll set across tick_poller instances through Redis.
+
+Every instance heartbeats into the SHARD_MEMBERS_KEY sorted set (score =
+lease expiry). Live members are placed on a consistent-hash ring, and each
+symbol belongs to the member that follows it on the ring, so adding or
+losing an instance only moves that instance's share.
+
+The ring decides who *should* poll a symbol; a per-symbol lease decides who
+*may*. An instance claims its symbols with SET NX (poller:owner:<SYMBOL>),
+renews them on every heartbeat and skips symbols still leased to someone
+else. Two instances with briefly different views of the membership can
+therefore never poll the same symbol.
+
+When an instance dies its membership and leases lapse after SHARD_LEASE_TTL,
+and the survivors claim its symbols at the start of their next cycle.
+To scale out, start another tick_poller.py (with its own POLLER_METRICS_PORT
+when on the same host).
+
+Usage:
+    coordinator = ShardCoordinator()
+    await coordinator.start()
+    ...
+    owned = await coordinator.assign(registry.tickers())   # once per cycle
+    if coordinator.owns(ticker): ...
+"""
+
+import asyncio
+import bisect
+import hashlib
+import os
+import socket
+import time
+from typing import Iterable, Optional
+
+import shared
+from shared import (
+    POLLER_INSTANCE_ID,
+    SHARD_MEMBERS_KEY,
+    SHARD_OWNER_PREFIX,
+    SHARD_LEASE_TTL,
+    SHARD_HEARTBEAT_INTERVAL,
+    SHARD_VNODES,
+)
+from metrics import Counter, Gauge
+
+# Symbols per claim/release script call, so Redis is never blocked for long
+CLAIM_BATCH = 1000
+
+# Take or renew each lease unless another instance holds it; returns the indexes of held keys
+CLAIM_SCRIPT = """
+local held = {}
+for i, key in ipairs(KEYS) do
+    local holder = redis.call('GET', key)
+    if holder == ARGV[1] then
+        redis.call('PEXPIRE', key, ARGV[2])
+        table.insert(held, i)
+    elseif not holder then
+        redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+        table.insert(held, i)
+    end
+end
+return held
+"""
+
+# Drop the leases this instance still holds
+RELEASE_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+        released = released + 1
+    end
+end
+return released
+"""
+
+SHARD_MEMBERS = Gauge("shard_members", "Live tick_poller instances")
+SHARD_OWNED = Gauge("shard_owned_symbols", "Symbols leased to this instance")
+SHARD_REBALANCES = Counter("shard_rebalances_total", "Membership changes seen by this instance")
+SHARD_CONTESTED = Counter("shard_contested_symbols_total", "Claims skipped because another instance held the lease")
+SHARD_HEARTBEAT_ERRORS = Counter("shard_heartbeat_errors_total", "Failed heartbeats")
+
+
+def ring_hash(key: str) -> int:
+    """Stable 64-bit hash (the built-in hash() differs between processes)."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ShardCoordinator:
+    def __init__(
+        self,
+        instance_id: Optional[str] = None,
+        lease_ttl: float = SHARD_LEASE_TTL,
+        heartbeat_interval: float = SHARD_HEARTBEAT_INTERVAL,
+        vnodes: int = SHARD_VNODES,
+    ):
+        self.instance_id = instance_id or POLLER_INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_ttl = lease_ttl
+        self.heartbeat_interval = heartbeat_interval
+        self.vnodes = vnodes
+        self.members: list[str] = []
+        self.owned: set[str] = set()
+        self._ring_points: list[int] = []
+        self._ring_members: list[str] = []
+        # Leases are only trusted until they could have lapsed without a renewal
+        self._valid_until = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # -------------------------------------------------------
+    # HASH RING
+    # -------------------------------------------------------
+    def _build_ring(self, members: list[str]):
+        points = sorted(
+            (ring_hash(f"{member}#{i}"), member)
+            for member in members
+            for i in range(self.vnodes)
+        )
+        self._ring_points = [point for point, _ in points]
+        self._ring_members = [member for _, member in points]
+
+    def owner(self, symbol: str) -> Optional[str]:
+        """Instance the ring assigns `symbol` to."""
+        if not self._ring_points:
+            return None
+        i = bisect.bisect(self._ring_points, ring_hash(symbol)) % len(self._ring_points)
+        return self._ring_members[i]
+
+    def owns(self, symbol: str) -> bool:
+        """True while this instance holds an unexpired lease on `symbol`."""
+        return symbol in self.owned and time.monotonic() < self._valid_until
+
+    # -------------------------------------------------------
+    # LEASES
+    # -------------------------------------------------------
+    async def _claim(self, symbols: list[str]) -> set[str]:
+        held = set()
+        ttl_ms = int(self.lease_ttl * 1000)
+        for i in range(0, len(symbols), CLAIM_BATCH):
+            batch = symbols[i:i + CLAIM_BATCH]
+            keys = [SHARD_OWNER_PREFIX + symbol for symbol in batch]
+            indexes = await shared.REDIS_CLIENT.eval(CLAIM_SCRIPT, len(keys), *keys, self.instance_id, ttl_ms)
+            held.update(batch[j - 1] for j in indexes)
+        return held
+
+    async def _release(self, symbols: Iterable[str]):
+        symbols = list(symbols)
+        for i in range(0, len(symbols), CLAIM_BATCH):
+            keys = [SHARD_OWNER_PREFIX + symbol for symbol in symbols[i:i + CLAIM_BATCH]]
+            await shared.REDIS_CLIENT.eval(RELEASE_SCRIPT, len(keys), *keys, self.instance_id)
+
+    async def _set_owned(self, wanted: list[str]):
+        """Release what is no longer wanted, claim the rest and record what is held."""
+        started = time.monotonic()
+        dropped = self.owned - set(wanted)
+        if dropped:
+            await self._release(dropped)
+        held = await self._claim(wanted)
+        SHARD_CONTESTED.inc(len(wanted) - len(held))
+        self.owned = held
+        self._valid_until = started + self.lease_ttl
+        SHARD_OWNED.set(len(held))
+
+    # -------------------------------------------------------
+    # MEMBERSHIP
+    # -------------------------------------------------------
+    async def heartbeat(self):
+        """Renew membership and leases; hand over symbols if the membership changed."""
+        now = time.time()
+        pipe = shared.REDIS_CLIENT.pipeline(transaction=True)
+        pipe.zadd(SHARD_MEMBERS_KEY, {self.instance_id: now + self.lease_ttl})
+        pipe.zremrangebyscore(SHARD_MEMBERS_KEY, "-inf", now)
+        pipe.zrange(SHARD_MEMBERS_KEY, 0, -1)
+        _, _, members = await pipe.execute()
+        # Scores change on every heartbeat, so compare by name
+        members = sorted(members)
+
+        async with self._lock:
+            if members != self.members:
+                if self.members:
+                    SHARD_REBALANCES.inc()
+                    print(f"[INFO] Poller instances changed: {len(self.members)} -> {len(members)} ({', '.join(members)})")
+                self.members = members
+                self._build_ring(members)
+                SHARD_MEMBERS.set(len(members))
+            await self._set_owned([s for s in self.owned if self.owner(s) == self.instance_id])
+
+    async def assign(self, tickers: list[str]) -> list[str]:
+        """
+        Claim this instance's share of `tickers` and release the rest.
+
+        Returns:
+            The tickers this instance may poll, in the given order
+        """
+        async with self._lock:
+            await self._set_owned([t for t in tickers if self.owner(t) == self.instance_id])
+        return [t for t in tickers if t in self.owned]
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                SHARD_HEARTBEAT_ERRORS.inc()
+                print(f"[ERROR] Shard heartbeat failed: {e}")
+
+    # -------------------------------------------------------
+    # LIFECYCLE
+    # -------------------------------------------------------
+    async def start(self):
+        await self.heartbeat()
+        self._task = asyncio.create_task(self._heartbeat_loop())
+        print(f"[INFO] Poller instance {self.instance_id} joined ({len(self.members)} live)")
+
+    async def close(self):
+        """Leave the ring and free every lease so the others take over immediately."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self._release(self.owned)
+            await shared.REDIS_CLIENT.zrem(SHARD_MEMBERS_KEY, self.instance_id)
+        except Exception as e:
+            print(f"[ERROR] Leaving the poller ring failed: {e}")
+        self.owned = set()
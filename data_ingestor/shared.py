@@ -1,12 +1,13 @@
 import asyncpg
+import json
 import redis.asyncio as aioredis
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime, timezone, date, timedelta
+from typing import NamedTuple, Optional
+from datetime import datetime, date, timedelta
 import os
 from nse import NSE
 from pathlib import Path
-import requests
+
+from metrics import Gauge
 
 
 # -----------------------------------------------------------
@@ -14,13 +15,83 @@ import requests
 # -----------------------------------------------------------
 POSTGRES_DSN = f"postgresql://postgres:{os.getenv('POSTGRESS_PASSWORD')}@{os.getenv('POSTGRES_HOST','localhost')}:5432/ist_db"
 REDIS_URL = "redis://localhost:6380"
+REDIS_SNAPSHOT_KEY = "market_snapshot" # Hash of symbol -> latest tick JSON
+REDIS_TICK_STREAM = "market_ticks" # Stream of every stored tick (fields: symbol, tick JSON)
+REDIS_SYMBOL_REQUESTS_CHANNEL = "symbol_requests" # Symbols users just asked for (published by the backend)
+SYMBOLS_NOTIFY_CHANNEL = "company_symbols_changed" # Postgres NOTIFY channel fired by company_symbols
+ONBOARDING_NOTIFY_CHANNEL = "onboarding_jobs" # Postgres NOTIFY channel the backend fires on new jobs
 PROXIES = {"http_proxy":f"{os.getenv('PROXY')}",
            "https_proxy":f"{os.getenv('PROXY')}",
            "no_proxy":f"{os.getenv('PROXY')}"}
 FETCH_COOLDOWN_TIME = 2 # seconds
-BASE_URL = "https://www.nseindia.com"
+BASE_URL = os.getenv('NSE_BASE_URL', "https://www.nseindia.com") # Point at nse_stub.py to run offline
 API_URL = f"{BASE_URL}/api/NextApi/apiClient/GetQuoteApi"
 
+# NSE request budget (shared by every ingestor)
+NSE_REQUESTS_PER_SECOND = float(os.getenv('NSE_REQUESTS_PER_SECOND', 5))
+NSE_BURST = float(os.getenv('NSE_BURST', 10))
+
+# NSE HTTP client
+NSE_MAX_CONNECTIONS = int(os.getenv('NSE_MAX_CONNECTIONS', 10))
+NSE_MAX_RETRIES = int(os.getenv('NSE_MAX_RETRIES', 4))
+NSE_BACKOFF_BASE = 0.5 # seconds
+NSE_BACKOFF_CAP = 30 # seconds
+
+# Historical backfill
+HISTORY_WINDOW_DAYS = 60 # Longest range the historical API accepts per call
+BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 8))
+
+# Tick poller concurrency
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 8))
+
+# Poller sharding across instances (see shard_coordinator.py)
+POLLER_INSTANCE_ID = os.getenv('POLLER_INSTANCE_ID') # Defaults to <hostname>-<pid>
+SHARD_MEMBERS_KEY = os.getenv('SHARD_MEMBERS_KEY', "poller:members") # Redis sorted set of instance id -> lease expiry
+SHARD_OWNER_PREFIX = os.getenv('SHARD_OWNER_PREFIX', "poller:owner:") # Redis key per symbol holding the owning instance id
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', 15)) # seconds; keep well below the poll interval
+SHARD_HEARTBEAT_INTERVAL = SHARD_LEASE_TTL / 3
+SHARD_VNODES = 160 # Points per instance on the hash ring
+
+# Adaptive polling (see fetch_scheduler.PollPlanner)
+LIQUID_SYMBOLS = int(os.getenv('LIQUID_SYMBOLS', 200)) # Top symbols by traded value polled every cycle
+ILLIQUID_POLL_INTERVAL = 300 # seconds between polls of everything else during the session
+OFF_SESSION_POLL_INTERVAL = 300 # seconds between polls of unwatched symbols in pre-open/post-close
+CLOSED_RECHECK_INTERVAL = 900 # longest sleep while the market is closed
+
+# Metrics scrape endpoints (http://127.0.0.1:<port>/metrics), one per process
+POLLER_METRICS_PORT = int(os.getenv('POLLER_METRICS_PORT', 9101))
+HISTORICAL_METRICS_PORT = int(os.getenv('HISTORICAL_METRICS_PORT', 9102))
+INITIALIZER_METRICS_PORT = int(os.getenv('INITIALIZER_METRICS_PORT', 9103))
+
+# Company initializer concurrency (companies looked up at once)
+INIT_WORKERS = int(os.getenv('INIT_WORKERS', 4))
+
+# On-demand onboarding of newly requested stocks
+ONBOARDING_WORKERS = int(os.getenv('ONBOARDING_WORKERS', 2))
+ONBOARDING_MAX_ATTEMPTS = 3
+ONBOARDING_POLL_INTERVAL = 30 # seconds between queue checks when no NOTIFY arrives
+ONBOARDING_HEARTBEAT_INTERVAL = 60 # seconds between updated_on refreshes of a running job
+ONBOARDING_STALE_AFTER = timedelta(minutes=5) # 'running' jobs not refreshed for this long were orphaned by a crash
+ONBOARDING_RETRY_DELAY = timedelta(minutes=2) # wait before retrying a failed job, multiplied by its attempts
+
+# Symbols users just requested are dropped from the poll set after this many failed polls
+# unless NSE quotes them at least once (see symbol_registry.py)
+REQUESTED_SYMBOL_MAX_FAILURES = 3
+
+# Tick stream (see tick_stream.py)
+TICK_STREAM_MAXLEN = int(os.getenv('TICK_STREAM_MAXLEN', 200000)) # Entries kept for replay, trimmed approximately
+TICK_STREAM_BATCH_SIZE = 500
+TICK_STREAM_FLUSH_INTERVAL = 0.05 # seconds; the most a tick waits before it is published
+TICK_STREAM_MAX_PENDING = 10000
+TICK_STREAM_CLAIM_IDLE = 60 # seconds before another consumer takes over unacknowledged entries
+
+# Tick writer buffering
+TICK_WRITER_BATCH_SIZE = int(os.getenv('TICK_WRITER_BATCH_SIZE', 500))
+TICK_WRITER_FLUSH_INTERVAL = float(os.getenv('TICK_WRITER_FLUSH_INTERVAL', 2)) # seconds
+TICK_WRITER_MAX_PENDING = int(os.getenv('TICK_WRITER_MAX_PENDING', 10000))
+TICK_WRITER_MAX_RETRIES = 4 # attempts after the first before a batch is dropped
+TICK_WRITER_BACKOFF_CAP = 10 # seconds; longest wait between attempts
+
 DEFAULT_HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -49,17 +120,59 @@ START_DATE = END_DATE - timedelta(days=10 * 365) # Approximately 10 years
 
 
 # -----------------------------------------------------------
-# DATA MODEL (Pydantic)
+# DATA MODEL
 # -----------------------------------------------------------
-class TickData(BaseModel):
-    time: datetime = datetime.now(timezone.utc)
+class Tick(NamedTuple):
+    """
+    One OHLCV quote. Fields are in tick_data COPY order, so a Tick is
+    written to Postgres as is, without building another tuple.
+    """
+    time: datetime
     symbol: str
     close: float
-    open: float
-    high: float
-    low: float
     volume: int
     exchange: str
+    high: float
+    low: float
+    open: float
+
+
+# Column order used for every bulk write into tick_data
+TICK_COLUMNS = list(Tick._fields)
+
+# JSON-quoted symbol/exchange strings; there are only a few thousand, so quote each once
+_JSON_STRINGS: dict[str, str] = {}
+
+
+def _json_string(value: str) -> str:
+    quoted = _JSON_STRINGS.get(value)
+    if quoted is None:
+        quoted = _JSON_STRINGS[value] = json.dumps(value)
+    return quoted
+
+
+def tick_to_json(tick: Tick) -> str:
+    """Redis payload for a tick (same fields as the backend and SSE clients read)."""
+    return (
+        f'{{"time":"{tick.time.isoformat()}","symbol":{_json_string(tick.symbol)},'
+        f'"close":{tick.close!r},"open":{tick.open!r},"high":{tick.high!r},"low":{tick.low!r},'
+        f'"volume":{tick.volume},"exchange":{_json_string(tick.exchange)}}}'
+    )
+
+
+def tick_from_json(payload: str) -> Tick:
+    """Inverse of tick_to_json()."""
+    d = json.loads(payload)
+    return Tick(
+        datetime.fromisoformat(d["time"]),
+        d["symbol"],
+        d["close"],
+        d["volume"],
+        d["exchange"],
+        d["high"],
+        d["low"],
+        d["open"],
+    )
 
 
 # -----------------------------------------------------------
@@ -68,6 +181,11 @@ class TickData(BaseModel):
 DB_POOL: Optional[asyncpg.Pool] = None
 REDIS_CLIENT: Optional[aioredis.Redis] = None
 
+DB_POOL_SIZE = Gauge("db_pool_connections", "Open connections in the asyncpg pool",
+                     callback=lambda: DB_POOL.get_size())
+DB_POOL_BUSY = Gauge("db_pool_busy_connections", "Pool connections currently checked out",
+                     callback=lambda: DB_POOL.get_size() - DB_POOL.get_idle_size())
+
 async def load_companies():
     """
     Load company names from database into COMPANIES_LIST.
@@ -94,6 +212,43 @@ async def load_companies():
     print(f"Loaded {len(COMPANIES_LIST)} companies")
 
 
+# -----------------------------------------------------------
+# IDEMPOTENT BULK WRITE
+# -----------------------------------------------------------
+async def upsert_tick_records(conn: asyncpg.Connection, records: list[tuple]) -> int:
+    """
+    COPY records (in TICK_COLUMNS order) into a per-connection staging table,
+    then move them into tick_data, skipping any (symbol, time) that already
+    exists. Relies on the unique index from dashboard migration 0007.
+
+    Returns:
+        Number of rows actually inserted
+    """
+    columns = ", ".join(TICK_COLUMNS)
+
+    async with conn.transaction():
+        # Temp tables live as long as the pooled connection; rows are cleared on commit
+        await conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS tick_data_staging
+            (LIKE tick_data INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+        """)
+        await conn.copy_records_to_table(
+            'tick_data_staging',
+            records=records,
+            columns=TICK_COLUMNS
+        )
+        status = await conn.execute(f"""
+            INSERT INTO tick_data ({columns})
+            SELECT DISTINCT ON (symbol, time) {columns}
+            FROM tick_data_staging
+            ORDER BY symbol, time
+            ON CONFLICT (symbol, time) DO NOTHING;
+        """)
+
+    # Status looks like "INSERT 0 <rows>"
+    return int(status.split()[-1])
+
+
 async def init_connections():
     """Initialize database and Redis connections."""
     global DB_POOL, REDIS_CLIENT
@@ -109,18 +264,3 @@ async def close_connections():
         await DB_POOL.close()
     if REDIS_CLIENT:
         await REDIS_CLIENT.close()
-
-class NSESession:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(DEFAULT_HEADERS)
-        self._init_cookies()
-
-    def _init_cookies(self):
-        # Mandatory cookie bootstrap
-        self.session.get(BASE_URL, timeout=10)
-
-    def get(self, url: str, params: dict, proxies: Optional[dict] = None):
-        resp = self.session.get(url, params=params, timeout=15, proxies=proxies)
-        resp.raise_for_status()
-        return resp
\ No newline at end of file
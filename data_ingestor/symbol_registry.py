@@ -0,0 +1,153 @@
+"""
+Symbol Registry - The poller's in-memory set of symbols, kept current by events.
+
+The set is loaded from company_symbols once, then updated from two sources:
+    - Postgres NOTIFY on SYMBOLS_NOTIFY_CHANNEL, fired by the trigger on
+      company_symbols from dashboard migration 0010 ("+SYMBOL" on insert,
+      "-SYMBOL" on delete)
+    - Redis REDIS_SYMBOL_REQUESTS_CHANNEL, where the backend announces symbols
+      users just added, so they are polled before company_initializer runs
+
+A requested symbol is unverified until NSE returns a quote for it; after
+REQUESTED_SYMBOL_MAX_FAILURES failed polls (e.g. a typo) it is dropped.
+
+If the LISTEN connection drops, the set is reloaded in full when it is
+re-established, so no change is missed.
+
+Usage:
+    registry = SymbolRegistry()
+    await registry.start()
+    ...
+    await registry.ensure_listening()   # once per cycle
+    ticker_list = registry.tickers()
+    registry.quote_ok(symbol) / registry.quote_failed(symbol)   # after each poll
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+import asyncpg
+
+import shared
+from shared import (
+    POSTGRES_DSN,
+    REDIS_SYMBOL_REQUESTS_CHANNEL,
+    REQUESTED_SYMBOL_MAX_FAILURES,
+    SYMBOLS_NOTIFY_CHANNEL,
+)
+
+
+class SymbolRegistry:
+    def __init__(self):
+        self.symbols: set[str] = set()
+        self.requested: set[str] = set()
+        # Requested symbols NSE has not quoted yet -> failed polls so far
+        self._unverified: dict[str, int] = {}
+        self._conn: Optional[asyncpg.Connection] = None
+        self._redis_task: Optional[asyncio.Task] = None
+
+    def tickers(self) -> list[str]:
+        """Current poll set, in a stable order."""
+        return sorted(self.symbols | self.requested)
+
+    def quote_ok(self, symbol: str):
+        """NSE quoted the symbol, so a requested one is real and stays polled."""
+        self._unverified.pop(symbol, None)
+
+    def quote_failed(self, symbol: str):
+        """Count a failed poll; drop a requested symbol NSE keeps failing to quote."""
+        if symbol not in self._unverified:
+            return
+        self._unverified[symbol] += 1
+        if self._unverified[symbol] >= REQUESTED_SYMBOL_MAX_FAILURES:
+            print(f"[WARN] Dropping requested symbol {symbol}: no quote from NSE after {self._unverified[symbol]} polls")
+            self.requested.discard(symbol)
+            del self._unverified[symbol]
+
+    # -------------------------------------------------------
+    # POSTGRES LISTEN/NOTIFY
+    # -------------------------------------------------------
+    def _on_notify(self, conn, pid, channel, payload: str):
+        op, symbol = payload[0], payload[1:]
+        if op == "+":
+            if symbol not in self.symbols:
+                print(f"[INFO] Symbol added: {symbol}")
+            self.symbols.add(symbol)
+            self.requested.discard(symbol)
+            self._unverified.pop(symbol, None)
+        else:
+            print(f"[INFO] Symbol removed: {symbol}")
+            self.symbols.discard(symbol)
+
+    def _on_terminate(self, conn):
+        print("[WARN] Symbol LISTEN connection lost; will reconnect")
+        self._conn = None
+
+    async def _reload(self, conn: asyncpg.Connection):
+        rows = await conn.fetch("SELECT symbol FROM company_symbols;")
+        self.symbols = {r["symbol"] for r in rows}
+        self.requested -= self.symbols
+        self._unverified = {s: n for s, n in self._unverified.items() if s in self.requested}
+
+    async def ensure_listening(self):
+        """(Re)open the LISTEN connection and reload the set if it is not open."""
+        if self._conn is not None and not self._conn.is_closed():
+            return
+        try:
+            conn = await asyncpg.connect(dsn=POSTGRES_DSN)
+            # Listen before loading so nothing committed in between is missed
+            await conn.add_listener(SYMBOLS_NOTIFY_CHANNEL, self._on_notify)
+            conn.add_termination_listener(self._on_terminate)
+            await self._reload(conn)
+            self._conn = conn
+        except (OSError, asyncpg.PostgresError) as e:
+            print(f"[ERROR] Symbol LISTEN connection failed: {e}")
+
+    # -------------------------------------------------------
+    # REDIS SYMBOL REQUESTS
+    # -------------------------------------------------------
+    def _on_request(self, data: str):
+        try:
+            symbol = json.loads(data).get("symbol", "").strip().upper()
+        except (ValueError, AttributeError) as e:
+            print(f"[WARN] Ignoring malformed symbol request {data!r}: {e}")
+            return
+        if symbol and symbol not in self.symbols and symbol not in self.requested:
+            print(f"[INFO] Hot-adding requested symbol: {symbol}")
+            self.requested.add(symbol)
+            self._unverified[symbol] = 0
+
+    async def _listen_requests(self):
+        while True:
+            pubsub = shared.REDIS_CLIENT.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(REDIS_SYMBOL_REQUESTS_CHANNEL)
+                async for message in pubsub.listen():
+                    self._on_request(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERROR] Symbol request subscription failed: {e}")
+                await asyncio.sleep(5)
+            finally:
+                # Give the connection back before subscribing again
+                await pubsub.aclose()
+
+    # -------------------------------------------------------
+    # LIFECYCLE
+    # -------------------------------------------------------
+    async def start(self):
+        await self.ensure_listening()
+        self._redis_task = asyncio.create_task(self._listen_requests())
+
+    async def close(self):
+        if self._redis_task is not None:
+            self._redis_task.cancel()
+            try:
+                await self._redis_task
+            except asyncio.CancelledError:
+                pass
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
@@ -0,0 +1,192 @@
+"""
+Tick Archiver - Exports old tick_data into partitioned Parquet files (cold storage).
+
+Each symbol/month becomes one zstd-compressed Parquet file:
+    <ARCHIVE_DIR>/symbol=RELIANCE/month=2019-04.parquet
+
+With --delete the exported rows are removed from tick_data once each file has
+been written and its row count verified, and after a full run (no --symbol)
+the archive watermark is advanced. The backend serves any range older than the
+watermark from these files, plus whatever rows Postgres received for it later.
+Without --delete the files are only a copy and the watermark stays, since
+Postgres still holds every row and aggregates them faster itself.
+
+Usage:
+    python tick_archiver.py                         # Archive everything older than 24 months
+    python tick_archiver.py --keep-months 12        # Keep only the last 12 months in Postgres
+    python tick_archiver.py --symbol RELIANCE       # Archive one symbol (watermark unchanged)
+    python tick_archiver.py --delete                # Also delete exported rows and advance the watermark
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timezone, date
+from pathlib import Path
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import shared
+from shared import (
+    DIR,
+    init_connections,
+    close_connections,
+)
+
+# Where Parquet partitions and the watermark live
+ARCHIVE_DIR = Path(os.getenv('ARCHIVE_DIR', DIR / "archive"))
+WATERMARK_FILE = "_watermark.json"
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("time", pa.timestamp("us", tz="UTC")),
+    ("open", pa.float64()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("volume", pa.int64()),
+    ("exchange", pa.dictionary(pa.int8(), pa.string())),
+])
+
+
+# -----------------------------------------------------------
+# PATHS AND WATERMARK
+# -----------------------------------------------------------
+def partition_path(symbol: str, month: date) -> Path:
+    return ARCHIVE_DIR / f"symbol={symbol}" / f"month={month:%Y-%m}.parquet"
+
+
+def write_watermark(archived_before: datetime):
+    """Record that every row older than `archived_before` was moved from Postgres to the archive."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = ARCHIVE_DIR / (WATERMARK_FILE + ".tmp")
+    tmp.write_text(json.dumps({"archived_before": archived_before.isoformat(), "deleted": True}))
+    tmp.replace(ARCHIVE_DIR / WATERMARK_FILE)
+
+
+def months_ago(months: int) -> datetime:
+    """First instant of the month `months` before the current one (UTC)."""
+    today = datetime.now(timezone.utc)
+    index = today.year * 12 + today.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+# -----------------------------------------------------------
+# EXPORT ONE SYMBOL/MONTH
+# -----------------------------------------------------------
+async def archive_partition(symbol: str, month: datetime, delete: bool = False) -> int:
+    """
+    Export one symbol/month to Parquet, merging with an existing file.
+
+    Returns:
+        Number of rows exported from Postgres
+    """
+    next_month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+    sql = """
+        SELECT time, open::float8, high::float8, low::float8, close::float8, volume, exchange
+        FROM tick_data
+        WHERE symbol = $1 AND time >= $2 AND time < $3
+        ORDER BY time;
+    """
+    async with shared.DB_POOL.acquire() as conn:
+        rows = await conn.fetch(sql, symbol, month, next_month)
+
+    if not rows:
+        return 0
+
+    table = pa.table(
+        {name: [r[i] for r in rows] for i, name in enumerate(ARCHIVE_SCHEMA.names)},
+        schema=ARCHIVE_SCHEMA,
+    )
+
+    path = partition_path(symbol, month.date())
+    if path.exists():
+        # Rows archived by an earlier run stay unless Postgres has the same time again
+        existing = pq.read_table(path, schema=ARCHIVE_SCHEMA)
+        existing = existing.filter(pc.invert(pc.is_in(existing["time"], value_set=table["time"])))
+        table = pa.concat_tables([existing, table]).sort_by("time")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".parquet.tmp")
+    pq.write_table(table, tmp, compression="zstd", compression_level=9, row_group_size=64 * 1024)
+    tmp.replace(path)
+
+    if delete:
+        written = pq.read_metadata(path).num_rows
+        if written < len(rows):
+            raise RuntimeError(f"{path} has {written} rows, expected at least {len(rows)}")
+        async with shared.DB_POOL.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM tick_data WHERE symbol = $1 AND time >= $2 AND time < $3",
+                symbol, month, next_month
+            )
+
+    return len(rows)
+
+
+# -----------------------------------------------------------
+# MAIN ENTRY POINT
+# -----------------------------------------------------------
+async def run_tick_archiver(symbols: Optional[List[str]] = None, keep_months: int = 24, delete: bool = False):
+    """
+    Archive every symbol/month older than `keep_months` months.
+
+    Args:
+        symbols: Symbols to archive (default: all)
+        keep_months: Months of recent data that stay in Postgres only
+        delete: Remove exported rows from tick_data and, for a full run, advance the watermark
+    """
+    await init_connections()
+    before = months_ago(keep_months)
+
+    try:
+        sql = """
+            SELECT DISTINCT symbol, date_trunc('month', time) AS month
+            FROM tick_data
+            WHERE time < $1 AND ($2::varchar[] IS NULL OR symbol = ANY($2::varchar[]))
+            ORDER BY symbol, month;
+        """
+        async with shared.DB_POOL.acquire() as conn:
+            partitions = await conn.fetch(sql, before, symbols)
+
+        print(f"[INFO] Archiving {len(partitions)} symbol/months older than {before:%Y-%m} to {ARCHIVE_DIR}")
+
+        total = 0
+        failed = 0
+        for p in partitions:
+            try:
+                exported = await archive_partition(p["symbol"], p["month"], delete=delete)
+                total += exported
+                print(f"[INFO] {p['symbol']} {p['month']:%Y-%m}: {exported} rows")
+            except Exception as e:
+                failed += 1
+                print(f"[ERROR] Archiving {p['symbol']} {p['month']:%Y-%m} failed: {e}")
+
+        # Only a complete run over every symbol that moved the rows out of Postgres can vouch
+        # for the whole range; a copy-only run leaves Postgres the faster source
+        if delete and not symbols and not failed:
+            write_watermark(before)
+            print(f"[INFO] Archive watermark set to {before:%Y-%m-%d}")
+
+        print(f"\n[SUCCESS] Archived {total} rows ({failed} partitions failed)")
+
+    finally:
+        await close_connections()
+
+
+# -----------------------------------------------------------
+# CLI ENTRY POINT
+# -----------------------------------------------------------
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export old tick data to Parquet cold storage")
+    parser.add_argument("--symbol", type=str, help="Specific symbol to archive (default: all)")
+    parser.add_argument("--keep-months", type=int, default=24, help="Months kept in Postgres only (default: 24)")
+    parser.add_argument("--delete", action="store_true", help="Delete exported rows from tick_data")
+    args = parser.parse_args()
+
+    symbols = [args.symbol] if args.symbol else None
+    asyncio.run(run_tick_archiver(symbols=symbols, keep_months=args.keep_months, delete=args.delete))
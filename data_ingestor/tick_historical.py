@@ -6,32 +6,53 @@ Usage:
     python tick_historical.py --symbol RELIANCE  # Load specific symbol
     python tick_historical.py --days 365         # Load specific number of days
 
-This should be run once per symbol to backfill historical data.
+The range is split into windows the NSE API accepts and every window is
+fetched concurrently across symbols, within the shared NSE rate budget.
+Fetched, empty and failed windows are checkpointed in backfill_checkpoints,
+so reruns and crash restarts only fetch what is still missing.
 """
 
 import asyncio
 from datetime import datetime, timezone, timedelta, date
-from typing import List, Dict
-import requests
-from time import sleep
+from typing import List, Dict, Optional, Tuple
 
 import shared
 from shared import (
-    TickData,
+    Tick,
+    upsert_tick_records,
     nse,
     init_connections,
     close_connections,
     START_DATE,
     END_DATE,
-    PROXIES,
-    FETCH_COOLDOWN_TIME,
-    API_URL,
-    NSESession
+    HISTORY_WINDOW_DAYS,
+    BACKFILL_WORKERS,
+    HISTORICAL_METRICS_PORT,
+)
+from nse_client import AsyncNSEClient, NSEClientError
+from metrics import Counter, Gauge, Histogram, log_sampled, start_metrics_server, close_metrics_server
+from backfill_checkpoints import (
+    STATUS_DONE,
+    STATUS_EMPTY,
+    STATUS_FAILED,
+    ensure_checkpoint_table,
+    load_checkpoints,
+    record_checkpoint,
+    grid_windows,
+    missing_range,
 )
 
 # IST timezone offset
 IST = timezone(timedelta(hours=5, minutes=30))
-nse_session = NSESession()
+
+# Async NSE client, created in run_historical_loader()
+NSE_CLIENT: Optional[AsyncNSEClient] = None
+
+BACKFILL_STAGE_SECONDS = Histogram("backfill_stage_seconds", "Time per window in each backfill stage", ["stage"])
+BACKFILL_WINDOWS = Counter("backfill_windows_total", "Backfilled windows by outcome", ["status"])
+BACKFILL_ROWS = Counter("backfill_rows_total", "Historical rows written", ["result"])
+BACKFILL_QUEUE_DEPTH = Gauge("backfill_queue_depth", "Windows not yet picked up by a worker")
+BACKFILL_ERRORS = Counter("backfill_errors_total", "Failed windows by symbol", ["symbol"])
 
 # -----------------------------------------------------------
 # LOAD TICKER LIST FROM DATABASE
@@ -47,44 +68,26 @@ async def load_ticker_list() -> list[str]:
 # -----------------------------------------------------------
 # BULK INSERT HISTORICAL DATA
 # -----------------------------------------------------------
-async def insert_historical_batch_into_postgres(data: List[Dict]):
+async def insert_historical_batch_into_postgres(data: List[Tick]):
     """
     Bulk insert historical data using PostgreSQL COPY command for performance.
+    Rows already stored for the same (symbol, time) are skipped.
 
     Args:
-        data: List of dictionaries containing tick data
+        data: Ticks to insert (already in TICK_COLUMNS order)
     """
     if not data:
         print("[WARN] No data to insert")
         return
 
-    print(f"[DB] Bulk inserting {len(data)} historical records...")
-
-    # Use COPY command for bulk insert (much faster than individual INSERTs)
-    async with shared.DB_POOL.acquire() as conn:
-        # Prepare data for COPY
-        records = [
-            (
-                item['time'],
-                item['symbol'],
-                item['close'],
-                item['volume'],
-                item['exchange'],
-                item['high'],
-                item['low'],
-                item['open']
-            )
-            for item in data
-        ]
-
-        # Use COPY for bulk insert
-        await conn.copy_records_to_table(
-            'tick_data',
-            records=records,
-            columns=['time', 'symbol', 'close', 'volume', 'exchange', 'high', 'low', 'open']
-        )
+    # COPY into staging, then INSERT ... ON CONFLICT so reruns never duplicate rows
+    with BACKFILL_STAGE_SECONDS.time(stage="db_write"):
+        async with shared.DB_POOL.acquire() as conn:
+            inserted = await upsert_tick_records(conn, data)
 
-    print(f"[SUCCESS] Inserted {len(data)} records")
+    BACKFILL_ROWS.inc(inserted, result="inserted")
+    BACKFILL_ROWS.inc(len(data) - inserted, result="duplicate")
+    log_sampled("backfill_insert", f"[SUCCESS] Inserted {inserted} records ({len(data) - inserted} duplicates skipped)")
 
 
 # -----------------------------------------------------------
@@ -94,14 +97,14 @@ async def normalize_nse_eq_rows(
     rows: List[Dict],
     ticker: str,
     exchange: str = "NSE",
-) -> List[Dict]:
+) -> List[Tick]:
     """
     Convert NSE historical EQ API rows into internal tick format.
 
     :param rows: Raw NSE API rows
     :param ticker: Trading symbol
     :param exchange: Exchange name
-    :return: Normalized tick dictionaries
+    :return: Normalized ticks
     """
 
     normalized = []
@@ -113,18 +116,18 @@ async def normalize_nse_eq_rows(
         ).date()
 
         normalized.append(
-            {
-                "time": datetime.combine(
+            Tick(
+                time=datetime.combine(
                     trade_date, datetime.min.time()
                 ).replace(tzinfo=timezone.utc),
-                "symbol": ticker,
-                "open": float(row.get("chOpeningPrice", 0.0)),
-                "high": float(row.get("chTradeHighPrice", 0.0)),
-                "low": float(row.get("chTradeLowPrice", 0.0)),
-                "close": float(row.get("chClosingPrice", 0.0)),
-                "volume": int(row.get("chTotTradedQty", 0)),
-                "exchange": exchange,
-            }
+                symbol=ticker,
+                open=float(row.get("chOpeningPrice", 0.0)),
+                high=float(row.get("chTradeHighPrice", 0.0)),
+                low=float(row.get("chTradeLowPrice", 0.0)),
+                close=float(row.get("chClosingPrice", 0.0)),
+                volume=int(row.get("chTotTradedQty", 0)),
+                exchange=exchange,
+            )
         )
 
     return normalized
@@ -134,25 +137,120 @@ async def normalize_nse_eq_rows(
 # FETCH HISTORICAL DATA FOR A TICKER
 # -----------------------------------------------------------
 async def fetch_historical_data(ticker: str, start_date: date = None, end_date: date = None):
-    if (end_date - start_date).days > 60:
-        print("[ERROR] Date Range not allowed more than 60 days")
-        return {}
-
-    payload = {
-        "functionName":"getHistoricalTradeData",
-        "symbol":ticker,
-        'series':'EQ',
-        'fromDate':start_date.strftime('%d-%m-%Y'),
-        'toDate':end_date.strftime('%d-%m-%Y')
-    }
-    data = nse_session.get(url=API_URL,params=payload,proxies=PROXIES)
-    sleep(FETCH_COOLDOWN_TIME)
-    if data.status_code == 200:
-        print("[INFO] Data Fetched Successfully")
-        return data.json()
-    else:
-        print("[ERROR] Data Not Fetched")
-        return {}
+    if (end_date - start_date).days > HISTORY_WINDOW_DAYS:
+        print(f"[ERROR] Date Range not allowed more than {HISTORY_WINDOW_DAYS} days")
+        return None
+
+    # Cooldown between calls is handled by the client's rate limiter
+    try:
+        data = await NSE_CLIENT.historical(ticker, start_date, end_date)
+    except NSEClientError as e:
+        log_sampled("backfill_fetch_error", f"[ERROR] Data Not Fetched: {e}")
+        return None
+
+    return data
+
+
+# -----------------------------------------------------------
+# PARSE RAW HISTORICAL ROWS
+# -----------------------------------------------------------
+def parse_historical_rows(ticker: str, historical_data) -> List[Tick]:
+    """Convert raw NSE historical rows into ticks, skipping bad rows."""
+    processed_batch = []
+
+    for item in historical_data:
+        try:
+            # Parse the date from NSE format (typically "DD-MMM-YYYY")
+            date_str = item.get('CH_TIMESTAMP') or item.get('date') or item.get('DATE') or item.get('mtimestamp')
+
+            if not date_str:
+                continue
+
+            # Try different date formats
+            tick_time = None
+            for date_format in ["%d-%b-%Y", "%d-%m-%Y", "%Y-%m-%d"]:
+                try:
+                    tick_time = datetime.strptime(str(date_str), date_format).replace(tzinfo=IST).astimezone(timezone.utc)
+                    break
+                except ValueError:
+                    continue
+
+            if not tick_time:
+                print(f"[WARN] Could not parse date: {date_str}")
+                continue
+
+            # Extract OHLCV data
+            processed_batch.append(Tick(
+                time=tick_time,
+                symbol=ticker,
+                open=float(item.get('CH_OPENING_PRICE') or float(item.get('chOpeningPrice')) or item.get('open') or item.get('OPEN') or 0),
+                high=float(item.get('CH_TRADE_HIGH_PRICE') or float(item.get('chTradeHighPrice')) or item.get('high') or item.get('HIGH') or 0),
+                low=float(item.get('CH_TRADE_LOW_PRICE') or float(item.get('chTradeLowPrice')) or item.get('low') or item.get('LOW') or 0),
+                close=float(item.get('CH_CLOSING_PRICE') or float(item.get('chClosingPrice')) or item.get('close') or item.get('CLOSE') or 0),
+                volume=int(item.get('CH_TOT_TRADED_QTY') or float(item.get('chTotTradedQty')) or item.get('volume') or item.get('VOLUME') or 0),
+                exchange='NSE'
+            ))
+        except Exception as e:
+            print(f"[WARN] Error processing record: {e}")
+            continue
+
+    return processed_batch
+
+
+# -----------------------------------------------------------
+# LOAD ONE WINDOW FOR A TICKER
+# -----------------------------------------------------------
+async def load_historical_window(ticker: str, start_date: date, end_date: date) -> Tuple[str, int]:
+    """
+    Fetch one API-sized window and write it as its own COPY batch.
+
+    Returns:
+        (checkpoint status, rows written)
+    """
+    with BACKFILL_STAGE_SECONDS.time(stage="fetch"):
+        historical_data = await fetch_historical_data(ticker, start_date, end_date)
+
+    if historical_data is None:
+        return STATUS_FAILED, 0
+
+    if len(historical_data) == 0:
+        log_sampled("backfill_empty", f"[WARN] No historical data retrieved for {ticker} ({start_date} to {end_date})")
+        return STATUS_EMPTY, 0
+
+    with BACKFILL_STAGE_SECONDS.time(stage="parse"):
+        processed_batch = parse_historical_rows(ticker, historical_data)
+
+    if not processed_batch:
+        log_sampled("backfill_empty", f"[WARN] No valid records to insert for {ticker} ({start_date} to {end_date})")
+        return STATUS_EMPTY, 0
+
+    await insert_historical_batch_into_postgres(processed_batch)
+    return STATUS_DONE, len(processed_batch)
+
+
+# -----------------------------------------------------------
+# PLAN THE WINDOWS STILL MISSING
+# -----------------------------------------------------------
+async def plan_historical_windows(ticker_list: List[str], start_date: date, end_date: date) -> List[Tuple[str, date, date, date]]:
+    """
+    Work out which (symbol, window) pieces still need fetching, based on
+    the backfill checkpoints. Windows already fetched or known to be empty
+    are skipped, and partly covered windows only fetch their missing tail.
+
+    Returns:
+        (ticker, window_key, fetch_from, fetch_to) jobs
+    """
+    checkpoints = await load_checkpoints(ticker_list)
+
+    jobs = []
+    for window_key, window_start, window_end in grid_windows(start_date, end_date):
+        # Window-major order spreads consecutive jobs across symbols
+        for ticker in ticker_list:
+            checkpoint = checkpoints.get(ticker, {}).get(window_key)
+            missing = missing_range(checkpoint, window_start, window_end)
+            if missing:
+                jobs.append((ticker, window_key, *missing))
+    return jobs
 
 
 # -----------------------------------------------------------
@@ -167,122 +265,65 @@ async def load_historical_data(ticker: str, start_date: date = None, end_date: d
         start_date: Start date for historical data (default: 10 years ago)
         end_date: End date for historical data (default: today)
     """
-    start_date = start_date or START_DATE
-    end_date = end_date or END_DATE
+    await run_backfill([ticker], start_date or START_DATE, end_date or END_DATE)
 
-    print(f"\n[INFO] Starting HISTORICAL load for {ticker}")
-    print(f"[INFO] Date range: {start_date} to {end_date}")
 
-    loop = asyncio.get_running_loop()
+# -----------------------------------------------------------
+# CONCURRENT BACKFILL ENGINE
+# -----------------------------------------------------------
+async def run_backfill(ticker_list: List[str], start_date: date, end_date: date, workers: int = BACKFILL_WORKERS) -> int:
+    """
+    Backfill every ticker over start_date..end_date.
 
-    try:
-        # Check if historical data already loaded by checking the earliest record
-        async with shared.DB_POOL.acquire() as conn:
-            earliest_record = await conn.fetchval(
-                "SELECT MIN(time) FROM tick_data WHERE symbol = $1",
-                ticker
-            )
+    Each ticker's range is split into API-sized windows, windows already
+    recorded in backfill_checkpoints are skipped, and the rest are fetched
+    by a shared pool of workers. The request rate across all workers
+    is capped by the NSE client's rate limiter.
 
-            if earliest_record:
-                earliest_date = earliest_record.date()
-                # If we have data going back close to our start date, skip
-                # Allow 7 days tolerance
-                if earliest_date <= start_date + timedelta(days=7):
-                    print(f"[INFO] Historical data already exists for {ticker} (earliest: {earliest_date}). Skipping...")
-                    return
-                else:
-                    print(f"[INFO] Found existing data from {earliest_date}, but will backfill to {start_date}")
-                    end_date=earliest_date
-
-        # Fetch historical data using NSE client (runs in executor since it's synchronous)        print(f"[INFO] Fetching historical data from NSE...")
-        # historical_data = await loop.run_in_executor(
-            # None,
-            # nse.fetch_equity_historical_data,
-            # ticker,
-            # start_date,
-            # end_date,
-            # ["EQ"]
-        # )
-        historical_data = await fetch_historical_data(ticker, start_date, end_date)
+    Returns:
+        Number of windows that failed (they are fetched again on the next run)
+    """
+    print(f"[INFO] Date range: {start_date} to {end_date}")
 
-        if not historical_data or len(historical_data) == 0:
-            print(f"[WARN] No historical data retrieved for {ticker}")
-            print(f"[INFO] Creating placeholder records to mark as attempted...")
-
-            # Create placeholder records for each day in the range to avoid retrying
-            placeholder_batch = []
-            current_date = start_date
-            while current_date <= end_date:
-                placeholder_batch.append({
-                    'time': datetime.combine(current_date, datetime.min.time()).replace(tzinfo=timezone.utc),
-                    'symbol': ticker,
-                    'open': 0.0,
-                    'high': 0.0,
-                    'low': 0.0,
-                    'close': 0.0,
-                    'volume': 0,
-                    'exchange': 'NSE'
-                })
-                current_date += timedelta(days=1)
-
-            await insert_historical_batch_into_postgres(placeholder_batch)
-            print(f"[INFO] Inserted {len(placeholder_batch)} placeholder records for {ticker}")
-            return
+    await ensure_checkpoint_table()
 
-        print(f"[INFO] Fetched {len(historical_data)} historical bars for {ticker}")
+    queue: asyncio.Queue = asyncio.Queue()
+    for job in await plan_historical_windows(ticker_list, start_date, end_date):
+        queue.put_nowait(job)
 
-        # Process data into the format expected by our database
-        processed_batch = []
+    total = queue.qsize()
+    if not total:
+        print("[INFO] All windows already fetched. Nothing to do.")
+        return 0
+    print(f"[INFO] {total} windows to fetch across {len(ticker_list)} symbols with {workers} workers")
+    failed = 0
 
-        for item in historical_data:
+    async def worker():
+        nonlocal failed
+        while True:
             try:
-                # Parse the date from NSE format (typically "DD-MMM-YYYY")
-                date_str = item.get('CH_TIMESTAMP') or item.get('date') or item.get('DATE') or item.get('mtimestamp')
-
-                if not date_str:
-                    continue
-
-                # Try different date formats
-                tick_time = None
-                for date_format in ["%d-%b-%Y", "%d-%m-%Y", "%Y-%m-%d"]:
-                    try:
-                        tick_time = datetime.strptime(str(date_str), date_format).replace(tzinfo=IST).astimezone(timezone.utc)
-                        break
-                    except ValueError:
-                        continue
-
-                if not tick_time:
-                    print(f"[WARN] Could not parse date: {date_str}")
-                    continue
-
-                # Extract OHLCV data
-                processed_batch.append({
-                    'time': tick_time,
-                    'symbol': ticker,
-                    'open': float(item.get('CH_OPENING_PRICE') or float(item.get('chOpeningPrice')) or item.get('open') or item.get('OPEN') or 0),
-                    'high': float(item.get('CH_TRADE_HIGH_PRICE') or float(item.get('chTradeHighPrice')) or item.get('high') or item.get('HIGH') or 0),
-                    'low': float(item.get('CH_TRADE_LOW_PRICE') or float(item.get('chTradeLowPrice')) or item.get('low') or item.get('LOW') or 0),
-                    'close': float(item.get('CH_CLOSING_PRICE') or float(item.get('chClosingPrice')) or item.get('close') or item.get('CLOSE') or 0),
-                    'volume': int(item.get('CH_TOT_TRADED_QTY') or float(item.get('chTotTradedQty')) or item.get('volume') or item.get('VOLUME') or 0),
-                    'exchange': 'NSE'
-                })
+                ticker, window_key, fetch_from, fetch_to = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            BACKFILL_QUEUE_DEPTH.set(queue.qsize())
+            try:
+                status, rows = await load_historical_window(ticker, fetch_from, fetch_to)
             except Exception as e:
-                print(f"[WARN] Error processing record: {e}")
-                continue
+                print(f"[ERROR] Historical load failed for {ticker} ({fetch_from} to {fetch_to}): {e}")
+                status, rows = STATUS_FAILED, 0
 
-        if not processed_batch:
-            print(f"[WARN] No valid records to insert for {ticker}")
-            return
-
-        # Bulk insert into database
-        await insert_historical_batch_into_postgres(processed_batch)
+            BACKFILL_WINDOWS.inc(status=status)
+            if status == STATUS_FAILED:
+                BACKFILL_ERRORS.inc(symbol=ticker)
+                failed += 1
 
-        print(f"[SUCCESS] Historical load completed for {ticker} ({len(processed_batch)} records)")
+            if status == STATUS_FAILED:
+                await record_checkpoint(ticker, window_key, status)
+            else:
+                await record_checkpoint(ticker, window_key, status, fetch_from, fetch_to, rows)
 
-    except Exception as e:
-        print(f"[ERROR] Historical load failed for {ticker}: {e}")
-        import traceback
-        traceback.print_exc()
+    await asyncio.gather(*(worker() for _ in range(min(workers, total))))
+    return failed
 
 
 # -----------------------------------------------------------
@@ -296,9 +337,15 @@ async def run_historical_loader(symbols: List[str] = None, days: int = None):
         symbols: List of symbols to load (default: all from database)
         days: Number of days of history to load (default: 10 years)
     """
+    global NSE_CLIENT
     await init_connections()
+    NSE_CLIENT = AsyncNSEClient()
 
+    metrics_server = None
     try:
+        metrics_server = await start_metrics_server(HISTORICAL_METRICS_PORT)
+        await NSE_CLIENT.start()
+
         # Get ticker list
         if symbols:
             ticker_list = symbols
@@ -315,17 +362,15 @@ async def run_historical_loader(symbols: List[str] = None, days: int = None):
         end_date = END_DATE
         start_date = START_DATE if not days else end_date - timedelta(days=days)
 
-        # Load historical data for each ticker
-        for ticker in ticker_list:
-            await load_historical_data(ticker, start_date, end_date)
-            # Small delay to avoid rate limiting
-            await asyncio.sleep(1)
+        await run_backfill(ticker_list, start_date, end_date)
 
         print(f"\n[SUCCESS] Historical data load completed for all symbols")
 
     except KeyboardInterrupt:
         print("\n[INFO] Interrupted by user")
     finally:
+        await NSE_CLIENT.close()
+        await close_metrics_server(metrics_server)
         await close_connections()
 
 
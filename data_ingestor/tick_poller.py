@@ -1,6 +1,15 @@
 """
 Tick Data Poller - Runs continuously to fetch and store tick data every minute.
 
+Polling follows the NSE session calendar (market_calendar.py): it sleeps
+while the market is closed, polls watched and liquid symbols every cycle
+during the session and the rest less often (fetch_scheduler.PollPlanner).
+Quotes that have not changed since the last poll are not written again.
+
+Several instances can run side by side; each polls only its share of the
+symbols (shard_coordinator.py), and the share is rebalanced as instances
+start or die.
+
 Usage:
     python tick_poller.py
 
@@ -9,18 +18,28 @@ Schedule with systemd service or run in background:
 """
 
 import asyncio
-from datetime import datetime, timezone, timedelta
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
 
 import shared
 from shared import (
-    TickData,
-    nse,
+    Tick,
+    CLOSED_RECHECK_INTERVAL,
+    LIQUID_SYMBOLS,
+    POLLER_METRICS_PORT,
     init_connections,
     close_connections,
 )
-
-# IST timezone offset
-IST = timezone(timedelta(hours=5, minutes=30))
+from tick_writer import TickWriter
+from tick_stream import TickStreamPublisher
+from fetch_scheduler import FetchScheduler, PollPlanner
+from market_calendar import IST, MarketCalendar, SESSION_CLOSED
+from nse_client import AsyncNSEClient
+from symbol_registry import SymbolRegistry
+from shard_coordinator import ShardCoordinator
+from metrics import Counter, Gauge, Histogram, log_sampled, start_metrics_server, close_metrics_server
 
 # Polling interval in seconds (1 minute)
 POLL_INTERVAL = 60
@@ -29,92 +48,137 @@ POLL_INTERVAL = 60
 # -----------------------------------------------------------
 # DATABASE INSERT
 # -----------------------------------------------------------
-async def insert_into_postgres(data: TickData):
-    sql = """
-        INSERT INTO tick_data (time, symbol, close, volume, exchange, high, low, open)
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8);
-    """
+# Write-behind buffers, NSE client, poll planner, shard coordinator and symbol registry, created in run_tick_poller()
+TICK_WRITER: Optional[TickWriter] = None
+TICK_STREAM: Optional[TickStreamPublisher] = None
+NSE_CLIENT: Optional[AsyncNSEClient] = None
+PLANNER: Optional[PollPlanner] = None
+COORDINATOR: Optional[ShardCoordinator] = None
+REGISTRY: Optional[SymbolRegistry] = None
 
-    async with shared.DB_POOL.acquire() as conn:
-        await conn.execute(
-            sql,
-            data.time,
-            data.symbol,
-            data.close,
-            data.volume,
-            data.exchange,
-            data.high,
-            data.low,
-            data.open
-        )
-        print(f"Tick Data Inserted for {data.symbol}")
+# Last tick stored per symbol, to skip writing frozen quotes again
+LAST_QUOTES: dict[str, Tick] = {}
+
+# Per-tick stages: fetch (incl. rate-limit wait), parse, db_write (enqueue), redis_publish (enqueue)
+POLL_STAGE_SECONDS = Histogram("poll_stage_seconds", "Time spent per tick in each poller stage", ["stage"])
+POLL_TICKS = Counter("poll_ticks_total", "Polled quotes by outcome", ["result"])
+POLL_ERRORS = Counter("poll_errors_total", "Failed polls by symbol", ["symbol"])
+TICK_WRITER_QUEUE_DEPTH = Gauge("tick_writer_queue_depth", "Ticks waiting for the batched writer",
+                                callback=lambda: TICK_WRITER.queue.qsize())
+TICK_STREAM_QUEUE_DEPTH = Gauge("tick_stream_queue_depth", "Ticks waiting to be published to the stream",
+                                callback=lambda: TICK_STREAM.queue.qsize())
+POLL_SYMBOLS = Gauge("poll_symbols", "Symbols in this instance's share of the poll set")
+
+
+def forget_dropped_ticks(ticks: list[Tick]):
+    """The writer gave up on these ticks; forget them so the next poll stores them again."""
+    for tick in ticks:
+        if LAST_QUOTES.get(tick.symbol) == tick:
+            del LAST_QUOTES[tick.symbol]
+
+
+async def insert_into_postgres(tick: Tick):
+    """Queue a tick for the batched COPY writer."""
+    with POLL_STAGE_SECONDS.time(stage="db_write"):
+        await TICK_WRITER.put(tick)
 
 
 # -----------------------------------------------------------
 # PUBLISH TO REDIS
 # -----------------------------------------------------------
-async def publish_to_redis(data: TickData):
-    channel = f"market_data:{data.symbol}"
-    await shared.REDIS_CLIENT.publish(channel, data.json())
+async def publish_to_redis(tick: Tick):
+    """Queue the tick for the stream and the snapshot hash, written in pipelined batches."""
+    with POLL_STAGE_SECONDS.time(stage="redis_publish"):
+        await TICK_STREAM.put(tick)
 
 
 # -----------------------------------------------------------
-# LOAD TICKER LIST FROM DATABASE
+# WATCHED SYMBOLS
 # -----------------------------------------------------------
-async def load_ticker_list() -> list[str]:
-    """Load all tracked symbols from the database."""
-    sql = "SELECT symbol FROM company_symbols;"
+async def load_watched_symbols() -> set[str]:
+    """Symbols someone holds; they are polled every cycle."""
+    sql = "SELECT DISTINCT UPPER(symbol) AS symbol FROM user_requests WHERE mystocks;"
     async with shared.DB_POOL.acquire() as conn:
         rows = await conn.fetch(sql)
-        return [r["symbol"] for r in rows]
+        return {r["symbol"] for r in rows}
+
+
+# -----------------------------------------------------------
+# PARSE
+# -----------------------------------------------------------
+@lru_cache(maxsize=4096)
+def parse_quote_time(value: str) -> Optional[datetime]:
+    """
+    NSE lastUpdateTime ("18-Oct-2026 15:29:59", IST) as UTC. Most symbols in a
+    cycle share a handful of timestamps, so results are cached.
+    """
+    try:
+        return datetime.strptime(value, "%d-%b-%Y %H:%M:%S").replace(tzinfo=IST).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+
+def quote_to_tick(ticker: str, quote: dict) -> Tick:
+    """Build a Tick from an equity_quote() dict; the time falls back to now."""
+    time = parse_quote_time(quote["date"]) if quote.get("date") else None
+    return Tick(
+        time or datetime.now(timezone.utc),
+        ticker,
+        float(quote["close"]),
+        int(quote.get("volume") or 0),
+        "NSE",
+        float(quote["high"]),
+        float(quote["low"]),
+        float(quote["open"]),
+    )
 
 
 # -----------------------------------------------------------
 # FETCH + PROCESS ONE TICKER
 # -----------------------------------------------------------
 async def fetch_and_process_data(ticker: str):
-    """Fetch a tick from NSE using python-nse and push to Postgres + Redis."""
-    try:
-        loop = asyncio.get_running_loop()
+    """Fetch a tick from NSE and push to Postgres + Redis."""
+    # The lease may have moved to another instance since the cycle started
+    if COORDINATOR is not None and not COORDINATOR.owns(ticker):
+        POLL_TICKS.inc(result="disowned")
+        return
 
-        # Fetch quote (python-nse is synchronous)
-        quote = await loop.run_in_executor(None, nse.equityQuote, ticker)
+    tick = None
+    try:
+        with POLL_STAGE_SECONDS.time(stage="fetch"):
+            quote = await NSE_CLIENT.equity_quote(ticker)
 
         if not quote:
-            print(f"[WARN] No data for {ticker}")
+            POLL_TICKS.inc(result="empty")
+            log_sampled("poll_empty", f"[WARN] No data for {ticker}")
+            REGISTRY.quote_failed(ticker)
+            return
+
+        with POLL_STAGE_SECONDS.time(stage="parse"):
+            tick = quote_to_tick(ticker, quote)
+
+        REGISTRY.quote_ok(ticker)
+        PLANNER.record(ticker, tick.close, tick.volume)
+
+        # Frozen quote (e.g. a halted or illiquid symbol): nothing new to store
+        if LAST_QUOTES.get(ticker) == tick:
+            POLL_TICKS.inc(result="unchanged")
             return
+        LAST_QUOTES[ticker] = tick
 
-        # Parse time
-        time = datetime.now(timezone.utc)
-        if quote.get("date"):
-            try:
-                time = (
-                    datetime.strptime(quote["date"], "%d-%b-%Y %H:%M:%S")
-                    .replace(tzinfo=IST)
-                    .astimezone(timezone.utc)
-                )
-            except ValueError:
-                pass  # Use current time if parsing fails
-
-        tick = TickData(
-            time=time,
-            symbol=ticker,
-            close=quote.get("close"),
-            volume=quote.get("volume") or 0,
-            high=quote.get("high"),
-            low=quote.get("low"),
-            open=quote.get("open"),
-            exchange="NSE"
-        )
-
-        # Store in DB + publish via Redis
-        await asyncio.gather(
-            insert_into_postgres(tick),
-            publish_to_redis(tick)
-        )
+        # Store in DB + publish via Redis. The enqueue only waits when the
+        # writer is backed up, so awaiting in turn saves two tasks per tick.
+        await insert_into_postgres(tick)
+        await publish_to_redis(tick)
+        POLL_TICKS.inc(result="stored")
 
     except Exception as e:
-        print(f"[ERROR] {ticker}: {e}")
+        POLL_TICKS.inc(result="error")
+        POLL_ERRORS.inc(symbol=ticker)
+        log_sampled("poll_error", f"[ERROR] {ticker}: {e}")
+        # Only a failed fetch or parse says anything about the symbol itself
+        if tick is None:
+            REGISTRY.quote_failed(ticker)
 
 
 # -----------------------------------------------------------
@@ -122,36 +186,88 @@ async def fetch_and_process_data(ticker: str):
 # -----------------------------------------------------------
 async def run_tick_poller():
     """Main polling loop that fetches tick data every minute."""
+    global TICK_WRITER, TICK_STREAM, NSE_CLIENT, PLANNER, COORDINATOR, REGISTRY
     await init_connections()
+    TICK_WRITER = TickWriter(shared.DB_POOL, on_dropped=forget_dropped_ticks)
+    TICK_WRITER.start()
+    TICK_STREAM = TickStreamPublisher(shared.REDIS_CLIENT)
+    TICK_STREAM.start()
+    NSE_CLIENT = AsyncNSEClient()
+    PLANNER = PollPlanner(interval=POLL_INTERVAL)
+    COORDINATOR = ShardCoordinator()
+    REGISTRY = registry = SymbolRegistry()
+    calendar = MarketCalendar()
+    scheduler = FetchScheduler(fetch_and_process_data, interval=POLL_INTERVAL)
 
     print("Tick Poller Started")
 
+    metrics_server = None
     try:
-        # Load ticker list from database
-        ticker_list = await load_ticker_list()
+        metrics_server = await start_metrics_server(POLLER_METRICS_PORT)
+        await NSE_CLIENT.start()
+        await COORDINATOR.start()
 
-        if not ticker_list:
-            print("[WARN] No symbols found in database. Run company_initializer.py first.")
-            return
+        # Load ticker list once; later changes arrive via LISTEN/NOTIFY and Redis
+        await registry.start()
+        ticker_list = registry.tickers()
 
-        print(f"Polling {len(ticker_list)} symbols: {ticker_list}")
+        if not ticker_list:
+            print("[WARN] No symbols found in database. Waiting for company_initializer.py or user requests.")
+        else:
+            print(f"Polling {len(ticker_list)} symbols: {ticker_list}")
 
         # Main loop
+        previous_session = None
         while True:
-            print(f"\n[{datetime.now()}] Fetching tick data...")
-
-            # Refresh ticker list periodically (in case new companies were added)
-            ticker_list = await load_ticker_list()
-
-            tasks = [fetch_and_process_data(t) for t in ticker_list]
-            await asyncio.gather(*tasks)
-
-            print(f"Sleeping for {POLL_INTERVAL} seconds...")
-            await asyncio.sleep(POLL_INTERVAL)
+            calendar.reload()
+            now = datetime.now(timezone.utc)
+            session = calendar.session_at(now)
+
+            if session == SESSION_CLOSED:
+                # Wake up at the next pre-open, re-checking now and then for holiday file edits
+                wait = min((calendar.next_open(now) - now).total_seconds(), CLOSED_RECHECK_INTERVAL)
+                if previous_session != SESSION_CLOSED:
+                    print(f"[{now.astimezone(IST):%Y-%m-%d %H:%M}] Market closed; next open {calendar.next_open(now).astimezone(IST):%Y-%m-%d %H:%M} IST")
+                previous_session = session
+                await asyncio.sleep(max(wait, 1.0))
+                continue
+
+            if previous_session in (None, SESSION_CLOSED):
+                PLANNER.watched = await load_watched_symbols()
+            previous_session = session
+
+            # No-op unless the LISTEN connection dropped, in which case the set is reloaded
+            await registry.ensure_listening()
+            all_tickers = registry.tickers()
+            ticker_list = await COORDINATOR.assign(all_tickers)
+            POLL_SYMBOLS.set(len(ticker_list))
+            # The liquid tier is split between instances like the symbols are
+            PLANNER.liquid_symbols = math.ceil(LIQUID_SYMBOLS / max(1, len(COORDINATOR.members)))
+            PLANNER.watched |= registry.requested
+            due = PLANNER.due(ticker_list, session)
+
+            print(
+                f"\n[{datetime.now()}] {session}: fetching {len(due)} of {len(ticker_list)} symbols "
+                f"({len(all_tickers)} across {len(COORDINATOR.members)} instances)..."
+            )
+
+            # Symbols are spread across the slot, so only sleep what is left of it
+            elapsed = await scheduler.run_cycle(due)
+            remaining = max(0.0, POLL_INTERVAL - elapsed)
+
+            print(f"Cycle took {elapsed:.1f}s, sleeping for {remaining:.1f} seconds...")
+            await asyncio.sleep(remaining)
 
     except KeyboardInterrupt:
         print("\nShutting down...")
     finally:
+        await COORDINATOR.close()
+        await registry.close()
+        # Flush buffered ticks before the pool goes away
+        await TICK_WRITER.close()
+        await TICK_STREAM.close()
+        await NSE_CLIENT.close()
+        await close_metrics_server(metrics_server)
         await close_connections()
 
 
@@ -0,0 +1,278 @@
+"""
+Tick Stream - Redis Streams bus for polled ticks.
+
+The poller appends every stored tick to the REDIS_TICK_STREAM stream
+(fields: symbol, tick JSON) and updates the REDIS_SNAPSHOT_KEY hash. Ticks
+are buffered and written in pipelined batches, and the stream is trimmed
+to about TICK_STREAM_MAXLEN entries, which is the window a newly started
+consumer can replay.
+
+Consumers that split work (alerts, aggregation) read through a consumer
+group: each entry goes to one consumer of the group, is acknowledged once
+handled, and entries left unacknowledged by a crashed consumer are taken
+over after TICK_STREAM_CLAIM_IDLE seconds. Fan-out readers that need every
+tick in every process (the backend's SSE broadcaster) use plain XREAD from
+their last seen id instead.
+
+Usage:
+    publisher = TickStreamPublisher(shared.REDIS_CLIENT)
+    publisher.start()
+    await publisher.put(tick)
+    ...
+    await publisher.close()  # final flush
+
+    python tick_stream.py --group alerts               # Print new ticks as a consumer of "alerts"
+    python tick_stream.py --group alerts --from 0      # Replay everything still in the stream first
+"""
+
+import asyncio
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+
+import shared
+from shared import (
+    Tick,
+    tick_to_json,
+    tick_from_json,
+    REDIS_TICK_STREAM,
+    REDIS_SNAPSHOT_KEY,
+    TICK_STREAM_MAXLEN,
+    TICK_STREAM_BATCH_SIZE,
+    TICK_STREAM_FLUSH_INTERVAL,
+    TICK_STREAM_MAX_PENDING,
+    TICK_STREAM_CLAIM_IDLE,
+)
+from metrics import Counter, Histogram, log_sampled
+
+STREAM_FLUSH_SECONDS = Histogram("tick_stream_flush_seconds", "Duration of one pipelined stream write")
+STREAM_TICKS = Counter("tick_stream_ticks_total", "Ticks handed to the stream", ["result"])
+STREAM_CONSUMED = Counter("tick_stream_consumed_total", "Stream entries handled by consumers", ["group", "result"])
+
+
+# -----------------------------------------------------------
+# PUBLISHER
+# -----------------------------------------------------------
+class TickStreamPublisher:
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        batch_size: int = TICK_STREAM_BATCH_SIZE,
+        flush_interval: float = TICK_STREAM_FLUSH_INTERVAL,
+        max_pending: int = TICK_STREAM_MAX_PENDING,
+        maxlen: int = TICK_STREAM_MAXLEN,
+    ):
+        self.redis = redis
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxlen = maxlen
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, tick: Tick):
+        """Queue a tick for publishing. Waits while the buffer is full."""
+        if self._closing:
+            raise RuntimeError("TickStreamPublisher is closed")
+        await self.queue.put(tick)
+
+    async def close(self):
+        """Stop accepting ticks and publish everything still buffered."""
+        self._closing = True
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _collect_batch(self) -> list[Tick]:
+        """Wait for the first tick, then gather more until full or timed out."""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _flush(self, batch: list[Tick]):
+        try:
+            with STREAM_FLUSH_SECONDS.time():
+                snapshot = {}
+                pipe = self.redis.pipeline(transaction=False)
+                for tick in batch:
+                    payload = tick_to_json(tick)
+                    pipe.xadd(
+                        REDIS_TICK_STREAM,
+                        {"symbol": tick.symbol, "tick": payload},
+                        maxlen=self.maxlen,
+                        approximate=True,
+                    )
+                    snapshot[tick.symbol] = payload
+                # Only the newest tick per symbol matters for the snapshot
+                pipe.hset(REDIS_SNAPSHOT_KEY, mapping=snapshot)
+                await pipe.execute()
+            STREAM_TICKS.inc(len(batch), result="published")
+        except Exception as e:
+            STREAM_TICKS.inc(len(batch), result="dropped")
+            print(f"[ERROR] Tick stream flush failed ({len(batch)} ticks dropped): {e}")
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            await self._flush(batch)
+
+
+# -----------------------------------------------------------
+# CONSUMER GROUPS
+# -----------------------------------------------------------
+class TickStreamConsumer:
+    def __init__(
+        self,
+        group: str,
+        handler: Callable[[str, Tick], Awaitable[None]],
+        consumer: Optional[str] = None,
+        start_id: str = "$",
+        count: int = TICK_STREAM_BATCH_SIZE,
+        block_ms: int = 5000,
+        claim_idle: float = TICK_STREAM_CLAIM_IDLE,
+    ):
+        """
+        Args:
+            group: Consumer group; each entry is handled by one consumer of the group
+            handler: Coroutine called with (entry id, tick); an entry is acknowledged
+                     when it returns and retried later when it raises
+            consumer: Name of this consumer within the group (default <hostname>-<pid>)
+            start_id: Where a new group starts: "$" for new ticks only, "0" for
+                      everything still in the stream, or an entry id
+            count: Entries read per call
+            block_ms: How long one read waits for new entries
+            claim_idle: Seconds before another consumer's unacknowledged entries are taken over
+        """
+        self.group = group
+        self.handler = handler
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.start_id = start_id
+        self.count = count
+        self.block_ms = block_ms
+        self.claim_idle = claim_idle
+
+    async def ensure_group(self):
+        try:
+            await shared.REDIS_CLIENT.xgroup_create(REDIS_TICK_STREAM, self.group, id=self.start_id, mkstream=True)
+            print(f"[INFO] Created consumer group {self.group} at {self.start_id}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def seek(self, position: str):
+        """Move the group to `position` ("0", "$" or an entry id) to replay or skip ahead."""
+        await self.ensure_group()
+        await shared.REDIS_CLIENT.xgroup_setid(REDIS_TICK_STREAM, self.group, position)
+
+    async def _handle(self, entries: list):
+        acked = []
+        for entry_id, fields in entries:
+            # Entries trimmed from the stream while pending come back without fields
+            if not fields:
+                acked.append(entry_id)
+                continue
+            try:
+                await self.handler(entry_id, tick_from_json(fields["tick"]))
+            except Exception as e:
+                STREAM_CONSUMED.inc(group=self.group, result="error")
+                log_sampled(f"stream_error:{self.group}", f"[ERROR] {self.group} failed on {entry_id}: {e}")
+                continue
+            acked.append(entry_id)
+        if acked:
+            await shared.REDIS_CLIENT.xack(REDIS_TICK_STREAM, self.group, *acked)
+            STREAM_CONSUMED.inc(len(acked), group=self.group, result="acked")
+
+    async def _read(self, stream_id: str, block: Optional[int] = None) -> list:
+        response = await shared.REDIS_CLIENT.xreadgroup(
+            self.group, self.consumer, {REDIS_TICK_STREAM: stream_id}, count=self.count, block=block,
+        )
+        return response[0][1] if response else []
+
+    async def _reclaim(self):
+        """Take over entries other consumers read but never acknowledged."""
+        start = "0-0"
+        while True:
+            next_start, entries, *_ = await shared.REDIS_CLIENT.xautoclaim(
+                REDIS_TICK_STREAM, self.group, self.consumer,
+                min_idle_time=int(self.claim_idle * 1000), start_id=start, count=self.count,
+            )
+            if entries:
+                print(f"[INFO] {self.group}: reclaimed {len(entries)} unacknowledged entries")
+                await self._handle(entries)
+            if next_start in ("0-0", b"0-0"):
+                return
+            start = next_start
+
+    async def run(self):
+        """Handle entries until cancelled."""
+        await self.ensure_group()
+
+        # Entries this consumer read but did not acknowledge before it stopped;
+        # ones that fail again are retried by the periodic reclaim
+        pending_from = "0"
+        while entries := await self._read(pending_from):
+            await self._handle(entries)
+            pending_from = entries[-1][0]
+
+        last_reclaim = 0.0
+        while True:
+            if time.monotonic() - last_reclaim >= self.claim_idle:
+                await self._reclaim()
+                last_reclaim = time.monotonic()
+            await self._handle(await self._read(">", block=self.block_ms))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Consume the tick stream through a consumer group")
+    parser.add_argument("--group", required=True, help="Consumer group name")
+    parser.add_argument("--consumer", help="Consumer name (default: <hostname>-<pid>)")
+    parser.add_argument("--from", dest="position", help='Move the group first: "0" replays the stream, "$" skips to new ticks')
+    args = parser.parse_args()
+
+    async def print_tick(entry_id: str, tick: Tick):
+        print(f"{entry_id} {tick.symbol} {tick.time:%Y-%m-%d %H:%M:%S} close={tick.close} volume={tick.volume}")
+
+    async def main():
+        await shared.init_connections()
+        consumer = TickStreamConsumer(args.group, print_tick, consumer=args.consumer, start_id=args.position or "$")
+        try:
+            if args.position:
+                await consumer.seek(args.position)
+            await consumer.run()
+        finally:
+            await shared.close_connections()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,144 @@
+"""
+Tick Writer - Write-behind buffer that batches ticks into COPY inserts.
+
+Ticks are queued by the poller and flushed to Postgres either when a batch
+fills up or when the flush interval elapses, whichever comes first. Ticks
+already stored for the same (symbol, time) are skipped at write time. The queue
+is bounded, so a slow database makes `put()` wait instead of growing memory.
+
+A batch that fails to write is retried with capped exponential backoff. If it
+still fails, it is dropped and handed to the `on_dropped` callback, so the
+producer can forget those ticks and store them again on its next poll.
+
+Usage:
+    writer = TickWriter(shared.DB_POOL)
+    writer.start()
+    await writer.put(tick)
+    ...
+    await writer.close()  # final flush
+"""
+
+import asyncio
+from typing import Callable, Optional
+
+import asyncpg
+
+from shared import (
+    Tick,
+    upsert_tick_records,
+    TICK_WRITER_BATCH_SIZE,
+    TICK_WRITER_FLUSH_INTERVAL,
+    TICK_WRITER_MAX_PENDING,
+    TICK_WRITER_MAX_RETRIES,
+    TICK_WRITER_BACKOFF_CAP,
+)
+from metrics import Counter, Histogram, log_sampled
+
+TICK_FLUSH_SECONDS = Histogram("tick_writer_flush_seconds", "Duration of one batched COPY upsert")
+TICK_ROWS = Counter("tick_writer_rows_total", "Ticks flushed to tick_data", ["result"])
+TICK_FLUSH_ERRORS = Counter("tick_writer_flush_errors_total", "Failed batch write attempts")
+
+
+# -----------------------------------------------------------
+# WRITE-BEHIND BUFFER
+# -----------------------------------------------------------
+class TickWriter:
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        batch_size: int = TICK_WRITER_BATCH_SIZE,
+        flush_interval: float = TICK_WRITER_FLUSH_INTERVAL,
+        max_pending: int = TICK_WRITER_MAX_PENDING,
+        max_retries: int = TICK_WRITER_MAX_RETRIES,
+        on_dropped: Optional[Callable[[list[Tick]], None]] = None,
+    ):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.on_dropped = on_dropped
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.rows_written = 0
+        self.batches_written = 0
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def start(self):
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, tick: Tick):
+        """
+        Queue a tick for writing. Waits while the buffer is full, which
+        applies backpressure to the producer when Postgres falls behind.
+        """
+        if self._closing:
+            raise RuntimeError("TickWriter is closed")
+        # A Tick is already a row in TICK_COLUMNS order
+        await self.queue.put(tick)
+
+    async def close(self):
+        """Stop accepting ticks and flush everything still buffered."""
+        self._closing = True
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _collect_batch(self) -> list[tuple]:
+        """Wait for the first record, then gather more until full or timed out."""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _write(self, batch: list[tuple]) -> int:
+        """Upsert the batch, retrying with capped backoff; raises once retries run out."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                with TICK_FLUSH_SECONDS.time():
+                    async with self.pool.acquire() as conn:
+                        return await upsert_tick_records(conn, batch)
+            except Exception as e:
+                TICK_FLUSH_ERRORS.inc()
+                if attempt == self.max_retries:
+                    raise
+                log_sampled("tick_flush_retry", f"[WARN] Tick flush failed ({len(batch)} ticks), retrying: {e}")
+                await asyncio.sleep(min(TICK_WRITER_BACKOFF_CAP, 0.5 * 2 ** attempt))
+
+    async def _flush(self, batch: list[tuple]):
+        try:
+            inserted = await self._write(batch)
+            self.rows_written += inserted
+            self.batches_written += 1
+            TICK_ROWS.inc(inserted, result="inserted")
+            TICK_ROWS.inc(len(batch) - inserted, result="duplicate")
+            log_sampled("tick_flush", f"[DB] Flushed {len(batch)} ticks ({len(batch) - inserted} duplicates skipped)")
+        except Exception as e:
+            TICK_ROWS.inc(len(batch), result="dropped")
+            log_sampled("tick_flush_error", f"[ERROR] Tick flush failed ({len(batch)} ticks dropped): {e}")
+            if self.on_dropped is not None:
+                self.on_dropped(batch)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            await self._flush(batch)
@@ -0,0 +1,189 @@
+import time
+
+from django.db import connection
+
+# Supported candle intervals -> Postgres interval literal
+INTERVALS = {
+    "1m": "1 minute",
+    "5m": "5 minutes",
+    "15m": "15 minutes",
+    "1h": "1 hour",
+    "1d": "1 day",
+    "1w": "1 week",
+}
+
+# Continuous aggregates created by `manage.py setup_timescale` (bucket -> view)
+ROLLUPS = {
+    "1 minute": "tick_candles_1m",
+    "5 minutes": "tick_candles_5m",
+    "1 hour": "tick_candles_1h",
+    "1 day": "tick_candles_1d",
+}
+
+# Coarsest rollup whose buckets divide each candle interval evenly
+ROLLUP_FOR_INTERVAL = {
+    "1m": "tick_candles_1m",
+    "5m": "tick_candles_5m",
+    "15m": "tick_candles_5m",
+    "1h": "tick_candles_1h",
+    "1d": "tick_candles_1d",
+    "1w": "tick_candles_1d",
+}
+
+CANDLE_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+# Buckets follow the NSE trading day; daily bars are stored at IST midnight
+CANDLE_TIMEZONE = "Asia/Kolkata"
+
+# Intervals built from whole trading days
+DAY_INTERVALS = {"1d", "1w"}
+
+# Every poller tick carries the day's open/high/low and running total volume,
+# so an intraday candle takes its prices from close and its volume from how far
+# the day's running total grew since the previous candle. Buckets are read
+# from the start of the day so the first candle has that baseline too.
+INTRADAY_CANDLE_SQL = """
+    WITH buckets AS ({buckets}),
+    running AS (
+        SELECT *, max(day_volume) OVER trading_day AS traded
+        FROM buckets
+        WINDOW trading_day AS (PARTITION BY (bucket AT TIME ZONE %(tz)s)::date ORDER BY bucket)
+    ),
+    candles AS (
+        SELECT *, traded - coalesce(lag(traded) OVER trading_day, 0) AS volume
+        FROM running
+        WINDOW trading_day AS (PARTITION BY (bucket AT TIME ZONE %(tz)s)::date ORDER BY bucket)
+    )
+    SELECT
+        extract(epoch FROM bucket)::bigint,
+        open::float8,
+        high::float8,
+        low::float8,
+        close::float8,
+        volume::bigint
+    FROM candles
+    WHERE bucket >= time_bucket(%(interval)s::interval, %(start)s::timestamptz, %(tz)s)
+    ORDER BY bucket;
+"""
+
+RAW_INTRADAY_BUCKETS = """
+    SELECT
+        time_bucket(%(interval)s::interval, time, %(tz)s) AS bucket,
+        first(close, time) AS open,
+        max(close) AS high,
+        min(close) AS low,
+        last(close, time) AS close,
+        max(volume) AS day_volume
+    FROM tick_data
+    WHERE symbol = %(symbol)s
+        AND time >= time_bucket('1 day', %(start)s::timestamptz, %(tz)s)
+        AND time < %(end)s
+    GROUP BY 1
+"""
+
+# Daily and weekly candles keep the rows' own open/high/low (the day's so far
+# for a tick) and count each day's final running total once
+DAY_CANDLE_SQL = """
+    SELECT
+        extract(epoch FROM time_bucket(%(interval)s::interval, bucket, %(tz)s))::bigint AS candle,
+        first(open, bucket)::float8,
+        max(high)::float8,
+        min(low)::float8,
+        last(close, bucket)::float8,
+        sum(day_volume)::bigint
+    FROM ({days}) AS days
+    GROUP BY candle
+    ORDER BY candle;
+"""
+
+RAW_DAYS = """
+    SELECT
+        time_bucket('1 day', time, %(tz)s) AS bucket,
+        first(open, time) AS open,
+        max(high) AS high,
+        min(low) AS low,
+        last(close, time) AS close,
+        max(volume) AS day_volume
+    FROM tick_data
+    WHERE symbol = %(symbol)s
+        AND time >= time_bucket(%(interval)s::interval, %(start)s::timestamptz, %(tz)s)
+        AND time < %(end)s
+    GROUP BY 1
+"""
+
+# Rollups hold candles in the same layout as the raw bucket queries above
+ROLLUP_INTRADAY_BUCKETS = """
+    SELECT
+        time_bucket(%(interval)s::interval, bucket, %(tz)s) AS bucket,
+        first(open, bucket) AS open,
+        max(high) AS high,
+        min(low) AS low,
+        last(close, bucket) AS close,
+        max(day_volume) AS day_volume
+    FROM {view}
+    WHERE symbol = %(symbol)s
+        AND bucket >= time_bucket('1 day', %(start)s::timestamptz, %(tz)s)
+        AND bucket < %(end)s
+    GROUP BY 1
+"""
+
+ROLLUP_DAYS = """
+    SELECT bucket, open, high, low, close, day_volume
+    FROM {view}
+    WHERE symbol = %(symbol)s
+        AND bucket >= time_bucket(%(interval)s::interval, %(start)s::timestamptz, %(tz)s)
+        AND bucket < %(end)s
+"""
+
+# How long the rollup lookup is trusted, so rollups built by setup_timescale are picked up without a restart
+ROLLUP_CHECK_SECONDS = 300
+
+_available_rollups = None
+_rollups_checked_at = 0.0
+
+
+def available_rollups():
+    """
+    Names of the candle rollups in the current layout (looked up at most
+    every ROLLUP_CHECK_SECONDS). Rollups from before day_volume are ignored
+    until setup_timescale rebuilds them.
+    """
+    global _available_rollups, _rollups_checked_at
+    if _available_rollups is None or time.monotonic() - _rollups_checked_at >= ROLLUP_CHECK_SECONDS:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT table_name FROM information_schema.columns
+                WHERE column_name = 'day_volume' AND table_name = ANY(%s);
+            """, [list(ROLLUPS.values())])
+            _available_rollups = {row[0] for row in cursor.fetchall()}
+        _rollups_checked_at = time.monotonic()
+    return _available_rollups
+
+
+def load_candles(symbol, interval, start, end):
+    """
+    Aggregate OHLCV bars inside TimescaleDB, reading from the matching
+    continuous aggregate when it exists and from raw tick_data otherwise.
+    The first bar is the whole bucket that contains `start`.
+
+    Returns:
+        List of (epoch_seconds, open, high, low, close, volume) tuples
+    """
+    view = ROLLUP_FOR_INTERVAL[interval]
+    rollup = view in available_rollups()
+    if interval in DAY_INTERVALS:
+        sql = DAY_CANDLE_SQL.format(days=ROLLUP_DAYS.format(view=view) if rollup else RAW_DAYS)
+    else:
+        sql = INTRADAY_CANDLE_SQL.format(
+            buckets=ROLLUP_INTRADAY_BUCKETS.format(view=view) if rollup else RAW_INTRADAY_BUCKETS
+        )
+    params = {
+        "interval": INTERVALS[interval],
+        "symbol": symbol,
+        "start": start,
+        "end": end,
+        "tz": CANDLE_TIMEZONE,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
@@ -0,0 +1,173 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pyarrow.parquet as pq
+from django.conf import settings
+
+# Candle interval -> bucket width in seconds
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+    "1w": 7 * 24 * 60 * 60,
+}
+
+# TimescaleDB's time_bucket origin in Asia/Kolkata (Monday 2000-01-03 00:00 IST),
+# so archived and cached candles line up with the ones aggregated in the database
+BUCKET_ORIGIN = 946837800
+
+WATERMARK_FILE = "_watermark.json"
+
+TICK_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+
+def archive_watermark():
+    """Epoch seconds before which ticks were moved from Postgres to the archive, or None."""
+    try:
+        data = json.loads((settings.COLD_STORAGE_DIR / WATERMARK_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    # Watermarks from copy-only runs: Postgres still holds those rows and aggregates them itself
+    if not data.get("deleted"):
+        return None
+    return int(datetime.fromisoformat(data["archived_before"]).timestamp())
+
+
+def has_archive(symbol):
+    return (settings.COLD_STORAGE_DIR / f"symbol={symbol}").is_dir()
+
+
+def bucket_floor(ts, interval):
+    """Start of the candle containing `ts` (works on scalars and arrays)."""
+    width = INTERVAL_SECONDS[interval]
+    return BUCKET_ORIGIN + (ts - BUCKET_ORIGIN) // width * width
+
+
+def _month_files(symbol, start, end):
+    """Partition files whose month overlaps [start, end)."""
+    directory = settings.COLD_STORAGE_DIR / f"symbol={symbol}"
+    first = np.datetime64(start, "s").astype("datetime64[M]")
+    last = np.datetime64(end - 1, "s").astype("datetime64[M]")
+    for month in np.arange(first, last + 1):
+        path = directory / f"month={month}.parquet"
+        if path.exists():
+            yield path
+
+
+def _runs(keys):
+    """First and last index of each run of equal values in a sorted array."""
+    firsts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+    lasts = np.append(firsts[1:] - 1, len(keys) - 1)
+    return firsts, lasts
+
+
+def roll_up_weeks(days):
+    """Weekly candles from daily columns; weeks start on the IST Monday like time_bucket's."""
+    if not len(days["time"]):
+        return days
+    weeks = bucket_floor(days["time"], "1w")
+    firsts, lasts = _runs(weeks)
+    return {
+        "time": weeks[firsts],
+        "open": days["open"][firsts],
+        "high": np.maximum.reduceat(days["high"], firsts),
+        "low": np.minimum.reduceat(days["low"], firsts),
+        "close": days["close"][lasts],
+        "volume": np.add.reduceat(days["volume"], firsts),
+    }
+
+
+def load_archived_ticks(symbol, start, end):
+    """Archived ticks in [start, end) (epoch seconds) as columns sorted by time, or None."""
+    tables = [
+        pq.read_table(path, columns=list(TICK_FIELDS), memory_map=True)
+        for path in _month_files(symbol, start, end)
+    ]
+    if not tables:
+        return None
+
+    ticks = {
+        name: np.concatenate([t.column(name).to_numpy() for t in tables])
+        for name in TICK_FIELDS
+    }
+    ticks["time"] = ticks["time"].astype("datetime64[s]").astype(np.int64)
+    keep = np.flatnonzero((ticks["time"] >= start) & (ticks["time"] < end))
+    order = keep[np.argsort(ticks["time"][keep], kind="stable")]
+    return {name: values[order] for name, values in ticks.items()}
+
+
+def merge_ticks(*parts):
+    """Tick columns from several sources, sorted by time with one tick per timestamp."""
+    parts = [part for part in parts if part is not None and len(part["time"])]
+    if not parts:
+        return None
+    ticks = {name: np.concatenate([part[name] for part in parts]) for name in TICK_FIELDS}
+    order = np.argsort(ticks["time"], kind="stable")
+    times = ticks["time"][order]
+    unique = order[np.flatnonzero(np.diff(times, prepend=times[0] - 1))]
+    return {name: values[unique] for name, values in ticks.items()}
+
+
+def aggregate_ticks(ticks, interval):
+    """
+    OHLCV columns with the same buckets and rules as dashboard.candles:
+    daily candles keep the rows' OHLC and each day's final running volume,
+    intraday candles are priced from close and get the growth of the day's
+    running total volume. `ticks` must start on a day boundary.
+    """
+    times = ticks["time"]
+    days = bucket_floor(times, "1d")
+
+    if interval in ("1d", "1w"):
+        firsts, lasts = _runs(days)
+        candles = {
+            "time": days[firsts],
+            "open": ticks["open"][firsts],
+            "high": np.maximum.reduceat(ticks["high"], firsts),
+            "low": np.minimum.reduceat(ticks["low"], firsts),
+            "close": ticks["close"][lasts],
+            "volume": np.maximum.reduceat(ticks["volume"], firsts),
+        }
+        if interval == "1w":
+            candles = roll_up_weeks(candles)
+    else:
+        buckets = bucket_floor(times, interval)
+        firsts, lasts = _runs(buckets)
+        closes = ticks["close"]
+        day_volume = np.maximum.reduceat(ticks["volume"], firsts)
+        candle_days = days[firsts]
+        # Running max within each day: lift every day above all earlier ones, then accumulate
+        lift = (candle_days - candle_days[0]) // 86400 * (int(day_volume.max()) + 1)
+        traded = np.maximum.accumulate(day_volume + lift) - lift
+        new_day = np.diff(candle_days, prepend=candle_days[0] - 1) != 0
+        candles = {
+            "time": buckets[firsts],
+            "open": closes[firsts],
+            "high": np.maximum.reduceat(closes, firsts),
+            "low": np.minimum.reduceat(closes, firsts),
+            "close": closes[lasts],
+            "volume": traded - np.where(new_day, 0, np.roll(traded, 1)),
+        }
+
+    return {
+        name: values.astype(np.int64 if name in ("time", "volume") else np.float64)
+        for name, values in candles.items()
+    }
+
+
+def load_archived_candles(symbol, interval, start, end, extra_ticks=None):
+    """
+    Aggregate archived ticks in [start, end) (epoch seconds), together with
+    `extra_ticks` for the same range, into OHLCV columns laid out like
+    dashboard.history's.
+
+    Returns:
+        Dict of column arrays, or None when there are no ticks in the range
+    """
+    ticks = merge_ticks(load_archived_ticks(symbol, start, end), extra_ticks)
+    if ticks is None:
+        return None
+    return aggregate_ticks(ticks, interval)
@@ -0,0 +1,300 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import cold_storage
+from .candles import load_candles
+
+logger = logging.getLogger(__name__)
+
+# Column layout of a cached history entry
+HISTORY_DTYPES = {
+    "time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+
+# Raw ticks in the history column layout (time as epoch seconds)
+TICKS_SQL = """
+    SELECT floor(extract(epoch FROM time))::bigint, open::float8, high::float8, low::float8, close::float8, volume
+    FROM tick_data
+    WHERE symbol = %s AND time >= %s AND time < %s
+    ORDER BY time;
+"""
+
+
+def rows_to_columns(rows):
+    """Candle rows -> dict of contiguous NumPy arrays, one per field."""
+    columns = list(zip(*rows)) if rows else [()] * len(HISTORY_DTYPES)
+    return {
+        field: np.array(values, dtype=dtype)
+        for (field, dtype), values in zip(HISTORY_DTYPES.items(), columns)
+    }
+
+
+def slice_columns(columns, interval, start, end):
+    """The candles from the one containing `start` up to (excluding) `end`; end None = all."""
+    times = columns["time"]
+    lo = np.searchsorted(times, cold_storage.bucket_floor(start, interval), side="left")
+    hi = len(times) if end is None else np.searchsorted(times, end, side="left")
+    return {field: values[lo:hi] for field, values in columns.items()}
+
+
+def fold_tick(columns, interval, tick):
+    """
+    New columns with a poller tick folded in the way load_candles aggregates
+    ticks: it updates the last candle or starts a new one. Returns None when
+    the tick belongs before the last candle.
+
+    A tick carries the day's open/high/low and running total volume. Daily
+    candles take those as is; intraday candles are priced from close and get
+    the growth of the day's running total, which is the sum of the day's
+    candle volumes so far (entries start on a day boundary, see get_history).
+    """
+    times = columns["time"]
+    ts = int(datetime.fromisoformat(tick["time"]).timestamp())
+    bucket = cold_storage.bucket_floor(ts, interval)
+    if len(times) and bucket < times[-1]:
+        return None
+
+    close = float(tick["close"])
+    if interval == "1d":
+        open_, high, low = float(tick["open"]), float(tick["high"]), float(tick["low"])
+        volume = int(tick["volume"])
+    else:
+        open_ = high = low = close
+        day_start = cold_storage.bucket_floor(ts, "1d")
+        traded = int(columns["volume"][np.searchsorted(times, day_start, side="left"):].sum())
+        volume = max(int(tick["volume"]) - traded, 0)
+
+    if len(times) and bucket == times[-1]:
+        # Copy so readers holding slices of the old arrays never see a half-updated candle
+        folded = {field: values.copy() for field, values in columns.items()}
+        folded["high"][-1] = max(folded["high"][-1], high)
+        folded["low"][-1] = min(folded["low"][-1], low)
+        folded["close"][-1] = close
+        if interval == "1d":
+            folded["volume"][-1] = max(folded["volume"][-1], volume)
+        else:
+            folded["volume"][-1] += volume
+        return folded
+
+    candle = {"time": bucket, "open": open_, "high": high, "low": low, "close": close, "volume": volume}
+    return {
+        field: np.append(values, np.array([candle[field]], dtype=HISTORY_DTYPES[field]))
+        for field, values in columns.items()
+    }
+
+
+class HistoryCache:
+    """
+    Memory-bounded LRU cache of per-(symbol, interval) OHLCV column arrays.
+
+    Each entry covers [start, end) in epoch seconds; end is None for "up to
+    now" entries, which every tick for the symbol on the tick stream extends
+    in place (see fold_tick) until the TTL runs out. The least recently used
+    entries are evicted once the total array size exceeds the byte budget.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.invalidations = self.updates = 0
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry["nbytes"]
+
+    def _evict(self):
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def get(self, symbol, interval, start, end):
+        """Cached columns from the candle containing `start` up to `end`, or None."""
+        key = (symbol, interval)
+        with self._lock:
+            entry = self.entries.get(key)
+            covered = (
+                entry is not None
+                and entry["expires"] > time.monotonic()
+                and entry["start"] <= start
+                and (entry["end"] is None or (end is not None and end <= entry["end"]))
+            )
+            if not covered:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            columns = entry["columns"]
+
+        return slice_columns(columns, interval, start, end)
+
+    def put(self, symbol, interval, start, end, columns):
+        nbytes = sum(values.nbytes for values in columns.values())
+        if nbytes > self.max_bytes:
+            return
+
+        key = (symbol, interval)
+        with self._lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = {
+                "start": start,
+                "end": end,
+                "columns": columns,
+                "nbytes": nbytes,
+                "expires": time.monotonic() + self.ttl,
+            }
+            self.bytes += nbytes
+            self._evict()
+
+    def apply_tick(self, tick):
+        """
+        Fold a tick into the symbol's open-ended entries; closed ranges cannot
+        change. Entries the tick cannot be folded into are dropped.
+        """
+        with self._lock:
+            for interval in cold_storage.INTERVAL_SECONDS:
+                key = (tick["symbol"], interval)
+                entry = self.entries.get(key)
+                if entry is None or entry["end"] is not None:
+                    continue
+                columns = fold_tick(entry["columns"], interval, tick)
+                if columns is None:
+                    self._drop(key)
+                    self.invalidations += 1
+                    continue
+                nbytes = sum(values.nbytes for values in columns.values())
+                self.bytes += nbytes - entry["nbytes"]
+                entry["columns"], entry["nbytes"] = columns, nbytes
+                self.updates += 1
+            self._evict()
+
+    def start_listener(self):
+        """Follow (once per process) the poller's tick stream in a background thread."""
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            client.ping()
+            self._listener = threading.Thread(target=self._listen, args=(client,), daemon=True)
+            self._listener.start()
+
+    def _listen(self, client):
+        last_id = "$"
+        while True:
+            try:
+                response = client.xread({settings.TICK_STREAM_KEY: last_id}, count=1000, block=5000)
+            except redis.RedisError:
+                # Resume from last_id once Redis is back; TTLs cover the gap
+                time.sleep(1)
+                continue
+            except Exception:
+                logger.exception("Reading the tick stream failed")
+                time.sleep(1)
+                continue
+            for _, entries in response:
+                last_id = entries[-1][0]
+                for entry_id, fields in entries:
+                    try:
+                        self.apply_tick(json.loads(fields["tick"]))
+                    except Exception:
+                        # A tick that cannot be folded in must not stop the listener thread
+                        logger.exception("Skipping tick stream entry %s", entry_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "updates": self.updates,
+            }
+
+
+history_cache = HistoryCache(settings.HISTORY_CACHE_MAX_BYTES, settings.HISTORY_CACHE_TTL)
+
+
+def get_history(symbol, interval, start, end=None):
+    """
+    OHLCV columns for [start, end) at `interval`, served from the in-process
+    cache when possible. Leave `end` as None for "up to now".
+    """
+    try:
+        history_cache.start_listener()
+    except redis.RedisError:
+        # Without invalidation messages, open-ended entries still expire by TTL
+        pass
+
+    start_ts = int(start.timestamp())
+    end_ts = None if end is None else int(end.timestamp())
+
+    if interval == "1w":
+        # Weekly candles are rolled up from the daily ones, which ticks keep current
+        week_start = datetime.fromtimestamp(cold_storage.bucket_floor(start_ts, "1w"), tz=dt_timezone.utc)
+        return cold_storage.roll_up_weeks(get_history(symbol, "1d", week_start, end))
+
+    columns = history_cache.get(symbol, interval, start_ts, end_ts)
+    if columns is None:
+        # Whole days are loaded so the entry holds the day's running volume for fold_tick
+        day_start = cold_storage.bucket_floor(start_ts, "1d")
+        columns = load_columns(
+            symbol, interval, datetime.fromtimestamp(day_start, tz=dt_timezone.utc), end or timezone.now(),
+        )
+        history_cache.put(symbol, interval, day_start, end_ts, columns)
+        columns = slice_columns(columns, interval, start_ts, end_ts)
+    return columns
+
+
+def load_ticks(symbol, start, end):
+    with connection.cursor() as cursor:
+        cursor.execute(TICKS_SQL, [symbol, start, end])
+        return rows_to_columns(cursor.fetchall())
+
+
+def load_columns(symbol, interval, start, end):
+    """
+    OHLCV columns for [start, end), where `start` is a day boundary. Whole
+    days up to the archive watermark are aggregated from Parquet cold storage
+    together with the few ticks Postgres received for them after they were
+    archived and deleted (e.g. a resumed backfill or an onboarding); the rest
+    comes from the database.
+    """
+    watermark = cold_storage.archive_watermark()
+    start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+    if watermark is None or start_ts >= watermark or not cold_storage.has_archive(symbol):
+        return rows_to_columns(load_candles(symbol, interval, start, end))
+
+    # Split at the first day boundary from the watermark so no candle draws on both tiers
+    split = min(cold_storage.bucket_floor(watermark - 1, "1d") + 86400, end_ts)
+    split_at = datetime.fromtimestamp(split, tz=dt_timezone.utc)
+    cold = cold_storage.load_archived_candles(
+        symbol, interval, start_ts, split, extra_ticks=load_ticks(symbol, start, split_at),
+    )
+    hot = rows_to_columns(load_candles(symbol, interval, split_at, end) if split < end_ts else [])
+    if cold is None:
+        return hot
+    return {field: np.concatenate((cold[field], hot[field])) for field in HISTORY_DTYPES}
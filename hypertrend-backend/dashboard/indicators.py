@@ -0,0 +1,282 @@
+from collections import deque
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from .candles import CANDLE_TIMEZONE
+
+# Daily candles and trading days are IST dates
+IST = ZoneInfo(CANDLE_TIMEZONE)
+
+# Default indicator parameters
+SMA_PERIOD = 20
+EMA_PERIOD = 20
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+BOLLINGER_PERIOD, BOLLINGER_WIDTH = 20, 2.0
+ATR_PERIOD = 14
+
+INDICATOR_FIELDS = (
+    "sma", "ema", "rsi", "macd", "macd_signal", "macd_hist",
+    "bb_upper", "bb_middle", "bb_lower", "atr",
+)
+
+
+# -----------------------------------------------------------
+# VECTORIZED SERIES (whole history, O(n))
+# -----------------------------------------------------------
+def sma(values, period):
+    """Simple moving average from a cumulative sum; NaN until the window fills."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def rolling_std(values, period):
+    """Population standard deviation over a sliding window."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        csum = np.cumsum(np.insert(values, 0, 0.0))
+        csum2 = np.cumsum(np.insert(values * values, 0, 0.0))
+        total = csum[period:] - csum[:-period]
+        total2 = csum2[period:] - csum2[:-period]
+        out[period - 1:] = np.sqrt(np.maximum(total2 / period - (total / period) ** 2, 0.0))
+    return out
+
+
+def ema(values, period):
+    """Exponential moving average seeded with the first value (alpha = 2 / (period + 1))."""
+    return pd.Series(values).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+def wilder(values, period):
+    """Wilder's smoothing (alpha = 1 / period), used by RSI and ATR."""
+    return pd.Series(values).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+
+
+def rsi(close, period=RSI_PERIOD):
+    delta = np.diff(close, prepend=close[:1])
+    avg_gain = wilder(np.maximum(delta, 0.0), period)
+    avg_loss = wilder(np.maximum(-delta, 0.0), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, period=BOLLINGER_PERIOD, width=BOLLINGER_WIDTH):
+    middle = sma(close, period)
+    spread = width * rolling_std(close, period)
+    return middle + spread, middle, middle - spread
+
+
+def true_range(high, low, close):
+    prev_close = np.concatenate((close[:1], close[:-1]))
+    return np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+
+
+def atr(high, low, close, period=ATR_PERIOD):
+    return wilder(true_range(high, low, close), period)
+
+
+def compute_indicators(high, low, close):
+    """
+    Every indicator over contiguous float64 arrays.
+
+    Returns:
+        Dict of INDICATOR_FIELDS -> arrays aligned with `close`
+    """
+    high, low, close = (np.ascontiguousarray(a, dtype=np.float64) for a in (high, low, close))
+    if not len(close):
+        return {field: np.array([]) for field in INDICATOR_FIELDS}
+
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_upper, bb_middle, bb_lower = bollinger(close)
+    return {
+        "sma": sma(close, SMA_PERIOD),
+        "ema": ema(close, EMA_PERIOD),
+        "rsi": rsi(close),
+        "macd": macd_line,
+        "macd_signal": macd_signal,
+        "macd_hist": macd_hist,
+        "bb_upper": bb_upper,
+        "bb_middle": bb_middle,
+        "bb_lower": bb_lower,
+        "atr": atr(high, low, close),
+    }
+
+
+# -----------------------------------------------------------
+# INCREMENTAL STATE (constant work per tick)
+# -----------------------------------------------------------
+class IndicatorState:
+    """
+    Running indicator state for one symbol's bar series.
+
+    Bars are identified by their bucket (e.g. the trading day). A tick for the
+    current bucket revises the in-progress bar; a tick for a new bucket closes
+    it and starts the next one. Either way only the committed state of the
+    previous bars is needed, so each update costs O(period), independent of
+    the history length.
+    """
+
+    def __init__(self):
+        self.bucket = None
+        self.bars = 0
+        self.window = deque(maxlen=max(SMA_PERIOD, BOLLINGER_PERIOD))
+        self.prev_close = None
+        self.ema = self.ema_fast = self.ema_slow = self.macd_signal = None
+        self.avg_gain = self.avg_loss = self.atr = None
+        self.pending = None
+        self.latest = None
+
+    @classmethod
+    def from_history(cls, buckets, high, low, close):
+        """
+        Seed from completed bars using the vectorized series, so live values
+        continue exactly where the history leaves off.
+        """
+        state = cls()
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        if not len(close):
+            return state
+        high = np.ascontiguousarray(high, dtype=np.float64)
+        low = np.ascontiguousarray(low, dtype=np.float64)
+
+        delta = np.diff(close, prepend=close[:1])
+        macd_line = ema(close, MACD_FAST) - ema(close, MACD_SLOW)
+        state.bucket = buckets[-1]
+        state.bars = len(close)
+        for value in close[-state.window.maxlen:]:
+            state.window.append(float(value))
+        state.prev_close = float(close[-1])
+        state.ema = float(ema(close, EMA_PERIOD)[-1])
+        state.ema_fast = float(ema(close, MACD_FAST)[-1])
+        state.ema_slow = float(ema(close, MACD_SLOW)[-1])
+        state.macd_signal = float(ema(macd_line, MACD_SIGNAL)[-1])
+        state.avg_gain = float(wilder(np.maximum(delta, 0.0), RSI_PERIOD)[-1])
+        state.avg_loss = float(wilder(np.maximum(-delta, 0.0), RSI_PERIOD)[-1])
+        state.atr = float(atr(high, low, close)[-1])
+        state.latest = {
+            field: None if np.isnan(values[-1]) else float(values[-1])
+            for field, values in compute_indicators(high, low, close).items()
+        }
+        return state
+
+    def _window_stats(self, close, period):
+        """Mean and std of the last `period` closes including the in-progress one."""
+        history = list(self.window)[-(period - 1):] if period > 1 else []
+        if len(history) < period - 1:
+            return None, None
+        values = history + [close]
+        mean = sum(values) / period
+        variance = max(sum(v * v for v in values) / period - mean * mean, 0.0)
+        return mean, variance ** 0.5
+
+    def _step(self, high, low, close):
+        """Indicator values and next committed state for one bar, without mutating self."""
+        def smooth(prev, value, alpha):
+            return value if prev is None else alpha * value + (1 - alpha) * prev
+
+        prev_close = close if self.prev_close is None else self.prev_close
+        change = close - prev_close
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        ema_value = smooth(self.ema, close, 2 / (EMA_PERIOD + 1))
+        ema_fast = smooth(self.ema_fast, close, 2 / (MACD_FAST + 1))
+        ema_slow = smooth(self.ema_slow, close, 2 / (MACD_SLOW + 1))
+        macd_line = ema_fast - ema_slow
+        macd_signal = smooth(self.macd_signal, macd_line, 2 / (MACD_SIGNAL + 1))
+        avg_gain = smooth(self.avg_gain, max(change, 0.0), 1 / RSI_PERIOD)
+        avg_loss = smooth(self.avg_loss, max(-change, 0.0), 1 / RSI_PERIOD)
+        atr_value = smooth(self.atr, tr, 1 / ATR_PERIOD)
+
+        sma_value, _ = self._window_stats(close, SMA_PERIOD)
+        bb_middle, bb_std = self._window_stats(close, BOLLINGER_PERIOD)
+
+        values = {
+            "sma": sma_value,
+            "ema": ema_value,
+            "rsi": 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss),
+            "macd": macd_line,
+            "macd_signal": macd_signal,
+            "macd_hist": macd_line - macd_signal,
+            "bb_upper": None if bb_middle is None else bb_middle + BOLLINGER_WIDTH * bb_std,
+            "bb_middle": bb_middle,
+            "bb_lower": None if bb_middle is None else bb_middle - BOLLINGER_WIDTH * bb_std,
+            "atr": atr_value,
+        }
+        committed = {
+            "prev_close": close, "ema": ema_value, "ema_fast": ema_fast, "ema_slow": ema_slow,
+            "macd_signal": macd_signal, "avg_gain": avg_gain, "avg_loss": avg_loss, "atr": atr_value,
+        }
+        return values, committed
+
+    def _commit(self):
+        committed, close = self.pending
+        for name, value in committed.items():
+            setattr(self, name, value)
+        self.window.append(close)
+        self.bars += 1
+        self.pending = None
+
+    def update(self, bucket, high, low, close):
+        """Advance with one tick for `bucket` and return the latest indicator values."""
+        if self.bucket is not None and (bucket < self.bucket or (bucket == self.bucket and self.pending is None)):
+            # Stale tick for a bar that is already committed
+            return self.latest
+        if self.pending is not None and bucket != self.bucket:
+            self._commit()
+        self.bucket = bucket
+        values, committed = self._step(high, low, close)
+        self.pending = (committed, close)
+        self.latest = values
+        return values
+
+
+class IndicatorTracker:
+    """Live daily indicator states for the symbols someone is watching."""
+
+    def __init__(self):
+        self.states: dict[str, IndicatorState] = {}
+
+    def is_tracked(self, symbol):
+        return symbol in self.states
+
+    def seed(self, symbol, columns):
+        """Seed from daily history columns (see dashboard.history), excluding today's bar."""
+        today = timezone.now().astimezone(IST).date()
+        buckets = [datetime.fromtimestamp(t, tz=IST).date() for t in columns["time"].tolist()]
+        done = sum(1 for day in buckets if day < today)
+        self.states[symbol] = IndicatorState.from_history(
+            buckets[:done], columns["high"][:done], columns["low"][:done], columns["close"][:done],
+        )
+
+    def advance(self, symbol, tick):
+        """
+        Feed one poller tick (daily OHLC so far) into the symbol's state.
+
+        Returns:
+            Latest indicator values, or None when the symbol is not tracked
+        """
+        state = self.states.get(symbol)
+        if state is None:
+            return None
+        day = datetime.fromisoformat(tick["time"]).astimezone(IST).date()
+        return state.update(day, float(tick["high"]), float(tick["low"]), float(tick["close"]))
+
+    def drop(self, symbol):
+        """Forget the symbol's state once nobody is watching it."""
+        self.states.pop(symbol, None)
+
+
+tracker = IndicatorTracker()
@@ -0,0 +1,122 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from dashboard.candles import ROLLUPS, CANDLE_TIMEZONE
+
+# Refresh policy per rollup: (start_offset, end_offset, schedule_interval)
+REFRESH_POLICIES = {
+    "1 minute": ("2 hours", "1 minute", "1 minute"),
+    "5 minutes": ("6 hours", "5 minutes", "5 minutes"),
+    "1 hour": ("3 days", "1 hour", "30 minutes"),
+    "1 day": ("30 days", "1 day", "1 hour"),
+}
+
+# Ticks carry the day's running open/high/low, so intraday rollups price from
+# close; the daily rollup keeps the rows' own OHLC. Every rollup stores the
+# day's running total volume at the end of the bucket as day_volume.
+INTRADAY_PRICES = """
+    first(close, time) AS open,
+    max(close) AS high,
+    min(close) AS low,
+    last(close, time) AS close,
+"""
+DAY_PRICES = """
+    first(open, time) AS open,
+    max(high) AS high,
+    min(low) AS low,
+    last(close, time) AS close,
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Turn tick_data into a TimescaleDB hypertable, create the 1m/5m/1h/1d "
+        "candle rollups and set up compression. Safe to run repeatedly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--compress-after",
+            type=int,
+            default=30,
+            help="Compress tick_data chunks older than this many days (default: 30)",
+        )
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Materialize the full history of every rollup now instead of waiting for the policies",
+        )
+
+    def execute_sql(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def compression_enabled(self):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT compression_enabled FROM timescaledb_information.hypertables
+                WHERE hypertable_name = 'tick_data';
+            """)
+            row = cursor.fetchone()
+        return bool(row and row[0])
+
+    def view_columns(self, view):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT column_name FROM information_schema.columns WHERE table_name = %s;", [view])
+            return {row[0] for row in cursor.fetchall()}
+
+    def handle(self, *args, **options):
+        self.execute_sql("CREATE EXTENSION IF NOT EXISTS timescaledb;")
+        self.execute_sql(
+            "SELECT create_hypertable('tick_data', 'time', migrate_data => true, if_not_exists => true);"
+        )
+        self.stdout.write("tick_data is a hypertable")
+
+        for bucket, view in ROLLUPS.items():
+            columns = self.view_columns(view)
+            if columns and "day_volume" not in columns:
+                # Rollups from before IST buckets and day_volume summed the running volume
+                self.execute_sql(f"DROP MATERIALIZED VIEW {view} CASCADE;")
+                self.stdout.write(f"Rebuilding {view} (run with --refresh to materialize its history)")
+
+            prices = DAY_PRICES if bucket == "1 day" else INTRADAY_PRICES
+            self.execute_sql(f"""
+                CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+                WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+                SELECT
+                    symbol,
+                    time_bucket(INTERVAL '{bucket}', time, '{CANDLE_TIMEZONE}') AS bucket,
+                    {prices}
+                    max(volume) AS day_volume
+                FROM tick_data
+                GROUP BY symbol, bucket
+                WITH NO DATA;
+            """)
+            start_offset, end_offset, schedule = REFRESH_POLICIES[bucket]
+            self.execute_sql(f"""
+                SELECT add_continuous_aggregate_policy('{view}',
+                    start_offset => INTERVAL '{start_offset}',
+                    end_offset => INTERVAL '{end_offset}',
+                    schedule_interval => INTERVAL '{schedule}',
+                    if_not_exists => true);
+            """)
+            if options["refresh"]:
+                self.execute_sql(f"CALL refresh_continuous_aggregate('{view}', NULL, NULL);")
+            self.stdout.write(f"Rollup {view} ready")
+
+        # Compression settings cannot be changed once chunks are compressed
+        if not self.compression_enabled():
+            self.execute_sql("""
+                ALTER TABLE tick_data SET (
+                    timescaledb.compress,
+                    timescaledb.compress_segmentby = 'symbol',
+                    timescaledb.compress_orderby = 'time DESC'
+                );
+            """)
+        self.execute_sql(
+            "SELECT add_compression_policy('tick_data', %s::interval, if_not_exists => true);",
+            [f"{options['compress_after']} days"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Compression enabled for chunks older than {options['compress_after']} days"
+        ))
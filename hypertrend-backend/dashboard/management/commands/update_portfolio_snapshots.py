@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from dashboard.models import UserRequests, PortfolioSnapshot
+from dashboard.portfolio import rebuild_snapshots, ist_date
+
+
+class Command(BaseCommand):
+    help = (
+        "Extend every user's daily portfolio snapshots up to today. "
+        "Run after market close, e.g. `30 16 * * 1-5 python manage.py update_portfolio_snapshots`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, help="Only update this user (default: all users with holdings)")
+
+    def handle(self, *args, **options):
+        holders = UserRequests.objects.filter(mystocks=True)
+        if options["user_id"] is not None:
+            holders = holders.filter(user_id=options["user_id"])
+        first_purchase = dict(holders.values("user_id").annotate(first=Min("dated_on")).values_list("user_id", "first"))
+
+        last_snapshot = dict(
+            PortfolioSnapshot.objects
+            .filter(user_id__in=list(first_purchase))
+            .values("user_id").annotate(last=Max("date")).values_list("user_id", "last")
+        )
+
+        written = 0
+        for user_id, first in first_purchase.items():
+            # Recompute the last stored day too, since it may have been written intraday
+            since = last_snapshot.get(user_id) or ist_date(first)
+            written += rebuild_snapshots(user_id, since)
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} snapshots for {len(first_purchase)} users"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_tickdata'),
+    ]
+
+    # tick_data is unmanaged, so the unique key the ingestors upsert against is added with raw SQL.
+    # Existing duplicates are removed first, keeping one row per (symbol, time).
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM tick_data a
+                USING tick_data b
+                WHERE a.symbol = b.symbol
+                  AND a.time = b.time
+                  AND a.ctid > b.ctid;
+
+                CREATE UNIQUE INDEX IF NOT EXISTS tick_data_symbol_time_uniq
+                ON tick_data (symbol, time DESC);
+            """,
+            reverse_sql="DROP INDEX IF EXISTS tick_data_symbol_time_uniq;",
+        ),
+    ]
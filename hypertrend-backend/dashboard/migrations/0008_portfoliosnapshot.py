@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_tickdata_unique_symbol_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(help_text='Store the User ID the Snapshot belongs to')),
+                ('date', models.DateField(help_text='Store the Day the Portfolio was Valued for')),
+                ('invested', models.DecimalField(decimal_places=2, help_text='Store the Total Investment held on that Day', max_digits=20)),
+                ('market_value', models.DecimalField(decimal_places=2, help_text="Store the Portfolio Value at that Day's Close", max_digits=20)),
+                ('updated_on', models.DateTimeField(auto_now=True, help_text='Store the Date When the Snapshot was Computed')),
+            ],
+            options={
+                'db_table': 'portfolio_snapshots',
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'date'), name='portfolio_snapshot_user_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 11:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_portfoliosnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OnboardingJob',
+            fields=[
+                ('job_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('symbol', models.CharField(help_text='Store the Requested Symbol (upper case)', max_length=32)),
+                ('company', models.CharField(help_text='Store the Requested Company Name', max_length=300)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', help_text='Store the Job State', max_length=10)),
+                ('attempts', models.IntegerField(default=0, help_text='Store the Number of Times a Worker picked the Job up')),
+                ('error', models.TextField(blank=True, default='', help_text='Store the Last Failure Message')),
+                ('created_on', models.DateTimeField(default=django.utils.timezone.now, help_text='Store the Date When the Job was Queued')),
+                ('updated_on', models.DateTimeField(auto_now=True, help_text='Store the Date When the Job last Changed')),
+            ],
+            options={
+                'db_table': 'onboarding_jobs',
+                'indexes': [models.Index(fields=['status', 'created_on'], name='onboarding_job_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('symbol',), name='onboarding_job_open_symbol_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_onboardingjob'),
+    ]
+
+    # company_symbols is owned by the ingestors, so the trigger that tells running pollers
+    # about symbol changes is added with raw SQL. The channel matches shared.SYMBOLS_NOTIFY_CHANNEL.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE OR REPLACE FUNCTION notify_company_symbols_changed() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP <> 'INSERT' THEN
+                        PERFORM pg_notify('company_symbols_changed', '-' || OLD.symbol);
+                    END IF;
+                    IF TG_OP <> 'DELETE' THEN
+                        PERFORM pg_notify('company_symbols_changed', '+' || NEW.symbol);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                DROP TRIGGER IF EXISTS company_symbols_notify ON company_symbols;
+                CREATE TRIGGER company_symbols_notify
+                AFTER INSERT OR DELETE OR UPDATE OF symbol ON company_symbols
+                FOR EACH ROW EXECUTE FUNCTION notify_company_symbols_changed();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS company_symbols_notify ON company_symbols;
+                DROP FUNCTION IF EXISTS notify_company_symbols_changed();
+            """,
+        ),
+    ]
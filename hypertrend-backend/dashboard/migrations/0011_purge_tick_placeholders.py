@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 13:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_company_symbols_notify_trigger'),
+    ]
+
+    # The old historical loader marked failed or empty ranges with all-zero rows in tick_data.
+    # Backfill checkpoints replaced them, so the leftovers would only read as real zero prices.
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM tick_data
+                WHERE open = 0 AND high = 0 AND low = 0 AND close = 0 AND volume = 0;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -40,3 +40,55 @@ class TickData(models.Model):
         indexes = [
             models.Index(fields=["symbol", "time"]),
         ]
+
+
+class PortfolioSnapshot(models.Model):
+
+    user_id = models.IntegerField(help_text="Store the User ID the Snapshot belongs to")
+    date = models.DateField(help_text="Store the Day the Portfolio was Valued for")
+    invested = models.DecimalField(max_digits=20, decimal_places=2, help_text="Store the Total Investment held on that Day")
+    market_value = models.DecimalField(max_digits=20, decimal_places=2, help_text="Store the Portfolio Value at that Day's Close")
+    updated_on = models.DateTimeField(auto_now=True, help_text="Store the Date When the Snapshot was Computed")
+
+    class Meta:
+        db_table = "portfolio_snapshots"
+        constraints = [
+            models.UniqueConstraint(fields=["user_id", "date"], name="portfolio_snapshot_user_date_uniq"),
+        ]
+
+
+class OnboardingJob(models.Model):
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    job_id = models.BigAutoField(primary_key=True)
+    symbol = models.CharField(max_length=32, help_text="Store the Requested Symbol (upper case)")
+    company = models.CharField(max_length=300, help_text="Store the Requested Company Name")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED, help_text="Store the Job State")
+    attempts = models.IntegerField(default=0, help_text="Store the Number of Times a Worker picked the Job up")
+    error = models.TextField(blank=True, default="", help_text="Store the Last Failure Message")
+    created_on = models.DateTimeField(default=timezone.now, help_text="Store the Date When the Job was Queued")
+    updated_on = models.DateTimeField(auto_now=True, help_text="Store the Date When the Job last Changed")
+
+    class Meta:
+        db_table = "onboarding_jobs"
+        constraints = [
+            # At most one open job per symbol, however many users request it
+            models.UniqueConstraint(
+                fields=["symbol"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="onboarding_job_open_symbol_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_on"], name="onboarding_job_status_idx"),
+        ]
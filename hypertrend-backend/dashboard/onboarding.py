@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connection
+
+from .models import OnboardingJob
+
+
+def enqueue_onboarding(symbol, company):
+    """
+    Queue a job for data_ingestor/onboarding_worker.py to resolve the
+    symbol, backfill its history and add it to the poll set.
+
+    Many users adding the same stock share one open job: the partial unique
+    index on onboarding_jobs turns repeat inserts into no-ops.
+    """
+    OnboardingJob.objects.bulk_create(
+        [OnboardingJob(symbol=symbol.strip().upper(), company=company.strip())],
+        ignore_conflicts=True,
+    )
+    # Wake an idle worker instead of waiting for its next poll
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s);", [settings.ONBOARDING_NOTIFY_CHANNEL, symbol])
@@ -0,0 +1,277 @@
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .candles import CANDLE_TIMEZONE
+from .history import get_history
+from .models import UserRequests, PortfolioSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Trading days, and so snapshot and purchase dates, are IST dates (TIME_ZONE is UTC)
+IST = ZoneInfo(CANDLE_TIMEZONE)
+
+
+def ist_date(value=None):
+    """IST calendar date of an aware datetime, or of now."""
+    return timezone.localdate(value, IST)
+
+# One row per held symbol with its latest close and the last close of the previous (IST) trading day.
+# Both lookups are index-only walks of tick_data (symbol, time DESC).
+HOLDINGS_SQL = """
+    WITH holdings AS (
+        SELECT symbol, SUM(stock_held) AS quantity, SUM(investment_value) AS invested
+        FROM user_requests
+        WHERE user_id = %s AND mystocks
+        GROUP BY symbol
+    )
+    SELECT
+        h.symbol,
+        h.quantity::float8,
+        h.invested::float8,
+        latest.close::float8,
+        prev.close::float8,
+        latest.time
+    FROM holdings h
+    LEFT JOIN LATERAL (
+        SELECT close, time FROM tick_data t
+        WHERE t.symbol = h.symbol
+        ORDER BY time DESC LIMIT 1
+    ) latest ON true
+    LEFT JOIN LATERAL (
+        SELECT close FROM tick_data t
+        WHERE t.symbol = h.symbol
+          AND t.time < date_trunc('day', latest.time AT TIME ZONE 'Asia/Kolkata') AT TIME ZONE 'Asia/Kolkata'
+        ORDER BY time DESC LIMIT 1
+    ) prev ON true
+    ORDER BY h.symbol;
+"""
+
+
+def load_holdings(user_id):
+    with connection.cursor() as cursor:
+        cursor.execute(HOLDINGS_SQL, [user_id])
+        return cursor.fetchall()
+
+
+def _to_list(values):
+    """NumPy array -> JSON-friendly list with NaN as None."""
+    return [None if np.isnan(v) else round(float(v), 4) for v in values]
+
+
+def value_portfolio(rows):
+    """
+    Value every position at its latest price in one vectorized pass.
+
+    Args:
+        rows: (symbol, quantity, invested, last_close, prev_close, as_of) tuples
+
+    Returns:
+        {"positions": [...], "totals": {...}}
+    """
+    if not rows:
+        return {"positions": [], "totals": {
+            "invested": 0.0, "market_value": 0.0, "pnl": 0.0, "pnl_pct": None, "day_change": 0.0,
+        }}
+
+    symbols, quantity, invested, last, prev, as_of = zip(*rows)
+    # None (no ticks yet) becomes NaN so it propagates instead of raising
+    quantity = np.array(quantity, dtype=np.float64)
+    invested = np.array(invested, dtype=np.float64)
+    last = np.array(last, dtype=np.float64)
+    prev = np.array(prev, dtype=np.float64)
+
+    market_value = quantity * last
+    pnl = market_value - invested
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(invested > 0, pnl / invested * 100, np.nan)
+    day_change = quantity * (last - prev)
+
+    # Positions without a price yet count at cost in the totals, as in rebuild_snapshots,
+    # so the value covers the same lots as the invested amount
+    valued = np.where(np.isnan(last), invested, market_value)
+    total_value = valued.sum()
+    total_invested = invested.sum()
+    total_pnl = np.nansum(pnl)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = valued / total_value * 100 if total_value else np.full_like(valued, np.nan)
+
+    columns = {
+        "quantity": _to_list(quantity),
+        "invested": _to_list(invested),
+        "last_price": _to_list(last),
+        "prev_close": _to_list(prev),
+        "market_value": _to_list(market_value),
+        "pnl": _to_list(pnl),
+        "pnl_pct": _to_list(pnl_pct),
+        "day_change": _to_list(day_change),
+        "weight": _to_list(weight),
+    }
+    positions = [
+        {"symbol": symbol, "as_of": as_of[i], **{name: values[i] for name, values in columns.items()}}
+        for i, symbol in enumerate(symbols)
+    ]
+
+    return {
+        "positions": positions,
+        "totals": {
+            "invested": round(float(total_invested), 2),
+            "market_value": round(float(total_value), 2),
+            "pnl": round(float(total_pnl), 2),
+            "pnl_pct": round(float(total_pnl / total_invested * 100), 4) if total_invested else None,
+            "day_change": round(float(np.nansum(day_change)), 2),
+        },
+    }
+
+
+# -----------------------------------------------------------
+# DAILY SNAPSHOTS (EQUITY CURVE)
+# -----------------------------------------------------------
+
+# Extra days of prices loaded before the rebuild range so the first day has a close to carry forward
+PRICE_LOOKBACK_DAYS = 30
+
+# Daily candles start at IST midnight (see candles.CANDLE_TIMEZONE)
+IST_OFFSET_SECONDS = 5 * 3600 + 30 * 60
+
+# Last close before a time for each symbol, however old; one index walk per symbol
+LAST_CLOSE_SQL = """
+    SELECT s.symbol, (
+        SELECT close::float8 FROM tick_data t
+        WHERE t.symbol = s.symbol AND t.time < %s
+        ORDER BY time DESC LIMIT 1
+    )
+    FROM unnest(%s::text[]) AS s(symbol);
+"""
+
+
+def _forward_fill(matrix):
+    """Carry the last non-NaN value down each column."""
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.maximum.accumulate(np.where(np.isnan(matrix), 0, rows), axis=0)
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+
+def rebuild_snapshots(user_id, since):
+    """
+    Recompute the user's daily portfolio snapshots from `since` to today (IST
+    dates) and upsert them. Days before `since` are left untouched.
+
+    Returns:
+        Number of snapshot rows written
+    """
+    lots = list(
+        UserRequests.objects
+        .filter(user_id=user_id, mystocks=True)
+        .values_list("symbol", "stock_held", "investment_value", "dated_on")
+    )
+    today = ist_date()
+    if not lots or since > today:
+        return 0
+
+    symbols = sorted({lot[0] for lot in lots})
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    n_days = (today - since).days + 1
+
+    # Day x symbol close matrix, seeded with the last close before `since`
+    closes = np.full((n_days, len(symbols)), np.nan)
+    lookback = datetime.combine(since - timedelta(days=PRICE_LOOKBACK_DAYS), datetime.min.time(), tzinfo=IST)
+    since_day = (since - date(1970, 1, 1)).days
+    for symbol in symbols:
+        history = get_history(symbol, "1d", lookback)
+        day = (history["time"] + IST_OFFSET_SECONDS) // 86400 - since_day
+        before = day < 0
+        inside = ~before & (day < n_days)
+        if before.any():
+            closes[0, column[symbol]] = history["close"][before][-1]
+        closes[day[inside], column[symbol]] = history["close"][inside]
+
+    # Symbols without a close in the lookback window carry their last close from further back
+    unseeded = [symbol for symbol in symbols if np.isnan(closes[0, column[symbol]])]
+    if unseeded:
+        with connection.cursor() as cursor:
+            cursor.execute(LAST_CLOSE_SQL, [datetime.combine(since, datetime.min.time(), tzinfo=IST), unseeded])
+            for symbol, close in cursor.fetchall():
+                if close is not None:
+                    closes[0, column[symbol]] = close
+    closes = _forward_fill(closes)
+
+    # Quantity and invested amount held on each day (lots count from their purchase date)
+    quantity_added = np.zeros((n_days, len(symbols)))
+    invested_added = np.zeros((n_days, len(symbols)))
+    for symbol, quantity, invested, dated_on in lots:
+        day = (ist_date(dated_on) - since).days
+        if day >= n_days:
+            continue
+        quantity_added[max(day, 0), column[symbol]] += quantity
+        invested_added[max(day, 0), column[symbol]] += float(invested)
+
+    quantity = np.cumsum(quantity_added, axis=0)
+    invested_by_symbol = np.cumsum(invested_added, axis=0)
+    invested = invested_by_symbol.sum(axis=1)
+    # A position with no close at all yet is carried at cost instead of as worthless
+    market_value = np.where(np.isnan(closes), invested_by_symbol, quantity * closes).sum(axis=1)
+
+    snapshots = [
+        PortfolioSnapshot(
+            user_id=user_id,
+            date=since + timedelta(days=i),
+            invested=round(float(invested[i]), 2),
+            market_value=round(float(market_value[i]), 2),
+        )
+        for i in range(n_days)
+    ]
+    PortfolioSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["user_id", "date"],
+        update_fields=["invested", "market_value", "updated_on"],
+        batch_size=1000,
+    )
+    return len(snapshots)
+
+
+def _rebuild_in_background(user_id, since):
+    try:
+        rebuild_snapshots(user_id, since)
+    except Exception:
+        logger.exception("Rebuilding portfolio snapshots for user %s from %s failed", user_id, since)
+    finally:
+        # Threads get their own connection; do not leave it open
+        connection.close()
+
+
+def schedule_snapshot_rebuild(user_id, since):
+    """
+    Rebuild the user's snapshots from `since` in a background thread once the
+    current transaction commits, so the request that changed the holdings
+    neither waits for the rebuild nor fails with it.
+    """
+    transaction.on_commit(
+        lambda: threading.Thread(target=_rebuild_in_background, args=(user_id, since), daemon=True).start()
+    )
+
+
+def load_equity_curve(user_id, start=None, end=None):
+    """Columnar equity curve read straight from the precomputed snapshots."""
+    snapshots = PortfolioSnapshot.objects.filter(user_id=user_id).order_by("date")
+    if start:
+        snapshots = snapshots.filter(date__gte=start)
+    if end:
+        snapshots = snapshots.filter(date__lte=end)
+
+    rows = list(snapshots.values_list("date", "invested", "market_value"))
+    dates, invested, market_value = zip(*rows) if rows else ((), (), ())
+    invested = np.array(invested, dtype=np.float64)
+    market_value = np.array(market_value, dtype=np.float64)
+    return {
+        "date": list(dates),
+        "invested": invested.round(2).tolist(),
+        "market_value": market_value.round(2).tolist(),
+        "pnl": (market_value - invested).round(2).tolist(),
+    }
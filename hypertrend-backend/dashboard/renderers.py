@@ -0,0 +1,79 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import msgpack
+import pyarrow as pa
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+
+def _default(value):
+    """Values msgpack cannot pack natively."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+    JSON with one array per field. Views check `columnar` on the accepted
+    renderer and hand it column arrays instead of a list of row objects.
+    """
+    media_type = "application/vnd.hypertrend.columnar+json"
+    format = "columnar"
+    columnar = True
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Columnar payload packed as MessagePack."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, use_bin_type=True, default=_default)
+
+
+class ArrowIPCRenderer(BaseRenderer):
+    """
+    Columnar payload as an Arrow IPC stream: array fields become columns and
+    scalar fields (symbol, interval) become schema metadata. Error responses
+    are sent as an empty table with the JSON body under the "error" key.
+    """
+    media_type = "application/vnd.apache.arrow.stream"
+    format = "arrow"
+    charset = None
+    render_style = "binary"
+    columnar = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        response = (renderer_context or {}).get("response")
+        if response is not None and response.status_code >= 400:
+            data = {"error": json.dumps(data, default=_default)}
+
+        columns = {name: values for name, values in data.items() if isinstance(values, list)}
+        metadata = {name: str(value) for name, value in data.items() if not isinstance(value, list)}
+        table = pa.table(columns).replace_schema_metadata(metadata)
+
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+
+# JSON stays the default; the others are picked with the Accept header (or ?format=)
+MARKET_DATA_RENDERERS = [
+    *api_settings.DEFAULT_RENDERER_CLASSES,
+    ColumnarJSONRenderer,
+    MessagePackRenderer,
+    ArrowIPCRenderer,
+]
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import UserRequests,TickData
+from .candles import INTERVALS, CANDLE_FIELDS
+from .indicators import compute_indicators
 
 class UserRequestSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,4 +11,58 @@ class UserRequestSerializer(serializers.ModelSerializer):
 class TickDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = TickData
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+# Field order of the columnar tick payload
+TICK_FIELDS = ("symbol", "time", "open", "high", "low", "close", "volume", "exchange")
+
+
+def serialize_tick_columns(ticks):
+    """
+    Columnar latest-tick payload for the binary/columnar renderers: one array
+    per field, prices as floats and times as epoch seconds.
+
+    Args:
+        ticks: TickData instances or dicts with the same fields
+    """
+    rows = [tick if isinstance(tick, dict) else {field: getattr(tick, field) for field in TICK_FIELDS} for tick in ticks]
+    return {
+        "symbol": [row["symbol"] for row in rows],
+        "time": [int(row["time"].timestamp()) for row in rows],
+        **{field: [float(row[field]) for row in rows] for field in ("open", "high", "low", "close")},
+        "volume": [int(row["volume"]) for row in rows],
+        "exchange": [row["exchange"] for row in rows],
+    }
+
+
+class CandleQuerySerializer(serializers.Serializer):
+    """Validates ?symbol=&interval=&from=&to= for the candles endpoint."""
+    symbol = serializers.CharField(max_length=32)
+    interval = serializers.ChoiceField(choices=list(INTERVALS), default="1d")
+    start = serializers.DateTimeField(required=False, input_formats=["iso-8601", "%Y-%m-%d"])
+    end = serializers.DateTimeField(required=False, input_formats=["iso-8601", "%Y-%m-%d"])
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError("'from' must be earlier than 'to'.")
+        return attrs
+
+
+def serialize_candles(symbol, interval, columns):
+    """
+    Columnar candle payload: one array per field instead of one object per bar.
+    Times are epoch seconds.
+    """
+    payload = {"symbol": symbol, "interval": interval}
+    payload.update({field: columns[field].tolist() for field in CANDLE_FIELDS})
+    return payload
+
+
+def serialize_indicators(symbol, interval, columns):
+    """Columnar time/high/low/close plus one array per indicator; warm-up values are null."""
+    payload = {"symbol": symbol, "interval": interval}
+    payload.update({field: columns[field].tolist() for field in ("time", "high", "low", "close")})
+    series = compute_indicators(columns["high"], columns["low"], columns["close"])
+    for field, values in series.items():
+        payload[field] = [None if v != v else round(v, 4) for v in values.tolist()]
+    return payload
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+
+import redis
+from django.conf import settings
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+def load_latest_ticks():
+    """
+    Return the latest tick per symbol from the Redis snapshot hash kept by
+    tick_poller, sorted by symbol. Returns None when Redis is unavailable or
+    the snapshot is empty, so callers can fall back to Postgres.
+    """
+    try:
+        snapshot = get_redis().hgetall(settings.MARKET_SNAPSHOT_KEY)
+    except redis.RedisError:
+        return None
+
+    if not snapshot:
+        return None
+
+    ticks = []
+    for symbol in sorted(snapshot):
+        tick = json.loads(snapshot[symbol])
+        tick["time"] = datetime.fromisoformat(tick["time"])
+        ticks.append(tick)
+    return ticks
+
+
+def announce_symbol_request(symbol, company):
+    """
+    Tell the tick poller a user asked for `symbol` so it starts polling it
+    right away. Best effort: the monthly company_initializer still picks the
+    request up if Redis is unavailable.
+    """
+    try:
+        get_redis().publish(settings.SYMBOL_REQUESTS_CHANNEL, json.dumps({"symbol": symbol, "company": company}))
+    except redis.RedisError:
+        pass
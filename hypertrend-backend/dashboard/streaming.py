@@ -0,0 +1,202 @@
+import asyncio
+import json
+import logging
+import re
+from datetime import timedelta
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .history import get_history
+from .indicators import tracker
+
+logger = logging.getLogger(__name__)
+
+# Daily bars used to seed live indicator state
+INDICATOR_SEED_DAYS = 365
+
+# Ticks buffered per client before the oldest ones are dropped
+CLIENT_QUEUE_SIZE = 256
+
+# Stream entries fetched per read
+STREAM_READ_COUNT = 1000
+
+STREAM_ID = re.compile(r"^\d+-\d+$")
+
+
+def stream_id_key(entry_id: str) -> tuple[int, int]:
+    ms, seq = entry_id.split("-")
+    return int(ms), int(seq)
+
+
+class TickBroadcaster:
+    """
+    Follows the tick stream once per process and fans every tick out to
+    the queues of the clients watching that symbol. Symbols with live
+    indicator state are advanced by each tick and get an extra
+    `indicators` event.
+
+    Every process needs every tick, so the stream is read with XREAD from
+    the last entry seen rather than through a consumer group; after a Redis
+    error reading resumes from that entry, so nothing in between is lost.
+    An entry that cannot be handled is logged and skipped.
+
+    Needs an ASGI server (uvicorn hypertrend.asgi:application): the reader
+    task lives on the server's event loop.
+    """
+
+    def __init__(self):
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        self.redis = None
+        self._task = None
+        self._loop = None
+        self._last_id = "$"
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self.redis is not None and self._loop is loop:
+            # The reader stopped; release the old client's connections before starting over
+            loop.create_task(self.redis.aclose())
+        self._loop = loop
+        self.redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._task = loop.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                response = await self.redis.xread(
+                    {settings.TICK_STREAM_KEY: self._last_id}, count=STREAM_READ_COUNT, block=5000,
+                )
+            except RedisError:
+                await asyncio.sleep(1)
+                continue
+            except Exception:
+                logger.exception("Reading the tick stream failed")
+                await asyncio.sleep(1)
+                continue
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    self._last_id = entry_id
+                    try:
+                        self._dispatch(entry_id, fields)
+                    except Exception:
+                        logger.exception("Skipping tick stream entry %s", entry_id)
+
+    def _dispatch(self, entry_id: str, fields: dict):
+        symbol, payload = fields["symbol"], fields["tick"]
+        self._fan_out(symbol, "tick", payload, entry_id)
+
+        if tracker.is_tracked(symbol):
+            values = tracker.advance(symbol, json.loads(payload))
+            self._fan_out(symbol, "indicators", json.dumps({"symbol": symbol, **values}))
+
+    def _fan_out(self, symbol: str, event: str, data: str, entry_id: str = None):
+        for queue in self.subscribers.get(symbol, ()):
+            if queue.full():
+                # Slow client: drop its oldest event rather than block everyone
+                queue.get_nowait()
+            queue.put_nowait((event, data, entry_id))
+
+    async def track_indicators(self, symbols: list[str]):
+        """Seed live daily indicator state for symbols that do not have it yet."""
+        start = timezone.now() - timedelta(days=INDICATOR_SEED_DAYS)
+        for symbol in symbols:
+            if not tracker.is_tracked(symbol):
+                columns = await sync_to_async(get_history)(symbol, "1d", start)
+                tracker.seed(symbol, columns)
+
+    def subscribe(self, symbols: list[str]) -> asyncio.Queue:
+        self._ensure_started()
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        for symbol in symbols:
+            self.subscribers.setdefault(symbol, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, symbols: list[str]):
+        for symbol in symbols:
+            queues = self.subscribers.get(symbol)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[symbol]
+                # Nobody left to send indicators to; the next subscriber reseeds
+                tracker.drop(symbol)
+
+    async def snapshot(self, symbols: list[str]) -> list[str]:
+        """Latest tick JSON for each symbol that has one."""
+        self._ensure_started()
+        values = await self.redis.hmget(settings.MARKET_SNAPSHOT_KEY, symbols)
+        return [v for v in values if v]
+
+    async def replay(self, symbols: list[str], after: str) -> list[tuple[str, str]]:
+        """
+        (entry id, tick JSON) for the symbols' ticks after stream entry `after`,
+        as far as they are still in the stream and within TICK_STREAM_REPLAY_MAX entries.
+        """
+        self._ensure_started()
+        wanted = set(symbols)
+        ticks = []
+        start, scanned = f"({after}", 0
+        while scanned < settings.TICK_STREAM_REPLAY_MAX:
+            entries = await self.redis.xrange(settings.TICK_STREAM_KEY, min=start, max="+", count=STREAM_READ_COUNT)
+            if not entries:
+                break
+            ticks.extend((entry_id, fields["tick"]) for entry_id, fields in entries if fields["symbol"] in wanted)
+            scanned += len(entries)
+            start = f"({entries[-1][0]}"
+        return ticks
+
+
+broadcaster = TickBroadcaster()
+
+
+def sse_event(data: str, event: str = "tick", entry_id: str = None) -> str:
+    # The id lets a reconnecting browser resume with Last-Event-ID
+    id_line = f"id: {entry_id}\n" if entry_id else ""
+    return f"{id_line}event: {event}\ndata: {data}\n\n"
+
+
+async def tick_event_stream(symbols: list[str], indicators: bool = False, keepalive: float = 15,
+                            last_event_id: str = None):
+    """
+    Server-Sent Events stream of ticks (and optionally live indicators) for the given symbols.
+    A client resuming with `last_event_id` gets the ticks it missed instead of the snapshot.
+    """
+    queue = broadcaster.subscribe(symbols)
+    replayed_up_to = None
+    try:
+        yield "retry: 3000\n\n"
+        if indicators:
+            await broadcaster.track_indicators(symbols)
+        if last_event_id and STREAM_ID.match(last_event_id):
+            for entry_id, payload in await broadcaster.replay(symbols, last_event_id):
+                replayed_up_to = stream_id_key(entry_id)
+                yield sse_event(payload, entry_id=entry_id)
+        else:
+            for payload in await broadcaster.snapshot(symbols):
+                yield sse_event(payload)
+
+        while True:
+            try:
+                event, payload, entry_id = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            # Ticks that arrived while replaying were already sent
+            if entry_id and replayed_up_to and stream_id_key(entry_id) <= replayed_up_to:
+                continue
+            yield sse_event(payload, event, entry_id)
+    finally:
+        broadcaster.unsubscribe(queue, symbols)
+
+
+def parse_symbols(raw: str) -> list[str]:
+    return sorted({s.strip().upper() for s in raw.split(",") if s.strip()})
+
@@ -0,0 +1,92 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from dashboard import cold_storage
+from dashboard.candles import CANDLE_TIMEZONE
+
+IST = ZoneInfo(CANDLE_TIMEZONE)
+
+
+def ist(*args):
+    """Epoch seconds of an IST wall-clock time."""
+    return int(datetime(*args, tzinfo=IST).timestamp())
+
+
+def ticks(rows):
+    """Tick columns from (time, open, high, low, close, volume) rows."""
+    columns = list(zip(*rows))
+    return {
+        name: np.array(values, dtype=np.int64 if name in ("time", "volume") else np.float64)
+        for name, values in zip(cold_storage.TICK_FIELDS, columns)
+    }
+
+
+class BucketFloorTests(SimpleTestCase):
+    """bucket_floor must match time_bucket(interval, time, 'Asia/Kolkata') in candles.py."""
+
+    def test_origin_is_time_bucket_origin_in_ist(self):
+        # TimescaleDB buckets with a timezone from local Monday 2000-01-03 00:00
+        self.assertEqual(cold_storage.BUCKET_ORIGIN, ist(2000, 1, 3))
+
+    def test_days_start_at_ist_midnight(self):
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 16, 15, 29), "1d"), ist(2026, 10, 16))
+        # 00:30 IST is still the previous day in UTC
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 16, 0, 30), "1d"), ist(2026, 10, 16))
+
+    def test_weeks_start_on_ist_monday(self):
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 18, 15, 0), "1w"), ist(2026, 10, 12))
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 19), "1w"), ist(2026, 10, 19))
+
+    def test_intraday_buckets_follow_ist_wall_clock(self):
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 16, 9, 20), "15m"), ist(2026, 10, 16, 9, 15))
+        self.assertEqual(cold_storage.bucket_floor(ist(2026, 10, 16, 9, 20), "1h"), ist(2026, 10, 16, 9, 0))
+
+    def test_arrays(self):
+        times = np.array([ist(2026, 10, 16, 9, 14), ist(2026, 10, 16, 9, 15)])
+        np.testing.assert_array_equal(
+            cold_storage.bucket_floor(times, "5m"), [ist(2026, 10, 16, 9, 10), ist(2026, 10, 16, 9, 15)],
+        )
+
+
+class AggregateTicksTests(SimpleTestCase):
+    """aggregate_ticks must follow the candle SQL: volume is the day's running total."""
+
+    TICKS = ticks([
+        # time, open, high, low, close, volume (running total for the day)
+        (ist(2026, 10, 15, 9, 15), 100, 101, 99, 100, 100),
+        (ist(2026, 10, 15, 9, 16), 100, 103, 99, 102, 150),
+        (ist(2026, 10, 15, 9, 31), 100, 103, 98, 98, 400),
+        # A stale quote with a lower total must not give a negative volume
+        (ist(2026, 10, 15, 9, 46), 100, 103, 98, 99, 390),
+        (ist(2026, 10, 16, 9, 15), 99, 99, 97, 97, 50),
+        (ist(2026, 10, 16, 9, 17), 99, 100, 97, 100, 80),
+    ])
+
+    def test_intraday_prices_from_close_and_volume_from_running_total(self):
+        candles = cold_storage.aggregate_ticks(self.TICKS, "15m")
+        np.testing.assert_array_equal(candles["time"], [
+            ist(2026, 10, 15, 9, 15), ist(2026, 10, 15, 9, 30), ist(2026, 10, 15, 9, 45), ist(2026, 10, 16, 9, 15),
+        ])
+        np.testing.assert_array_equal(candles["open"], [100, 98, 99, 97])
+        np.testing.assert_array_equal(candles["high"], [102, 98, 99, 100])
+        np.testing.assert_array_equal(candles["low"], [100, 98, 99, 97])
+        np.testing.assert_array_equal(candles["close"], [102, 98, 99, 100])
+        # 150 by 09:30, 400 by 09:45, no growth after, then a new day starts from 0
+        np.testing.assert_array_equal(candles["volume"], [150, 250, 0, 80])
+
+    def test_daily_keeps_row_ohlc_and_final_volume(self):
+        candles = cold_storage.aggregate_ticks(self.TICKS, "1d")
+        np.testing.assert_array_equal(candles["time"], [ist(2026, 10, 15), ist(2026, 10, 16)])
+        np.testing.assert_array_equal(candles["open"], [100, 99])
+        np.testing.assert_array_equal(candles["high"], [103, 100])
+        np.testing.assert_array_equal(candles["low"], [98, 97])
+        np.testing.assert_array_equal(candles["close"], [99, 100])
+        np.testing.assert_array_equal(candles["volume"], [400, 80])
+
+    def test_weekly_sums_daily_volume(self):
+        candles = cold_storage.aggregate_ticks(self.TICKS, "1w")
+        np.testing.assert_array_equal(candles["time"], [ist(2026, 10, 12)])
+        np.testing.assert_array_equal(candles["volume"], [480])
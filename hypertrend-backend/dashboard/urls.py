@@ -2,9 +2,21 @@ from django.urls import path
 from .views import (
     save_user_request,
     TickDataListView,
+    stream_market_data,
+    fetch_candles,
+    fetch_indicators,
+    fetch_portfolio,
+    fetch_portfolio_history,
+    fetch_cache_stats,
 )
 
 urlpatterns = [
     path('user_request/', save_user_request, name='user-request'),
     path('fetch_market_data/', TickDataListView.as_view(), name='fetch-market-data'),
+    path('stream_market_data/', stream_market_data, name='stream-market-data'),
+    path('candles/', fetch_candles, name='candles'),
+    path('indicators/', fetch_indicators, name='indicators'),
+    path('portfolio/', fetch_portfolio, name='portfolio'),
+    path('portfolio/history/', fetch_portfolio_history, name='portfolio-history'),
+    path('cache_stats/', fetch_cache_stats, name='cache-stats'),
 ]
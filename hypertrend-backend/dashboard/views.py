@@ -1,21 +1,41 @@
-from rest_framework.decorators import api_view
+from datetime import timedelta
+
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView
 from rest_framework.filters import OrderingFilter
 
-from .serializers import UserRequestSerializer, TickDataSerializer, TickData
+from .serializers import (
+    UserRequestSerializer, TickDataSerializer, TickData, CandleQuerySerializer,
+    serialize_candles, serialize_indicators, serialize_tick_columns,
+)
+from .history import get_history, history_cache
+from .onboarding import enqueue_onboarding
+from .portfolio import load_holdings, value_portfolio, schedule_snapshot_rebuild, load_equity_curve, ist_date
+from .renderers import MARKET_DATA_RENDERERS
+from .snapshot import load_latest_ticks, announce_symbol_request
+from .streaming import tick_event_stream, parse_symbols
 
 @api_view(['POST'])
 def save_user_request(request):
     serializer = UserRequestSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        holding = serializer.save()
+        announce_symbol_request(holding.symbol, holding.company)
+        enqueue_onboarding(holding.symbol, holding.company)
+        if holding.mystocks:
+            # Only the days from the purchase date onwards change
+            schedule_snapshot_rebuild(holding.user_id, ist_date(holding.dated_on))
         return Response(serializer.data, status=201)
     return Response(serializer.errors, status=400)
 
 class TickDataListView(ListAPIView):
     queryset = TickData.objects.all()
     serializer_class = TickDataSerializer
+    renderer_classes = MARKET_DATA_RENDERERS
 
     def get_queryset(self):
         return (
@@ -23,3 +43,126 @@ class TickDataListView(ListAPIView):
             .order_by("symbol", "-time")
             .distinct("symbol")
         )
+
+    def list(self, request, *args, **kwargs):
+        # Serve from the Redis snapshot hash; only scan tick_data when it is unavailable
+        ticks = load_latest_ticks()
+        if getattr(request.accepted_renderer, "columnar", False):
+            # Columnar/binary formats skip the per-row ModelSerializer entirely
+            if ticks is None:
+                ticks = self.filter_queryset(self.get_queryset())
+            return Response(serialize_tick_columns(ticks))
+        if ticks is None:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_serializer([TickData(**tick) for tick in ticks], many=True)
+        return Response(serializer.data)
+
+
+# How far back the candles endpoint looks when 'from' is omitted
+DEFAULT_CANDLE_SPAN = {
+    "1m": timedelta(days=1),
+    "5m": timedelta(days=5),
+    "15m": timedelta(days=15),
+    "1h": timedelta(days=60),
+    "1d": timedelta(days=365),
+    "1w": timedelta(days=5 * 365),
+}
+
+def _candle_query(request):
+    """Validated (symbol, interval, start, end) for candle-based endpoints, or an error Response."""
+    data = {"symbol": request.GET.get("symbol"), "interval": request.GET.get("interval", "1d")}
+    if request.GET.get("from"):
+        data["start"] = request.GET["from"]
+    if request.GET.get("to"):
+        data["end"] = request.GET["to"]
+
+    query = CandleQuerySerializer(data=data)
+    if not query.is_valid():
+        return Response(query.errors, status=400)
+
+    symbol = query.validated_data["symbol"].upper()
+    interval = query.validated_data["interval"]
+    # end stays None for "up to now" so the history cache can keep serving it
+    end = query.validated_data.get("end")
+    start = query.validated_data.get("start") or (end or timezone.now()) - DEFAULT_CANDLE_SPAN[interval]
+    return symbol, interval, start, end
+
+
+@api_view(['GET'])
+@renderer_classes(MARKET_DATA_RENDERERS)
+def fetch_candles(request):
+    query = _candle_query(request)
+    if isinstance(query, Response):
+        return query
+    symbol, interval, start, end = query
+
+    return Response(serialize_candles(symbol, interval, get_history(symbol, interval, start, end)))
+
+
+@api_view(['GET'])
+@renderer_classes(MARKET_DATA_RENDERERS)
+def fetch_indicators(request):
+    query = _candle_query(request)
+    if isinstance(query, Response):
+        return query
+    symbol, interval, start, end = query
+
+    return Response(serialize_indicators(symbol, interval, get_history(symbol, interval, start, end)))
+
+
+def _user_id(request):
+    """The required ?user_id as an int, or an error Response."""
+    if not request.GET.get("user_id"):
+        return Response({"user_id": ["This query parameter is required."]}, status=400)
+    try:
+        return int(request.GET["user_id"])
+    except ValueError:
+        return Response({"user_id": ["A valid integer is required."]}, status=400)
+
+
+@api_view(['GET'])
+def fetch_portfolio(request):
+    user_id = _user_id(request)
+    if isinstance(user_id, Response):
+        return user_id
+
+    return Response(value_portfolio(load_holdings(user_id)))
+
+
+@api_view(['GET'])
+def fetch_portfolio_history(request):
+    user_id = _user_id(request)
+    if isinstance(user_id, Response):
+        return user_id
+
+    start = parse_date(request.GET.get("from", ""))
+    end = parse_date(request.GET.get("to", ""))
+    return Response(load_equity_curve(user_id, start, end))
+
+
+@api_view(['GET'])
+def fetch_cache_stats(request):
+    return Response(history_cache.stats())
+
+
+async def stream_market_data(request):
+    """
+    Server-Sent Events feed of live ticks for ?symbols=RELIANCE,TCS.
+    Sends the latest snapshot for each symbol first, then every new tick.
+    With &indicators=1 each tick is followed by the updated daily indicators.
+    A reconnecting client (Last-Event-ID header) gets the ticks it missed instead.
+    """
+    symbols = parse_symbols(request.GET.get("symbols", ""))
+    if not symbols:
+        return JsonResponse({"symbols": ["This query parameter is required."]}, status=400)
+
+    indicators = request.GET.get("indicators") in ("1", "true")
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    response = StreamingHttpResponse(
+        tick_event_stream(symbols, indicators, last_event_id=last_event_id),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
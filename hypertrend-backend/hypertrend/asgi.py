@@ -2,6 +2,10 @@
 ASGI config for hypertrend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the backend through it, since the stream_market_data SSE feed needs an ASGI server
+(under runserver or WSGI the feed is buffered and never streams):
+
+    uvicorn hypertrend.asgi:application --host 127.0.0.1 --port 8000
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
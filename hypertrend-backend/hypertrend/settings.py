@@ -98,6 +98,23 @@ DATABASES = {
 }
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Redis (shared with data_ingestor)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6380')
+MARKET_SNAPSHOT_KEY = 'market_snapshot'
+TICK_STREAM_KEY = 'market_ticks' # Redis stream the tick poller appends every tick to
+TICK_STREAM_REPLAY_MAX = int(os.environ.get('TICK_STREAM_REPLAY_MAX', 20000)) # Entries scanned when an SSE client resumes
+SYMBOL_REQUESTS_CHANNEL = 'symbol_requests'
+
+# Postgres NOTIFY channel that wakes data_ingestor/onboarding_worker.py
+ONBOARDING_NOTIFY_CHANNEL = 'onboarding_jobs'
+
+# In-process OHLCV history cache (dashboard.history)
+HISTORY_CACHE_MAX_BYTES = int(os.environ.get('HISTORY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+HISTORY_CACHE_TTL = int(os.environ.get('HISTORY_CACHE_TTL', 300)) # seconds
+
+# Parquet cold storage written by data_ingestor/tick_archiver.py (dashboard.cold_storage)
+COLD_STORAGE_DIR = Path(os.environ.get('COLD_STORAGE_DIR', BASE_DIR.parent / 'data_ingestor' / 'archive'))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 